@@ -0,0 +1,119 @@
+"""Shared helpers for the benchmark scripts."""
+import contextlib
+import os
+import socket
+import ssl
+import subprocess
+import sys
+import time
+import urllib.request
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    idx = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[idx]
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+@contextlib.contextmanager
+def serve(app_path, port=None, env=None, ready_path="/docs", args=(), insecure=False):
+    """Run `uvicorn <app_path>` in a subprocess and yield its base URL once it answers.
+
+    `insecure` serves HTTPS (uvicorn --ssl-* flags in `args`) and skips verification
+    of the readiness probe.
+    """
+    port = port or free_port()
+    proc_env = dict(os.environ, **(env or {}))
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", app_path, "--host", "127.0.0.1", "--port", str(port),
+         "--log-level", "warning", *args],
+        env=proc_env,
+        stdout=subprocess.DEVNULL,
+    )
+    base_url = f"{'https' if insecure else 'http'}://127.0.0.1:{port}"
+    probe_ctx = ssl._create_unverified_context() if insecure else None
+    try:
+        deadline = time.time() + 20
+        while True:
+            try:
+                urllib.request.urlopen(base_url + ready_path, timeout=1, context=probe_ctx)
+                break
+            except Exception:
+                if proc.poll() is not None or time.time() > deadline:
+                    raise RuntimeError(f"{app_path} did not start on port {port}")
+                time.sleep(0.1)
+        yield base_url, proc
+    finally:
+        proc.terminate()
+        try:
+            proc.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+
+
+def _children(pid):
+    """All descendant pids of `pid` (Linux /proc)."""
+    kids = []
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat") as f:
+                ppid = int(f.read().rsplit(")", 1)[1].split()[1])
+        except (OSError, IndexError, ValueError):
+            continue
+        if ppid == pid:
+            kids.append(int(entry))
+    return kids + [d for k in kids for d in _children(k)]
+
+
+def process_tree(pid=None):
+    """`pid` (default: this process) and all its live descendants."""
+    pid = pid or os.getpid()
+    return [pid] + _children(pid)
+
+
+def process_name(pid):
+    """Executable name of `pid` (/proc/<pid>/comm), "" if it has exited."""
+    try:
+        with open(f"/proc/{pid}/comm") as f:
+            return f.read().strip()
+    except OSError:
+        return ""
+
+
+def rss_mb(pid=None, include_children=True, pids=None):
+    """Resident set size in MB of `pid` (default: this process), optionally with descendants, or of `pids`."""
+    if pids is None:
+        pids = process_tree(pid) if include_children else [pid or os.getpid()]
+    total_kb = 0
+    for p in pids:
+        try:
+            with open(f"/proc/{p}/status") as f:
+                for line in f:
+                    if line.startswith("VmRSS:"):
+                        total_kb += int(line.split()[1])
+        except OSError:
+            continue
+    return total_kb / 1024
+
+
+def cpu_seconds(pid=None, include_children=True, pids=None):
+    """User + system CPU seconds of `pid` (default: this process), optionally with live descendants, or of `pids`."""
+    if pids is None:
+        pids = process_tree(pid) if include_children else [pid or os.getpid()]
+    ticks = 0
+    for p in pids:
+        try:
+            with open(f"/proc/{p}/stat") as f:
+                fields = f.read().rsplit(")", 1)[1].split()
+            ticks += int(fields[11]) + int(fields[12])  # utime, stime
+        except (OSError, IndexError, ValueError):
+            continue
+    return ticks / os.sysconf("SC_CLK_TCK")
@@ -0,0 +1,96 @@
+"""
+Brand detection accuracy and throughput.
+
+Checks every serial in bench/brand_corpus.json (the golden corpus) against
+brand_rules, then times single-serial classify() and batch classify_many() on a
+synthetic inventory built from the corpus. Exits non-zero on any corpus mismatch,
+or when a rate falls below --min-rate.
+
+Usage:
+    python -m bench.brand_detection --serials 200000 --unique 0.5
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import time
+
+from brand_rules import classifier
+
+CORPUS_PATH = os.path.join(os.path.dirname(__file__), "brand_corpus.json")
+
+
+def load_corpus(path=CORPUS_PATH):
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)["entries"]
+
+
+def check_corpus(entries):
+    """Return the entries whose classification differs from the expected brand"""
+    mismatches = []
+    for entry in entries:
+        got = classifier.classify(entry["serial"])
+        if got != entry["brand"]:
+            mismatches.append((entry, got))
+    batch = classifier.classify_many(entry["serial"] for entry in entries)
+    for entry, got in zip(entries, batch):
+        if got != entry["brand"]:
+            mismatches.append((entry, got))
+    return mismatches
+
+
+def inventory(entries, count, unique, seed=1):
+    """`count` serials drawn from corpus-shaped serials, about `unique` of them distinct"""
+    rng = random.Random(seed)
+    alphabet = "ABCDEFGHJKLMNPQRSTUVWXYZ0123456789"
+    distinct = []
+    for _ in range(max(1, int(count * unique))):
+        base = rng.choice(entries)["serial"].strip().upper() or "X"
+        keep = rng.randint(min(len(base), 2), len(base))  # keep the prefix, vary the rest
+        distinct.append(base[:keep] + "".join(rng.choice(alphabet) for _ in range(len(base) - keep)))
+    return [rng.choice(distinct) for _ in range(count)]
+
+
+def rate(func, serials, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(serials)
+        best = min(best, time.perf_counter() - start)
+    return len(serials) / best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--serials", type=int, default=200000)
+    parser.add_argument("--unique", type=float, default=0.5, help="fraction of distinct serials in the inventory")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per mode (best is reported)")
+    parser.add_argument("--min-rate", type=float, default=0, help="fail if a mode is slower (serials/s)")
+    args = parser.parse_args()
+
+    entries = load_corpus()
+    mismatches = check_corpus(entries)
+    print(f"corpus: {len(entries)} serials, {len(mismatches)} mismatches")
+    for entry, got in mismatches:
+        print(f"  {entry['serial']!r}: expected {entry['brand']!r}, got {got!r} ({entry['source']})")
+
+    serials = inventory(entries, args.serials, args.unique)
+    modes = {
+        "single": lambda batch: [classifier.classify(serial) for serial in batch],
+        "batch": classifier.classify_many,
+    }
+    slow = []
+    print(f"{'mode':<10}{'serials/s':>14}")
+    for name, func in modes.items():
+        serials_per_s = rate(func, serials, args.repeat)
+        print(f"{name:<10}{serials_per_s:>14,.0f}")
+        if serials_per_s < args.min_rate:
+            slow.append(name)
+
+    if mismatches or slow:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
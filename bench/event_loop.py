@@ -0,0 +1,116 @@
+"""
+Lenovo latency while HP lookups are in flight.
+
+Replaces both vendor calls with stand-ins (async Lenovo ~50 ms, blocking HP ~3 s) and drives
+the FastAPI app in-process. Lenovo p99 should stay flat when HP requests are running.
+Every request uses a new serial and the result cache is off, so none is answered from the
+cache or coalesced with another: each one reaches the stand-ins.
+
+Usage:
+    python -m bench.event_loop
+    python -m bench.event_loop --inline   # old behaviour: call HP on the event loop
+"""
+import argparse
+import asyncio
+import itertools
+import os
+import statistics
+import time
+
+import httpx
+
+# Read by main and the providers at import. The timeouts are raised so --inline reports how
+# long Lenovo waits behind blocking HP calls instead of failing with 504s.
+os.environ.update(CACHE_TTL_FOUND="0", CACHE_TTL_NEGATIVE="0", WARRANTY_DB_PATH="",
+                  LENOVO_TIMEOUT="3600", HP_TIMEOUT="3600")
+
+import main  # noqa: E402
+import providers  # noqa: E402
+import providers.hp  # noqa: E402
+import providers.lenovo  # noqa: E402
+from bench._util import percentile  # noqa: E402
+
+_lenovo_serials = (f"PF{i:06d}" for i in itertools.count())
+_hp_serials = (f"5CD{i:07d}" for i in itertools.count())
+
+
+async def fake_lenovo(serial_number, delay=0.05):
+    await asyncio.sleep(delay)
+    return {
+        "data": {
+            "machineInfo": {"productName": "ThinkCentre M70s Gen 3", "serial": serial_number},
+            "currentWarranty": {"startDate": "2023-01-15", "endDate": "2026-01-14"},
+        }
+    }
+
+
+def fake_hp(serial_number, delay=3.0):
+    time.sleep(delay)
+    return {
+        "brand": "HP",
+        "product_name": "HP EliteBook 840 G8",
+        "serial_number": serial_number,
+        "warranty_start": "01/02/2022",
+        "warranty_end": "01/02/2025",
+    }
+
+
+async def lenovo_load(client, total, rate):
+    """Open-loop load: latency is measured from the scheduled send time, so time spent
+    waiting for a blocked event loop counts against the request."""
+    latencies = []
+    loop = asyncio.get_running_loop()
+    t0 = loop.time()
+
+    async def one(i):
+        scheduled = t0 + i / rate
+        await asyncio.sleep(max(0.0, scheduled - loop.time()))
+        r = await client.get(f"/warranty/{next(_lenovo_serials)}")
+        latencies.append(loop.time() - scheduled)
+        assert r.status_code == 200, r.text
+
+    await asyncio.gather(*(one(i) for i in range(total)))
+    return latencies
+
+
+async def hp_load(client, stop):
+    while not stop.is_set():
+        await client.get(f"/warranty/{next(_hp_serials)}")
+        await asyncio.sleep(0)
+
+
+async def run(args):
+    providers.lenovo.get_lenovo_warranty_info_async = lambda sn: fake_lenovo(sn, args.lenovo_delay)
+    providers.hp.extract_warranty_ultra_fast = lambda sn: fake_hp(sn, args.hp_delay)
+    if args.inline:
+        async def inline(executor, func, *a):
+            return func(*a)
+        providers.run_in_executor = inline
+
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        baseline = await lenovo_load(client, args.requests, args.rate)
+
+        stop = asyncio.Event()
+        hp_tasks = [asyncio.create_task(hp_load(client, stop)) for _ in range(args.hp_inflight)]
+        await asyncio.sleep(0.1)
+        loaded = await lenovo_load(client, args.requests, args.rate)
+        stop.set()
+        await asyncio.gather(*hp_tasks)
+
+    print(f"mode: {'inline (blocking)' if args.inline else 'executors'}")
+    print(f"{'scenario':<26}{'p50 ms':>10}{'p99 ms':>10}{'max ms':>10}")
+    for name, lat in (("lenovo only", baseline), (f"lenovo + {args.hp_inflight} HP in flight", loaded)):
+        print(f"{name:<26}{statistics.median(lat) * 1000:>10.1f}"
+              f"{percentile(lat, 99) * 1000:>10.1f}{max(lat) * 1000:>10.1f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--rate", type=float, default=50.0, help="Lenovo requests per second")
+    parser.add_argument("--hp-inflight", type=int, default=4)
+    parser.add_argument("--lenovo-delay", type=float, default=0.05)
+    parser.add_argument("--hp-delay", type=float, default=3.0)
+    parser.add_argument("--inline", action="store_true")
+    asyncio.run(run(parser.parse_args()))
@@ -0,0 +1,71 @@
+"""
+HP browser traffic per lookup with and without resource blocking.
+
+Starts the local HP stand-in (its result page carries an image, a web font, a
+video, a stylesheet and a consent script) and runs browser lookups under each
+HP_BLOCK_PROFILE with HP_MEASURE_TRAFFIC=1. Reports requests, KB and blocked
+requests per lookup plus p50 latency. Point HP_BASE_URL at the real site
+(--live) to measure support.hp.com itself. Needs Chrome + chromedriver installed.
+
+Usage:
+    python -m bench.hp_blocking --lookups 10 --profiles none,default
+"""
+import argparse
+import importlib
+import os
+import statistics
+import time
+
+from bench._util import serve
+
+
+def run_profile(profile, serials):
+    os.environ["HP_BLOCK_PROFILE"] = profile
+    import resource_blocking
+    import ultra_fast_warranty
+    importlib.reload(resource_blocking)
+    uf = importlib.reload(ultra_fast_warranty)
+    latencies, errors = [], 0
+    try:
+        for serial in serials:
+            start = time.perf_counter()
+            result = uf.extract_warranty_ultra_fast(serial)
+            latencies.append(time.perf_counter() - start)
+            errors += 1 if "error" in result else 0
+        traffic = resource_blocking.traffic_stats()
+    finally:
+        uf.shutdown_browsers()
+    return latencies, errors, traffic
+
+
+def run(args, serials):
+    print(f"{'profile':<10}{'errors':>8}{'requests':>10}{'KB':>10}{'blocked':>9}{'p50 s':>8}")
+    for profile in args.profiles.split(","):
+        lat, errors, traffic = run_profile(profile, serials)
+        print(f"{profile:<10}{errors:>8}{traffic['requests_per_lookup']:>10.1f}{traffic['kb_per_lookup']:>10.1f}"
+              f"{traffic['blocked_per_lookup']:>9.1f}{statistics.median(lat):>8.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--lookups", type=int, default=10)
+    parser.add_argument("--profiles", default="none,default")
+    parser.add_argument("--mode", default="dom", help="HP_BROWSER_MODE (dom loads the whole page)")
+    parser.add_argument("--live", action="store_true", help="use support.hp.com instead of the stand-in")
+    parser.add_argument("--serials", default="", help="comma-separated serials (default: generated)")
+    args = parser.parse_args()
+
+    os.environ.update({"HP_MEASURE_TRAFFIC": "1", "HP_WARRANTY_API": "0", "HP_WARM_BROWSERS": "0",
+                       "HP_BROWSER_MODE": args.mode})
+    serials = args.serials.split(",") if args.serials else [f"5CD{i:07d}" for i in range(args.lookups)]
+    if args.live:
+        run(args, serials)
+        return
+    with serve("standins.hp:app") as (base_url, _):
+        os.environ["HP_BASE_URL"] = base_url
+        os.environ.setdefault("RATE_LIMIT_HP_BROWSER", "0")
+        run(args, serials)
+
+
+if __name__ == "__main__":
+    main()
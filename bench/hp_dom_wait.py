@@ -0,0 +1,75 @@
+"""
+HP browser fallback: how the lookup learns the dates are there.
+
+Starts the local HP stand-in (whose result page renders its dates
+--render-delay-ms after load) and runs browser lookups in each mode:
+poll (HP_BROWSER_MODE=dom, HP_DOM_WAIT=poll: WebDriverWait on page_source plus
+a fixed 1s sleep), observer (HP_BROWSER_MODE=dom, in-page MutationObserver) and
+network (HP_BROWSER_MODE=network: the warranty XHR taken from the DevTools log).
+Reports latency per lookup, time spent waiting for the DOM or the response, and
+CPU seconds per lookup for this process plus chromedriver and Chrome. Needs
+Chrome + chromedriver installed.
+
+Usage:
+    python -m bench.hp_dom_wait --lookups 20 --render-delay-ms 800
+"""
+import argparse
+import importlib
+import os
+import statistics
+import time
+
+from prometheus_client import REGISTRY
+
+from bench._util import cpu_seconds, percentile, serve
+
+
+def dom_wait_seconds():
+    return sum(REGISTRY.get_sample_value("warranty_stage_seconds_sum", {"stage": stage}) or 0.0
+               for stage in ("dom_wait", "network_capture"))
+
+
+def run_mode(mode, serials):
+    os.environ["HP_BROWSER_MODE"] = "network" if mode == "network" else "dom"
+    os.environ["HP_DOM_WAIT"] = "poll" if mode == "poll" else "observer"
+    import ultra_fast_warranty
+    uf = importlib.reload(ultra_fast_warranty)
+    latencies, errors = [], 0
+    try:
+        uf.extract_warranty_ultra_fast(serials[0])  # start the browser outside the measurement
+        cpu_start, dom_start = cpu_seconds(), dom_wait_seconds()
+        for serial in serials:
+            start = time.perf_counter()
+            result = uf.extract_warranty_ultra_fast(serial)
+            latencies.append(time.perf_counter() - start)
+            errors += 1 if "error" in result else 0
+        cpu = (cpu_seconds() - cpu_start) / len(serials)
+        dom_wait = (dom_wait_seconds() - dom_start) / len(serials)
+    finally:
+        uf.shutdown_browsers()
+    return latencies, errors, dom_wait, cpu
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--lookups", type=int, default=20)
+    parser.add_argument("--modes", default="poll,observer,network")
+    parser.add_argument("--render-delay-ms", type=float, default=800, help="stand-in page render delay")
+    args = parser.parse_args()
+
+    env = {"STANDIN_RENDER_DELAY_MS": str(args.render_delay_ms)}
+    with serve("standins.hp:app", env=env) as (base_url, _):
+        os.environ["HP_BASE_URL"] = base_url
+        os.environ["HP_WARRANTY_API"] = "0"  # every lookup goes through the browser
+        os.environ["HP_WARM_BROWSERS"] = "0"
+        os.environ.setdefault("RATE_LIMIT_HP_BROWSER", "0")
+        serials = [f"5CD{i:07d}" for i in range(args.lookups)]
+        print(f"{'mode':<10}{'errors':>8}{'p50 s':>10}{'p99 s':>10}{'wait s':>12}{'CPU s/lookup':>14}")
+        for mode in args.modes.split(","):
+            lat, errors, dom_wait, cpu = run_mode(mode, serials)
+            print(f"{mode:<10}{errors:>8}{statistics.median(lat):>10.2f}{percentile(lat, 99):>10.2f}"
+                  f"{dom_wait:>12.2f}{cpu:>14.3f}")
+
+
+if __name__ == "__main__":
+    main()
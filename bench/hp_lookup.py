@@ -0,0 +1,56 @@
+"""
+HP lookup latency and memory: warranty JSON API vs the Chrome fallback.
+
+Starts the local HP stand-in and runs the same serials through
+ultra_fast_warranty.extract_warranty_ultra_fast with HP_WARRANTY_API on and off.
+The browser mode needs Chrome + chromedriver installed.
+
+Usage:
+    python -m bench.hp_lookup --lookups 20 --modes api,browser
+"""
+import argparse
+import importlib
+import os
+import statistics
+import time
+
+from bench._util import percentile, rss_mb, serve
+
+
+def run_mode(mode, serials):
+    os.environ["HP_WARRANTY_API"] = "1" if mode == "api" else "0"
+    import ultra_fast_warranty
+    uf = importlib.reload(ultra_fast_warranty)
+    latencies, errors, peak_rss = [], 0, 0.0
+    try:
+        for serial in serials:
+            start = time.perf_counter()
+            result = uf.extract_warranty_ultra_fast(serial)
+            latencies.append(time.perf_counter() - start)
+            errors += 1 if "error" in result else 0
+            peak_rss = max(peak_rss, rss_mb())
+    finally:
+        uf.shutdown_browsers()
+    return latencies, errors, peak_rss
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--lookups", type=int, default=20)
+    parser.add_argument("--modes", default="api,browser")
+    parser.add_argument("--latency-ms", type=float, default=150)
+    args = parser.parse_args()
+
+    with serve("standins.hp:app", env={"STANDIN_LATENCY_MS": str(args.latency_ms)}) as (base_url, _):
+        os.environ["HP_BASE_URL"] = base_url
+        for name in ("HP_SEARCH", "HP_WARRANTY_API", "HP_BROWSER"):
+            os.environ.setdefault("RATE_LIMIT_" + name, "0")  # measure lookups, not rate limits
+        serials = [f"5CD{i:07d}" for i in range(args.lookups)]
+        print(f"{'mode':<10}{'errors':>8}{'p50 s':>10}{'p99 s':>10}{'peak RSS MB':>14}")
+        for mode in args.modes.split(","):
+            lat, errors, peak = run_mode(mode, serials)
+            print(f"{mode:<10}{errors:>8}{statistics.median(lat):>10.2f}{percentile(lat, 99):>10.2f}{peak:>14.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""
+HP browser throughput per GB of RAM: one lookup per Chrome vs several tabs per Chrome.
+
+Starts the local HP stand-in and runs browser lookups through the pool with each
+BROWSERSxTABS layout (HP_BROWSER_POOL_SIZE x HP_BROWSER_TABS), keeping every tab
+busy. Reports lookups/s, peak RSS of this process plus chromedriver and Chrome, and
+lookups/s per GB. 1x1 is the single-driver design. Needs Chrome + chromedriver installed.
+
+Usage:
+    python -m bench.hp_tabs --lookups 40 --layouts 1x1,4x1,1x4,2x4
+"""
+import argparse
+import importlib
+import os
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from bench._util import rss_mb, serve
+
+
+def run_layout(layout, lookups):
+    browsers, tabs = (int(n) for n in layout.split("x"))
+    os.environ.update({"HP_BROWSER_POOL_SIZE": str(browsers), "HP_BROWSER_TABS": str(tabs),
+                       "HP_BROWSER_MAX_WAITERS": str(lookups)})
+    import ultra_fast_warranty
+    uf = importlib.reload(ultra_fast_warranty)
+    slots = browsers * tabs
+    peak = [0.0]
+    done = threading.Event()
+
+    def sample():
+        while not done.is_set():
+            peak[0] = max(peak[0], rss_mb())
+            time.sleep(0.2)
+
+    sampler = threading.Thread(target=sample, daemon=True)
+    try:
+        with ThreadPoolExecutor(max_workers=slots) as executor:
+            # Start every browser and tab before measuring
+            list(executor.map(uf.extract_warranty_ultra_fast, [f"5CDW{i:06d}" for i in range(slots)]))
+            sampler.start()
+            start = time.perf_counter()
+            results = list(executor.map(lambda i: _timed(uf, f"5CD{i:07d}"), range(lookups)))
+            elapsed = time.perf_counter() - start
+    finally:
+        done.set()
+        uf.shutdown_browsers()
+    latencies = [latency for latency, _ in results]
+    errors = sum(1 for _, result in results if "error" in result)
+    return lookups / elapsed, peak[0], statistics.median(latencies), errors
+
+
+def _timed(uf, serial):
+    start = time.perf_counter()
+    result = uf.extract_warranty_ultra_fast(serial)
+    return time.perf_counter() - start, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--lookups", type=int, default=40)
+    parser.add_argument("--layouts", default="1x1,4x1,1x4,2x4", help="comma-separated BROWSERSxTABS")
+    parser.add_argument("--latency-ms", type=float, default=150, help="stand-in API latency")
+    args = parser.parse_args()
+
+    env = {"STANDIN_LATENCY_MS": str(args.latency_ms)}
+    with serve("standins.hp:app", env=env) as (base_url, _):
+        os.environ.update({"HP_BASE_URL": base_url, "HP_WARRANTY_API": "0", "HP_WARM_BROWSERS": "0",
+                           "HP_BROWSER_ACQUIRE_TIMEOUT": "300"})
+        os.environ.setdefault("RATE_LIMIT_HP_BROWSER", "0")
+        print(f"{'layout':<8}{'errors':>8}{'lookups/s':>11}{'p50 s':>8}{'peak RSS MB':>13}{'lookups/s/GB':>14}")
+        for layout in args.layouts.split(","):
+            rate, peak, p50, errors = run_layout(layout, args.lookups)
+            print(f"{layout:<8}{errors:>8}{rate:>11.2f}{p50:>8.2f}{peak:>13.0f}{rate / (peak / 1024):>14.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""
+Lenovo lookup throughput: per-call `requests` (thread pool) vs the pooled async client.
+
+Starts the local Lenovo stand-in and reports lookups/s and lookups per CPU-second of
+this process for both implementations. --tls serves the stand-in over HTTPS with a
+throwaway self-signed certificate (needs the openssl CLI), which is where connection
+reuse pays off: the real pcsupport.lenovo.com is HTTPS-only.
+
+Usage:
+    python -m bench.lenovo_client --lookups 2000 --concurrency 32 --latency-ms 20 --tls
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import os
+import subprocess
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from bench._util import serve
+
+
+def run_sync(serials, concurrency):
+    import warrantylenovoo
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        return list(pool.map(warrantylenovoo.get_lenovo_warranty_info, serials))
+
+
+async def run_async(serials, concurrency):
+    import lenovo_client
+    sem = asyncio.Semaphore(concurrency)
+
+    async def one(sn):
+        async with sem:
+            return await lenovo_client.get_lenovo_warranty_info_async(sn)
+
+    try:
+        return await asyncio.gather(*(one(sn) for sn in serials))
+    finally:
+        await lenovo_client.close_client()
+
+
+def measure(name, func):
+    wall, cpu = time.perf_counter(), time.process_time()
+    # warrantylenovoo prints several lines per lookup; keep that out of the terminal
+    with contextlib.redirect_stdout(io.StringIO()):
+        results = func()
+    wall, cpu = time.perf_counter() - wall, time.process_time() - cpu
+    ok = sum(1 for r in results if isinstance(r, dict) and "data" in r)
+    print(f"{name:<22}{ok:>6}/{len(results):<6}{len(results) / wall:>12.1f}{len(results) / cpu:>16.1f}")
+
+
+def self_signed_cert(directory):
+    key, cert = os.path.join(directory, "key.pem"), os.path.join(directory, "cert.pem")
+    subprocess.run(
+        ["openssl", "req", "-x509", "-newkey", "rsa:2048", "-nodes", "-keyout", key, "-out", cert,
+         "-days", "1", "-subj", "/CN=127.0.0.1", "-addext", "subjectAltName=IP:127.0.0.1"],
+        check=True, capture_output=True,
+    )
+    return key, cert
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--lookups", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--latency-ms", type=float, default=20)
+    parser.add_argument("--tls", action="store_true", help="serve the stand-in over HTTPS")
+    args = parser.parse_args()
+
+    tmp = tempfile.TemporaryDirectory()
+    serve_args = ()
+    if args.tls:
+        key, cert = self_signed_cert(tmp.name)
+        serve_args = ("--ssl-keyfile", key, "--ssl-certfile", cert)
+        # Trusted by both requests and httpx
+        os.environ["REQUESTS_CA_BUNDLE"] = os.environ["SSL_CERT_FILE"] = cert
+
+    # warrantylenovoo still sends its hardcoded token, so don't enforce CSRF for the comparison
+    env = {"STANDIN_LATENCY_MS": str(args.latency_ms), "STANDIN_REQUIRE_CSRF": "0"}
+    with tmp, serve("standins.lenovo:app", env=env, args=serve_args, insecure=args.tls) as (base_url, _):
+        os.environ["LENOVO_BASE_URL"] = base_url
+        # Measure the client itself, not the upstream rate limits
+        os.environ.setdefault("RATE_LIMIT_LENOVO_PRODUCTS", "0")
+        os.environ.setdefault("RATE_LIMIT_LENOVO_IBASE", "0")
+        serials = [f"PF{i:06d}" for i in range(args.lookups)]
+        print(f"{'implementation':<22}{'ok':>13}{'lookups/s':>12}{'lookups/cpu-s':>16}")
+        measure("requests + threads", lambda: run_sync(serials, args.concurrency))
+        measure("async pooled client", lambda: asyncio.run(run_async(serials, args.concurrency)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,421 @@
+"""
+End-to-end load test: the API against the local Lenovo and HP stand-ins.
+
+Starts both stand-ins (latency drawn from --latency-dist, --error-rate of their API calls
+failing) and the API pointed at them, then drives GET /warranty/{serial} for --duration
+seconds after a --warmup. It drives either open-loop at --rate requests/s or closed-loop
+with --concurrency clients. In open-loop mode latency counts from each request's scheduled
+start, so requests queued behind a stalled app are not hidden.
+
+The report covers throughput, p50/p95/p99, and the answers per serial kind, flagging the
+ones that differ from what the stand-ins should produce. It also gives CPU and peak RSS
+for the API processes (plus the browser service with --browser-service) and for Chrome.
+--browser sends every HP lookup through the Chrome fallback against the stand-in's static
+result page (needs Chrome). Upstream rate limits and the result cache are off unless
+--rate-limits / --cache; --env passes further settings to the API.
+
+--save-baseline writes the run's config and results to a JSON file. --baseline compares a
+run against one and exits non-zero if any of these regresses by more than --tolerance
+percent: throughput, latency percentiles, CPU per request, peak RSS. The same happens if
+the share of unexpected answers grows by more than one point.
+
+Usage:
+    python -m bench.loadtest --rate 200 --duration 30 --save-baseline loadtest-baseline.json
+    python -m bench.loadtest --rate 200 --duration 30 --baseline loadtest-baseline.json
+    python -m bench.loadtest --concurrency 8 --mix hp:1 --browser --duration 60
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+import httpx
+
+from bench._util import cpu_seconds, percentile, process_name, process_tree, rss_mb, serve
+
+# What the API should answer each kind of serial with, given the stand-ins' behaviour
+EXPECTED_STATUS = {"lenovo": 200, "hp": 200, "notfound": 404, "unsupported": 400}
+RATE_LIMITED_ENDPOINTS = ("LENOVO_PRODUCTS", "LENOVO_IBASE", "HP_SEARCH", "HP_WARRANTY_API", "HP_BROWSER")
+# (result, higher is better) compared against the baseline
+COMPARED = (("throughput", True), ("p50_ms", False), ("p95_ms", False), ("p99_ms", False),
+            ("app_cpu_ms_per_request", False), ("app_peak_rss_mb", False), ("chrome_peak_rss_mb", False))
+
+
+def serial_for(kind, n):
+    """The n-th serial of a kind; all of them classify as intended (see brand_rules.py)"""
+    if kind == "lenovo":
+        return f"PF{n % 10 ** 6:06d}"
+    if kind == "hp":
+        return f"5CD{n % 10 ** 7:07d}"
+    if kind == "notfound":  # known brand, unknown to the stand-in; alternates Lenovo and HP
+        return f"1SNOTFOUND{n % 10 ** 10:010d}" if n % 2 else f"V8C9HNOTFOUND{n % 1000:03d}"
+    return f"ZZ{n % 10 ** 6:06d}"  # no brand rule matches
+
+
+def parse_mix(value):
+    mix = {}
+    for part in value.split(","):
+        kind, _, weight = part.partition(":")
+        if kind.strip() not in EXPECTED_STATUS:
+            raise argparse.ArgumentTypeError(f"unknown serial kind {kind!r} (expected {', '.join(EXPECTED_STATUS)})")
+        mix[kind.strip()] = float(weight or 1)
+    return mix
+
+
+class SerialSource:
+    """Serials in the --mix proportions, repeating after --serials distinct ones per kind (0 = never)"""
+
+    def __init__(self, mix, distinct, seed):
+        self.kinds, self.weights = list(mix), list(mix.values())
+        self.distinct = distinct
+        self._counts = dict.fromkeys(mix, 0)
+        self._random = random.Random(seed)
+
+    def next(self):
+        kind = self._random.choices(self.kinds, self.weights)[0]
+        n = self._counts[kind]
+        self._counts[kind] += 1
+        return kind, serial_for(kind, n % self.distinct if self.distinct else n)
+
+
+class Results:
+    def __init__(self):
+        self.latencies = []
+        self.answers = {}  # (kind, status or error name) -> count
+        self.last_done = 0.0
+
+    def add(self, kind, outcome, latency, done):
+        self.answers[kind, outcome] = self.answers.get((kind, outcome), 0) + 1
+        if latency is not None:
+            self.latencies.append(latency)
+        self.last_done = max(self.last_done, done)
+
+    def unexpected(self):
+        return sum(count for (kind, outcome), count in self.answers.items() if outcome != EXPECTED_STATUS[kind])
+
+
+async def one(client, kind, serial, start, results):
+    """One request; latency counts from `start` (its scheduled time). `results` None = warm-up."""
+    loop = asyncio.get_running_loop()
+    try:
+        response = await client.get(f"/warranty/{serial}")
+        outcome = response.status_code
+    except httpx.HTTPError as e:
+        outcome = type(e).__name__
+    if results is not None:
+        done = loop.time()
+        results.add(kind, outcome, done - start, done)
+
+
+async def run_rate(client, source, rate, warmup, duration, max_in_flight, results):
+    """Open loop: request i starts at i / rate; beyond max_in_flight outstanding, it is dropped"""
+    loop = asyncio.get_running_loop()
+    start = loop.time()
+    measure_from, end = start + warmup, start + warmup + duration
+    tasks = set()
+    i = 0
+    while True:
+        scheduled = start + i / rate
+        if scheduled >= end:
+            break
+        i += 1
+        if scheduled > loop.time():
+            await asyncio.sleep(scheduled - loop.time())
+        kind, serial = source.next()
+        measured = results if scheduled >= measure_from else None
+        if len(tasks) >= max_in_flight:
+            if measured is not None:
+                measured.add(kind, "dropped", None, loop.time())
+            continue
+        task = asyncio.create_task(one(client, kind, serial, scheduled, measured))
+        tasks.add(task)
+        task.add_done_callback(tasks.discard)
+    await asyncio.gather(*tasks)
+    return measure_from
+
+
+async def run_concurrency(client, source, concurrency, warmup, duration, results):
+    """Closed loop: `concurrency` clients each send their next request as soon as one returns"""
+    loop = asyncio.get_running_loop()
+    measure_from = loop.time() + warmup
+    end = measure_from + duration
+
+    async def worker():
+        while loop.time() < end:
+            kind, serial = source.next()
+            start = loop.time()
+            await one(client, kind, serial, start, results if start >= measure_from else None)
+
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return measure_from
+
+
+async def drive(base_url, args, source, on_measure):
+    results = Results()
+    limits = httpx.Limits(max_connections=args.connections, max_keepalive_connections=args.connections)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=args.request_timeout) as client:
+        loop = asyncio.get_running_loop()
+        loop.call_later(args.warmup, on_measure)
+        if args.rate:
+            measure_from = await run_rate(client, source, args.rate, args.warmup, args.duration,
+                                          args.max_in_flight, results)
+        else:
+            measure_from = await run_concurrency(client, source, args.concurrency, args.warmup, args.duration, results)
+    elapsed = max(args.duration, results.last_done - measure_from)
+    return results, elapsed
+
+
+class ResourceSampler(threading.Thread):
+    """CPU seconds and peak RSS of process trees, split into the API's processes and Chrome's"""
+
+    def __init__(self, roots, interval=0.25):
+        super().__init__(daemon=True)
+        self.roots = roots
+        self.interval = interval
+        self._done = threading.Event()
+        self._lock = threading.Lock()
+        self.reset()
+
+    @staticmethod
+    def group(pid):
+        return "chrome" if "chrome" in process_name(pid).lower() else "app"
+
+    def reset(self):
+        """Start measuring: CPU used so far and earlier peaks no longer count"""
+        with self._lock:
+            self._first, self._last, self._groups = {}, {}, {}
+            for root in self.roots:
+                for pid in process_tree(root):
+                    self._first[pid] = self._last[pid] = cpu_seconds(pids=[pid])
+                    self._groups[pid] = self.group(pid)
+            self.peak_rss = {"app": 0.0, "chrome": 0.0}
+            self.peak_chrome_processes = 0
+
+    def sample(self):
+        rss = {"app": 0.0, "chrome": 0.0}
+        chrome_processes = 0
+        with self._lock:
+            for root in self.roots:
+                for pid in process_tree(root):
+                    group = self._groups.setdefault(pid, self.group(pid))
+                    self._first.setdefault(pid, 0.0)  # started since reset()
+                    self._last[pid] = max(self._last.get(pid, 0.0), cpu_seconds(pids=[pid]))
+                    rss[group] += rss_mb(pids=[pid])
+                    chrome_processes += group == "chrome"
+            for group, mb in rss.items():
+                self.peak_rss[group] = max(self.peak_rss[group], mb)
+            self.peak_chrome_processes = max(self.peak_chrome_processes, chrome_processes)
+
+    def cpu(self, group):
+        with self._lock:
+            return sum(self._last[pid] - self._first[pid] for pid, g in self._groups.items()
+                       if g == group and pid in self._last)
+
+    def run(self):
+        while not self._done.wait(self.interval):
+            self.sample()
+
+    def stop(self):
+        self._done.set()
+        self.join()
+        self.sample()
+
+
+def standin_stats(url):
+    try:
+        return httpx.get(f"{url}/standin/stats", timeout=5).json()
+    except (httpx.HTTPError, ValueError):
+        return {}
+
+
+def summarize(results, elapsed, sampler, client_cpu):
+    requests = sum(results.answers.values())
+    latencies = results.latencies or [0.0]
+    app_cpu, chrome_cpu = sampler.cpu("app"), sampler.cpu("chrome")
+    return {
+        "requests": requests,
+        "throughput": round(len(results.latencies) / elapsed, 1),
+        "p50_ms": round(percentile(latencies, 50) * 1000, 1),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 1),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 1),
+        "max_ms": round(max(latencies) * 1000, 1),
+        "unexpected": results.unexpected(),
+        "unexpected_rate": round(results.unexpected() / requests, 4) if requests else 0.0,
+        "answers": {f"{kind} {outcome}": count for (kind, outcome), count in sorted(results.answers.items(), key=str)},
+        "app_cores": round(app_cpu / elapsed, 2),
+        "app_cpu_ms_per_request": round(app_cpu * 1000 / requests, 2) if requests else 0.0,
+        "app_peak_rss_mb": round(sampler.peak_rss["app"], 1),
+        "chrome_cores": round(chrome_cpu / elapsed, 2),
+        "chrome_peak_rss_mb": round(sampler.peak_rss["chrome"], 1),
+        "chrome_peak_processes": sampler.peak_chrome_processes,
+        "client_cores": round(client_cpu / elapsed, 2),
+    }
+
+
+def print_report(config, summary, upstream):
+    drive = f"rate {config['rate']}/s" if config["rate"] else f"concurrency {config['concurrency']}"
+    print(f"{'load':<16}{drive}, {config['duration']}s after {config['warmup']}s warm-up, mix {config['mix']}")
+    print(f"{'throughput':<16}{summary['throughput']} req/s ({summary['requests']} requests)")
+    print(f"{'latency ms':<16}p50 {summary['p50_ms']}  p95 {summary['p95_ms']}  p99 {summary['p99_ms']}"
+          f"  max {summary['max_ms']}")
+    for label, count in summary["answers"].items():
+        kind, outcome = label.split(" ", 1)
+        flag = "" if outcome == str(EXPECTED_STATUS[kind]) else "  (unexpected)"
+        print(f"{'answers':<16}{label}: {count}{flag}")
+    print(f"{'unexpected':<16}{summary['unexpected']} ({summary['unexpected_rate']:.2%})")
+    print(f"{'api':<16}{summary['app_cores']} cores, {summary['app_cpu_ms_per_request']} CPU ms/request, "
+          f"peak RSS {summary['app_peak_rss_mb']} MB")
+    print(f"{'chrome':<16}{summary['chrome_cores']} cores, peak RSS {summary['chrome_peak_rss_mb']} MB, "
+          f"up to {summary['chrome_peak_processes']} processes")
+    print(f"{'load generator':<16}{summary['client_cores']} cores"
+          + ("  (near one core: the client may be the bottleneck)" if summary["client_cores"] > 0.9 else ""))
+    for vendor, stats in upstream.items():
+        print(f"{'upstream':<16}{vendor} injected errors {stats.get('injected_errors', {})}")
+
+
+def compare(config, summary, baseline, tolerance):
+    """Print this run against a saved one; returns the regressed results"""
+    base_config, base = baseline["config"], baseline["results"]
+    changed = sorted(k for k in set(config) | set(base_config) if config.get(k) != base_config.get(k))
+    print(f"\nBaseline ({baseline.get('saved_at', 'unknown date')})")
+    if changed:
+        print("  config differs: " + ", ".join(f"{k} {base_config.get(k)!r} -> {config.get(k)!r}" for k in changed))
+    regressed = []
+    for name, higher_is_better in COMPARED:
+        old, new = base.get(name), summary[name]
+        if not old:
+            continue
+        change = (new - old) / old * 100
+        worse = -change if higher_is_better else change
+        if worse > tolerance:
+            regressed.append(name)
+        print(f"  {name:<24}{old:>10}{new:>10}{change:>+9.1f}%{'  REGRESSED' if worse > tolerance else ''}")
+    old, new = base.get("unexpected_rate", 0.0), summary["unexpected_rate"]
+    if new - old > 0.01:
+        regressed.append("unexpected_rate")
+    print(f"  {'unexpected_rate':<24}{old:>10.2%}{new:>10.2%}{'  REGRESSED' if new - old > 0.01 else ''}")
+    return regressed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    load = parser.add_mutually_exclusive_group()
+    load.add_argument("--rate", type=float, help="open loop: requests/s (default 100)")
+    load.add_argument("--concurrency", type=int, help="closed loop: concurrent clients")
+    parser.add_argument("--duration", type=float, default=30, help="measured seconds")
+    parser.add_argument("--warmup", type=float, default=5, help="seconds of load before measuring")
+    parser.add_argument("--mix", type=parse_mix, default="lenovo:0.45,hp:0.45,notfound:0.1",
+                        help="serial kinds and weights: lenovo, hp, notfound, unsupported")
+    parser.add_argument("--serials", type=int, default=0, help="distinct serials per kind, then repeat (0 = never)")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--latency-ms", type=float, default=50, help="mean stand-in latency per call")
+    parser.add_argument("--lenovo-latency-ms", type=float, help="Lenovo stand-in only (default --latency-ms)")
+    parser.add_argument("--hp-latency-ms", type=float, help="HP stand-in only (default --latency-ms)")
+    parser.add_argument("--latency-dist", default="lognormal", help="fixed, uniform, normal, lognormal, exponential")
+    parser.add_argument("--latency-spread-ms", type=float, help="uniform half-width / standard deviation "
+                                                                "(default half the mean)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="share of stand-in API calls that fail")
+    parser.add_argument("--error-status", default="500", help="comma-separated statuses for those failures")
+    parser.add_argument("--render-delay-ms", type=float, default=300, help="HP result page render delay")
+    parser.add_argument("--browser", action="store_true", help="HP lookups through the Chrome fallback")
+    parser.add_argument("--browser-service", action="store_true", help="run HP browsers in browser_service.py")
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn worker processes")
+    parser.add_argument("--cache", action="store_true", help="keep the result cache on")
+    parser.add_argument("--rate-limits", action="store_true", help="keep the upstream rate limits on")
+    parser.add_argument("--env", action="append", default=[], metavar="KEY=VALUE", help="extra API setting")
+    parser.add_argument("--connections", type=int, default=256, help="client connection pool size")
+    parser.add_argument("--max-in-flight", type=int, default=2000, help="open loop: outstanding requests cap")
+    parser.add_argument("--request-timeout", type=float, default=120)
+    parser.add_argument("--save-baseline", metavar="FILE")
+    parser.add_argument("--baseline", metavar="FILE")
+    parser.add_argument("--tolerance", type=float, default=10, help="percent change counted as a regression")
+    args = parser.parse_args()
+    if not args.concurrency and not args.rate:
+        args.rate = 100.0
+
+    def standin_env(latency):
+        return {"STANDIN_LATENCY_MS": str(latency), "STANDIN_LATENCY_DIST": args.latency_dist,
+                "STANDIN_LATENCY_SPREAD_MS": str(latency / 2 if args.latency_spread_ms is None else args.latency_spread_ms),
+                "STANDIN_ERROR_RATE": str(args.error_rate), "STANDIN_ERROR_STATUS": args.error_status,
+                "STANDIN_SEED": str(args.seed), "STANDIN_RENDER_DELAY_MS": str(args.render_delay_ms)}
+
+    lenovo_latency = args.latency_ms if args.lenovo_latency_ms is None else args.lenovo_latency_ms
+    hp_latency = args.latency_ms if args.hp_latency_ms is None else args.hp_latency_ms
+    app_env = {"WEB_CONCURRENCY": str(args.workers)}
+    if not args.cache:
+        app_env.update(CACHE_TTL_FOUND="0", CACHE_TTL_NEGATIVE="0")
+    if not args.rate_limits:
+        app_env.update({f"RATE_LIMIT_{name}": "0" for name in RATE_LIMITED_ENDPOINTS})
+    if args.browser:
+        app_env["HP_WARRANTY_API"] = "0"
+    else:
+        app_env["HP_WARM_BROWSERS"] = "0"
+    app_env.update(item.split("=", 1) for item in args.env)
+
+    config = {
+        "rate": args.rate, "concurrency": args.concurrency, "duration": args.duration, "warmup": args.warmup,
+        "mix": ",".join(f"{kind}:{weight:g}" for kind, weight in args.mix.items()), "serials": args.serials,
+        "lenovo_latency_ms": lenovo_latency, "hp_latency_ms": hp_latency, "latency_dist": args.latency_dist,
+        "latency_spread_ms": args.latency_spread_ms, "error_rate": args.error_rate, "error_status": args.error_status,
+        "browser": args.browser, "browser_service": args.browser_service, "workers": args.workers,
+        "env": dict(app_env),
+    }
+
+    tmp = tempfile.TemporaryDirectory()
+    service = None
+    with serve("standins.lenovo:app", env=standin_env(lenovo_latency)) as (lenovo_url, _), \
+            serve("standins.hp:app", env=standin_env(hp_latency)) as (hp_url, _):
+        app_env.update(LENOVO_BASE_URL=lenovo_url, HP_BASE_URL=hp_url)
+        roots = []
+        try:
+            if args.browser_service:
+                socket_path = os.path.join(tmp.name, "hp.sock")
+                app_env["HP_BROWSER_SOCKET"] = socket_path
+                service = subprocess.Popen([sys.executable, "browser_service.py"],
+                                           env=dict(os.environ, **app_env), stdout=subprocess.DEVNULL)
+                roots.append(service.pid)
+            with serve("main:app", env=app_env, ready_path="/ready",
+                       args=("--workers", str(args.workers))) as (base_url, app):
+                roots.append(app.pid)
+                sampler = ResourceSampler(roots)
+                sampler.start()
+                client_cpu_start = [0.0]
+
+                def on_measure():
+                    sampler.reset()
+                    client_cpu_start[0] = cpu_seconds(include_children=False)
+
+                source = SerialSource(args.mix, args.serials, args.seed)
+                results, elapsed = asyncio.run(drive(base_url, args, source, on_measure))
+                client_cpu = cpu_seconds(include_children=False) - client_cpu_start[0]
+                sampler.stop()
+        finally:
+            if service is not None:
+                service.terminate()
+                service.wait(timeout=30)
+        upstream = {"lenovo": standin_stats(lenovo_url), "hp": standin_stats(hp_url)}
+
+    summary = summarize(results, elapsed, sampler, client_cpu)
+    print()
+    print_report(config, summary, upstream)
+
+    if args.save_baseline:
+        with open(args.save_baseline, "w") as f:
+            json.dump({"saved_at": time.strftime("%Y-%m-%d %H:%M:%S"), "config": config, "results": summary}, f, indent=2)
+        print(f"\nBaseline saved to {args.save_baseline}")
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressed = compare(config, summary, json.load(f), args.tolerance)
+        if regressed:
+            print(f"\nRegressed: {', '.join(regressed)}", file=sys.stderr)
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+"""
+Offline full-stack throughput from recorded upstream traffic.
+
+Runs the API once with UPSTREAM_RECORDING=record against the local Lenovo and HP
+stand-ins, then again with UPSTREAM_RECORDING=replay and the stand-ins stopped, driving
+both with the same serials. Caching is off so every request reaches the vendor clients.
+Reports requests/s and latency for each run and fails if any replayed answer differs
+from the recorded one. --recording replays an existing file instead, with the base URLs
+it was recorded with (LENOVO_BASE_URL, HP_BASE_URL) taken from the environment.
+
+Usage:
+    python -m bench.replay --serials 200 --requests 5000 --concurrency 64
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+import httpx
+
+from bench._util import percentile, serve
+
+# No caching and no upstream rate limits: measure the app, not the vendors' budgets
+APP_ENV = {"CACHE_TTL_FOUND": "0", "CACHE_TTL_NEGATIVE": "0", "WARM_PROVIDERS": "Lenovo",
+           **{f"RATE_LIMIT_{name}": "0" for name in ("LENOVO_PRODUCTS", "LENOVO_IBASE", "HP_SEARCH",
+                                                      "HP_WARRANTY_API", "HP_BROWSER")}}
+
+
+def make_serials(count):
+    """Alternating Lenovo and HP serials, with every tenth one unknown"""
+    serials = []
+    for i in range(count):
+        missing = "NOTFOUND" if i % 10 == 9 else ""
+        serials.append(f"PF{missing}{i:06d}" if i % 2 else f"5CD{missing}{i:07d}")
+    return serials
+
+
+async def drive(base_url, serials, total, concurrency):
+    results, latencies = {}, []
+    queue = iter(range(total))
+
+    async def worker(client):
+        for i in queue:
+            serial = serials[i % len(serials)]
+            start = time.perf_counter()
+            response = await client.get(f"/warranty/{serial}")
+            latencies.append(time.perf_counter() - start)
+            results.setdefault(serial, set()).add((response.status_code, response.text))
+
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=60) as client:
+        start = time.perf_counter()
+        await asyncio.gather(*(worker(client) for _ in range(concurrency)))
+        elapsed = time.perf_counter() - start
+    return results, latencies, elapsed
+
+
+def report(name, latencies, elapsed):
+    print(f"{name:<10}{len(latencies) / elapsed:>10.1f}{percentile(latencies, 50) * 1000:>10.1f}"
+          f"{percentile(latencies, 99) * 1000:>10.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--serials", type=int, default=100)
+    parser.add_argument("--requests", type=int, default=2000, help="requests per run")
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--latency-ms", type=float, default=20, help="stand-in latency while recording")
+    parser.add_argument("--recording", help="replay this file instead of recording a new one")
+    args = parser.parse_args()
+
+    serials = make_serials(args.serials)
+    APP_ENV.update(LENOVO_CONCURRENCY=str(args.concurrency), HP_CONCURRENCY=str(args.concurrency))
+    tmp = tempfile.TemporaryDirectory()
+    path = args.recording or os.path.join(tmp.name, "upstream.jsonl")
+    print(f"{'run':<10}{'req/s':>10}{'p50 ms':>10}{'p99 ms':>10}")
+
+    # Replay matches full URLs, so it keeps the base URLs the traffic was recorded with
+    recorded, upstream = None, {}
+    if not args.recording:
+        standin_env = {"STANDIN_LATENCY_MS": str(args.latency_ms), "STANDIN_RENDER_DELAY_MS": "0"}
+        with serve("standins.lenovo:app", env=standin_env) as (lenovo_url, _), \
+                serve("standins.hp:app", env=standin_env) as (hp_url, _):
+            upstream = {"LENOVO_BASE_URL": lenovo_url, "HP_BASE_URL": hp_url}
+            env = dict(APP_ENV, UPSTREAM_RECORDING="record", UPSTREAM_RECORDING_FILE=path, **upstream)
+            with serve("main:app", env=env) as (base_url, _):
+                # Record each serial once, so replay answers are deterministic
+                recorded, _, _ = asyncio.run(drive(base_url, serials, len(serials), args.concurrency))
+                _, latencies, elapsed = asyncio.run(drive(base_url, serials, args.requests, args.concurrency))
+                report("live", latencies, elapsed)
+
+    env = dict(APP_ENV, UPSTREAM_RECORDING="replay", UPSTREAM_RECORDING_FILE=path, **upstream)
+    with serve("main:app", env=env) as (base_url, _):
+        replayed, latencies, elapsed = asyncio.run(drive(base_url, serials, args.requests, args.concurrency))
+        report("replay", latencies, elapsed)
+
+    if recorded is not None:
+        diffs = [serial for serial in serials if replayed.get(serial) != recorded.get(serial)]
+        print(f"\n{len(serials) - len(diffs)}/{len(serials)} serials answered as recorded")
+        if diffs:
+            print("differs:", ", ".join(diffs[:10]), file=sys.stderr)
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
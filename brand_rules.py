@@ -0,0 +1,170 @@
+import re
+
+# Brand detection from serial number patterns. The rules are a declarative table, checked
+# in order (first match wins), compiled once into per-length prefix tries plus an exact-match
+# table, so classifying a serial only looks at the rules its length and prefix can match.
+
+INVALID = "Dato no válido"
+UNKNOWN = "Desconocido"
+AMBIGUOUS_60 = "Desconocido (Ambiguo 60...)"
+
+INVALID_SERIALS = {"N/A", "", "DESKTOP", "NINGUNO", "USB有线鼠标"}
+
+# Exact serials that contradict the prefix rules below
+EXACT_SERIALS = {
+    "909NTUW7K902": "Dell",
+    "608NTEPC4988": "Dell",
+    "AQCI11A001192": "Dell",
+}
+
+
+def _dell_7char(serial):
+    # Dell service tags: 7 alphanumerics, letters and digits mixed (or all letters, e.g. SERVICE)
+    if not serial.isalnum() or serial.isdigit():
+        return False
+    return bool(re.search(r"[A-Z]", serial) and re.search(r"[0-9]", serial)) or serial.isalpha()
+
+
+def _lenovo_cn_part(serial):
+    return serial.count("-") >= 3
+
+
+def rule(brand, prefixes, lengths=None, min_length=None, check=None, exclude=()):
+    """
+    One table row: serials starting with any of `prefixes` whose length is in `lengths`
+    (or at least `min_length`), that don't start with an `exclude` prefix and pass `check`.
+    """
+    if isinstance(prefixes, str):
+        prefixes = (prefixes,)
+    return {"brand": brand, "prefixes": prefixes, "lengths": lengths, "min_length": min_length,
+            "check": check, "exclude": exclude}
+
+
+BRAND_RULES = [
+    # --- Dell ---
+    rule("Dell", "ZZQYH", lengths=(15,)),
+    rule("Dell", "", lengths=(7,), check=_dell_7char),
+    rule("Dell", "507NT", lengths=(12,)),  # 507NTLE9B712
+
+    # --- HP ---
+    rule("HP", ("CND", "MXL", "1CZ", "5CD", "4CE", "8CG", "3CM", "6CM", "1CR"), lengths=(10,)),  # 1CR9160GKM
+    rule("HP", "APBH", lengths=(13,)),
+    rule("HP", "V8C9H", lengths=(16,)),
+    rule("HP", "AQCI", lengths=(13,)),  # AQCI11A001006
+    rule("HP", ("011UX", "603NT", "312ND", "610NT", "409ND", "505NT", "107LT", "808NT"), lengths=(12,)),
+    rule("HP", "909NT", lengths=(12,), exclude=("909NTNHJ",)),  # 909NTXR5K026; 909NTNHJ is Lenovo
+
+    # --- Lenovo ---
+    rule("Lenovo", "20MK", lengths=(8,)),
+    rule("Lenovo", ("CN-0", "CN-O"), min_length=21, check=_lenovo_cn_part),
+    rule("Lenovo", "1S", lengths=(20, 22, 24)),
+    rule("Lenovo", "8SS", lengths=(24,)),
+    rule("Lenovo", ("MJ", "PC", "YL", "S1", "PW", "LR", "V5TD", "VNA", "V90C", "V5TW"), lengths=(8,)),
+    rule("Lenovo", "PF", lengths=(8, 10), check=str.isalnum),
+    rule("Lenovo", "CN", lengths=(10,), exclude=("CND",)),  # CN405225XM
+    rule("Lenovo", ("105NT", "608NT", "506NT", "908NT", "909NTNHJ", "605NT"), lengths=(12,)),
+    rule("Lenovo", "0ATS", lengths=(15,)),
+    rule("Lenovo", "UK0A", lengths=(17,)),  # UK0A1615013283BKK
+
+    # --- Acer ---
+    rule("Acer", "NHQ", min_length=16),
+
+    # --- Ambiguous ---
+    rule(AMBIGUOUS_60, "60", lengths=(12,)),
+]
+
+
+def normalizar_serial(serial_number):
+    """Canonical form of a serial: trimmed, upper-case, no newlines or surrounding quotes"""
+    if not serial_number or not isinstance(serial_number, str):
+        return ""
+    serial = serial_number.strip().upper()
+    serial = serial.replace("\n", "")
+    if serial.startswith('"') and serial.endswith('"'):
+        serial = serial[1:-1]
+    return serial
+
+
+def _new_node():
+    return ({}, [])  # (children by character, rules ending here)
+
+
+def _insert(trie, prefix, entry):
+    node = trie
+    for char in prefix:
+        node = node[0].setdefault(char, _new_node())
+    node[1].append(entry)
+
+
+class BrandClassifier:
+    """A rule table compiled into exact matches plus prefix tries bucketed by serial length"""
+
+    def __init__(self, rules=BRAND_RULES, exact=EXACT_SERIALS, invalid=INVALID_SERIALS):
+        self._exact = dict(exact)
+        for serial in invalid:
+            self._exact[serial] = INVALID
+        self._by_length = {}  # length -> trie for rules with fixed lengths
+        self._open = {}  # min_length -> trie for rules with a minimum length
+        for priority, row in enumerate(rules):
+            entry = (priority, row["brand"], row["check"], row["exclude"])
+            if row["lengths"] is not None:
+                tries = [self._by_length.setdefault(n, _new_node()) for n in row["lengths"]]
+            else:
+                tries = [self._open.setdefault(row["min_length"], _new_node())]
+            for trie in tries:
+                for prefix in row["prefixes"]:
+                    _insert(trie, prefix, entry)
+        self._open = sorted(self._open.items())
+
+    def _match(self, serial):
+        """Brand for an already normalized serial"""
+        brand = self._exact.get(serial)
+        if brand is not None:
+            return brand
+        length = len(serial)
+        tries = [self._by_length[length]] if length in self._by_length else []
+        tries.extend(trie for min_length, trie in self._open if length >= min_length)
+        best, brand = None, UNKNOWN
+        for trie in tries:
+            node = trie
+            depth = 0
+            while True:
+                for priority, rule_brand, check, exclude in node[1]:
+                    if best is not None and priority >= best:
+                        continue
+                    if exclude and serial.startswith(exclude):
+                        continue
+                    if check is not None and not check(serial):
+                        continue
+                    best, brand = priority, rule_brand
+                if depth == length:
+                    break
+                node = node[0].get(serial[depth])
+                if node is None:
+                    break
+                depth += 1
+        return brand
+
+    def classify(self, serial_number):
+        if not serial_number or not isinstance(serial_number, str):
+            return INVALID
+        return self._match(normalizar_serial(serial_number))
+
+    def classify_many(self, serial_numbers):
+        """Classify an iterable of serials; repeated serials are only matched once"""
+        seen = {}
+        match = self._match
+        results = []
+        append = results.append
+        for serial_number in serial_numbers:
+            if not serial_number or not isinstance(serial_number, str):
+                append(INVALID)
+                continue
+            brand = seen.get(serial_number)
+            if brand is None:
+                brand = seen[serial_number] = match(normalizar_serial(serial_number))
+            append(brand)
+        return results
+
+
+classifier = BrandClassifier()
@@ -0,0 +1,385 @@
+import itertools
+import json
+import multiprocessing
+import os
+import signal
+import socket
+import socketserver
+import sys
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeout
+
+from metrics import observe_stage
+from tracing import current_span, current_trace_id
+
+# Out-of-process HP browsers. `python browser_service.py` runs HP_BROWSER_WORKERS worker
+# processes, each with its own browser pool, behind a Unix socket. API processes started with
+# HP_BROWSER_SOCKET set send their browser fallbacks there instead of running Chrome, so the
+# API can run several uvicorn workers and a crashing browser can't take one of them down.
+# Requests and responses are JSON lines; the service hands each lookup to the worker with the
+# fewest lookups in flight and restarts workers that die (the lookups a dead worker was
+# running answer 503). Browser capacity is HP_BROWSER_WORKERS x HP_BROWSER_POOL_SIZE x
+# HP_BROWSER_TABS lookups, independent of how many API workers share the service.
+
+HP_BROWSER_SOCKET = os.environ.get("HP_BROWSER_SOCKET", "")  # empty = browsers run in-process
+HP_BROWSER_WORKERS = int(os.environ.get("HP_BROWSER_WORKERS", "1"))
+HP_BROWSER_SERVICE_TIMEOUT = float(os.environ.get("HP_BROWSER_SERVICE_TIMEOUT", "120"))  # per lookup
+HP_BROWSER_SERVICE_WAIT = float(os.environ.get("HP_BROWSER_SERVICE_WAIT", "60"))  # at API startup
+
+
+# --- Client side (API processes) ---
+
+class BrowserServiceError(Exception):
+    pass
+
+
+def _connect(timeout):
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.settimeout(timeout)
+        sock.connect(HP_BROWSER_SOCKET)
+    except OSError:
+        sock.close()
+        raise
+    return sock
+
+
+def _exchange(sock, message):
+    """Send one request on a connected socket and return the response"""
+    sock.sendall(json.dumps(message).encode() + b"\n")
+    with sock.makefile("rb") as f:
+        line = f.readline()
+    if not line:
+        raise BrowserServiceError("browser service closed the connection")
+    return json.loads(line)
+
+
+def _request(message, timeout=10):
+    with _connect(timeout) as sock:
+        return _exchange(sock, message)
+
+
+def lookup(serial_number, direct_url, product_name, call):
+    """
+    The browser fallback, run by the browser service. Same result as a local browser lookup;
+    failures are marked on `call` and the worker's stage timings are recorded here.
+    """
+    message = {"op": "lookup", "serial_number": serial_number, "direct_url": direct_url,
+               "product_name": product_name, "trace_id": current_trace_id(),
+               "parent_id": getattr(current_span(), "span_id", None)}
+    try:
+        sock = _connect(HP_BROWSER_SERVICE_TIMEOUT)
+    except OSError as e:
+        print(f"[HP] Browser service unavailable: {e}", file=sys.stderr)
+        call.skip()  # our side is down, not HP
+        return {"error": f"HP browser service unavailable: {e}", "status": 503}
+    try:
+        with sock:
+            response = _exchange(sock, message)
+    except (OSError, ValueError, BrowserServiceError) as e:
+        print(f"[HP] Browser service request failed: {e}", file=sys.stderr)
+        call.fail()
+        return {"error": f"HP browser service request failed: {e}", "status": 503}
+
+    if "result" not in response:
+        # The worker died mid-lookup (Chrome or chromedriver took it down)
+        print(f"[HP] {response.get('error')}", file=sys.stderr)
+        call.fail()
+        return {"error": response.get("error", "HP browser worker failed"), "status": 503}
+    call.exclude(response["excluded"])
+    if response["skipped"]:
+        call.skip()
+    if response["failed"]:
+        call.fail()
+    for stage, seconds in response["stages"]:
+        observe_stage(stage, seconds)
+    return response["result"]
+
+
+_EMPTY_STATS = {"size": 0, "idle": 0, "in_use": 0, "waiting": 0}
+_stats_cache = {"at": 0.0, "stats": None, "refreshing": False}
+_stats_lock = threading.Lock()
+
+
+def _refresh_stats():
+    try:
+        fetched = _request({"op": "stats"}, timeout=5)
+    except (OSError, ValueError, BrowserServiceError) as e:
+        fetched = {**_EMPTY_STATS, "service": f"unavailable: {e}"}
+    with _stats_lock:
+        _stats_cache.update(at=time.monotonic(), stats=fetched, refreshing=False)
+
+
+def stats():
+    """
+    The service's pool stats as last fetched. Never waits on the socket (it is read from the
+    /stats and /metrics handlers on the event loop): once the value is a second old, a
+    background thread fetches a new one and the old one is returned meanwhile.
+    """
+    with _stats_lock:
+        if time.monotonic() - _stats_cache["at"] >= 1.0 and not _stats_cache["refreshing"]:
+            _stats_cache["refreshing"] = True
+            threading.Thread(target=_refresh_stats, name="browser-service-stats", daemon=True).start()
+        return _stats_cache["stats"] or {**_EMPTY_STATS, "service": "pending"}
+
+
+def wait_ready(timeout=HP_BROWSER_SERVICE_WAIT):
+    """Wait for the service to be up and done warming its browsers; returns the browsers it started"""
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            return _request({"op": "warm_up"}, timeout=max(1.0, deadline - time.monotonic()))["browsers"]
+        except (FileNotFoundError, ConnectionRefusedError):
+            if time.monotonic() >= deadline:
+                raise BrowserServiceError(f"no browser service listening on {HP_BROWSER_SOCKET}")
+            time.sleep(0.5)
+
+
+# --- Worker processes ---
+
+class _CallRecord:
+    """Stands in for the API process's circuit breaker call; the outcome is sent back to it"""
+
+    def __init__(self):
+        self.excluded = 0.0
+        self.skipped = False
+        self.failed = False
+
+    def exclude(self, seconds):
+        self.excluded += seconds
+
+    def skip(self):
+        self.skipped = True
+
+    def fail(self):
+        self.failed = True
+
+
+def _worker_main(conn, index, workers):
+    global HP_BROWSER_SOCKET
+    # Browsers are local in here, and the page-load rate limit is shared with the other workers
+    os.environ["HP_BROWSER_SOCKET"] = HP_BROWSER_SOCKET = ""
+    os.environ["RATE_LIMIT_PROCESSES"] = str(workers)
+    signal.signal(signal.SIGINT, signal.SIG_IGN)  # the service shuts workers down itself
+    import tracing
+    import ultra_fast_warranty as hp
+
+    if os.environ.get("TRACE_LOG_IDS", "1") == "1":
+        tracing.tag_logs()
+    warm = {"browsers": 0}
+    warmed = threading.Event()
+
+    def warm_up():
+        try:
+            warm["browsers"] = hp.warm_up_browsers()
+        except Exception as e:
+            print(f"[HP] Worker {index} warm-up failed: {e}", file=sys.stderr)
+        warmed.set()
+
+    def do_lookup(message):
+        record = _CallRecord()
+        with tracing.continued_trace("hp_browser", message.get("trace_id"), message.get("parent_id")) as root:
+            result = hp._lookup_with_browser(message["serial_number"], message.get("direct_url"),
+                                             message.get("product_name"), time.time(), record)
+        return {"result": result, "excluded": record.excluded, "skipped": record.skipped,
+                "failed": record.failed, "worker": index,
+                "stages": [(s.name, s.duration) for s in root.trace.spans if s is not root]}
+
+    def do_warm_up(message):
+        warmed.wait()
+        return {"browsers": warm["browsers"]}
+
+    handlers = {"lookup": do_lookup, "stats": lambda message: hp.pool_stats(), "warm_up": do_warm_up}
+    send_lock = threading.Lock()
+
+    def handle(request_id, message):
+        try:
+            response = handlers[message["op"]](message)
+        except Exception as e:
+            response = {"error": f"{type(e).__name__}: {e}"}
+        with send_lock:
+            conn.send((request_id, response))
+
+    threading.Thread(target=warm_up, name="hp-warm", daemon=True).start()
+    # Enough threads for every tab plus the pool's wait queue; the pool rejects beyond that
+    pool = hp._pool
+    executor = ThreadPoolExecutor(max_workers=pool.size * pool.tabs + pool.max_waiters + 2,
+                                  thread_name_prefix="hp-worker")
+    while True:
+        try:
+            request = conn.recv()
+        except EOFError:
+            break
+        if request is None:
+            break
+        executor.submit(handle, *request)
+    executor.shutdown(wait=False, cancel_futures=True)
+    hp.shutdown_browsers()
+
+
+# --- Service (supervisor) ---
+
+class _Worker:
+    def __init__(self, index):
+        self.index = index
+        self.process = None
+        self.conn = None
+        self.pending = {}  # request id -> Future
+        self.restarts = 0
+        self.lock = threading.Lock()
+
+
+def _merge_stats(all_stats):
+    """Sum per-worker pool stats (maxima stay maxima) and keep each worker's own under "workers" """
+    merged = {}
+    for stats in all_stats:
+        for key, value in stats.items():
+            if not isinstance(value, (int, float)) or isinstance(value, bool):
+                continue
+            if key == "tabs_per_browser" or key.endswith("_max"):
+                merged[key] = max(merged.get(key, value), value)
+            elif key == "last_used_seconds_ago":
+                merged[key] = min(merged.get(key, value), value)
+            else:
+                merged[key] = merged.get(key, 0) + value
+    checkouts = merged.get("checkouts", 0)
+    merged["wait_seconds_avg"] = round(merged.get("wait_seconds_total", 0.0) / checkouts, 3) if checkouts else 0.0
+    merged["workers"] = all_stats
+    return merged
+
+
+class BrowserService:
+    def __init__(self, path, workers):
+        self.path = path
+        self.workers = [_Worker(i) for i in range(max(1, workers))]
+        self._ids = itertools.count()
+        self._closed = False
+        self._context = multiprocessing.get_context("spawn")  # no threads or Chrome inherited
+        self.server = None
+
+    def _spawn(self, worker):
+        conn, child_conn = self._context.Pipe()
+        process = self._context.Process(target=_worker_main, args=(child_conn, worker.index, len(self.workers)),
+                                        name=f"hp-browser-{worker.index}", daemon=True)
+        process.start()
+        child_conn.close()
+        with worker.lock:
+            worker.process, worker.conn = process, conn
+        threading.Thread(target=self._read, args=(worker, conn, process), daemon=True).start()
+
+    def _read(self, worker, conn, process):
+        while True:
+            try:
+                request_id, response = conn.recv()
+            except (EOFError, OSError):
+                break
+            with worker.lock:
+                future = worker.pending.pop(request_id, None)
+            if future is not None:
+                future.set_result(response)
+        process.join(5)
+        with worker.lock:
+            pending, worker.pending = worker.pending, {}
+        for future in pending.values():
+            future.set_result({"error": f"HP browser worker {worker.index} exited mid-request"})
+        if self._closed:
+            return
+        print(f"[HP] Browser worker {worker.index} exited ({process.exitcode}), restarting", file=sys.stderr)
+        worker.restarts += 1
+        time.sleep(1)  # don't spin on a worker that dies at startup
+        self._spawn(worker)
+
+    def call(self, worker, message, timeout):
+        """Send `message` to `worker` and wait up to `timeout` seconds for its answer"""
+        future = Future()
+        with worker.lock:
+            request_id = next(self._ids)
+            worker.pending[request_id] = future
+            try:
+                worker.conn.send((request_id, message))
+            except (OSError, ValueError) as e:
+                worker.pending.pop(request_id, None)
+                return {"error": f"HP browser worker {worker.index} unavailable: {e}"}
+        try:
+            return future.result(timeout)
+        except FutureTimeout:
+            # A wedged worker must not hold this thread forever; a late answer is dropped by _read
+            with worker.lock:
+                worker.pending.pop(request_id, None)
+            return {"error": f"HP browser worker {worker.index} did not answer within {timeout:.0f}s"}
+
+    def handle(self, message):
+        op = message.get("op")
+        if op == "lookup":
+            worker = min(self.workers, key=lambda w: len(w.pending))
+            return self.call(worker, message, HP_BROWSER_SERVICE_TIMEOUT)
+        if op in ("stats", "warm_up"):
+            timeout = HP_BROWSER_SERVICE_WAIT if op == "warm_up" else 5
+            with ThreadPoolExecutor(max_workers=len(self.workers)) as executor:
+                responses = list(executor.map(lambda w: self.call(w, {"op": op}, timeout), self.workers))
+            if op == "warm_up":
+                return {"browsers": sum(r.get("browsers", 0) for r in responses)}
+            merged = _merge_stats([r for r in responses if "error" not in r])
+            merged["restarts"] = sum(w.restarts for w in self.workers)
+            return merged
+        return {"error": f"unknown op {op!r}"}
+
+    def start(self):
+        if os.path.exists(self.path):
+            os.unlink(self.path)  # left over from a previous run
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        for worker in self.workers:
+            self._spawn(worker)
+        self.server = _Server(self.path, _Handler)
+        self.server.service = self
+        print(f"[HP] Browser service listening on {self.path} with {len(self.workers)} workers", file=sys.stderr)
+
+    def close(self):
+        self._closed = True
+        if self.server is not None:
+            self.server.server_close()
+        for worker in self.workers:
+            try:
+                worker.conn.send(None)
+            except (OSError, ValueError):
+                pass
+        for worker in self.workers:
+            worker.process.join(10)
+            if worker.process.is_alive():
+                worker.process.terminate()
+        if os.path.exists(self.path):
+            os.unlink(self.path)
+
+
+class _Server(socketserver.ThreadingUnixStreamServer):
+    daemon_threads = True
+
+
+class _Handler(socketserver.StreamRequestHandler):
+    def handle(self):
+        for line in self.rfile:
+            try:
+                response = self.server.service.handle(json.loads(line))
+            except ValueError as e:
+                response = {"error": f"bad request: {e}"}
+            self.wfile.write(json.dumps(response, default=str).encode() + b"\n")
+            self.wfile.flush()
+
+
+def main():
+    if not HP_BROWSER_SOCKET:
+        sys.exit("Set HP_BROWSER_SOCKET to the Unix socket path to listen on")
+    service = BrowserService(HP_BROWSER_SOCKET, HP_BROWSER_WORKERS)
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+    service.start()
+    try:
+        service.server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        service.close()
+
+
+if __name__ == "__main__":
+    main()
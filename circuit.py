@@ -0,0 +1,187 @@
+import os
+import sys
+import threading
+import time
+from collections import deque
+
+# Circuit breakers for upstream stages (Lenovo, HP product API, HP warranty API, HP browser).
+# A breaker opens when too many recent calls failed or were slow, fails fast while open,
+# then lets a few probe calls through (half-open) and closes again if they succeed.
+# In detail: among the last CIRCUIT_WINDOW calls (once there are CIRCUIT_MIN_CALLS), a failure
+# share of CIRCUIT_FAILURE_RATE or a share of calls slower than the stage's slow_seconds of
+# CIRCUIT_SLOW_RATE opens it. After CIRCUIT_OPEN_SECONDS up to CIRCUIT_HALF_OPEN_PROBES probes
+# go through; it closes once all of them succeed, and a failed or slow probe reopens it.
+
+CIRCUIT_WINDOW = int(os.environ.get("CIRCUIT_WINDOW", "20"))
+CIRCUIT_MIN_CALLS = int(os.environ.get("CIRCUIT_MIN_CALLS", "10"))
+CIRCUIT_FAILURE_RATE = float(os.environ.get("CIRCUIT_FAILURE_RATE", "0.5"))
+CIRCUIT_SLOW_RATE = float(os.environ.get("CIRCUIT_SLOW_RATE", "0.8"))
+CIRCUIT_OPEN_SECONDS = float(os.environ.get("CIRCUIT_OPEN_SECONDS", "30"))
+CIRCUIT_HALF_OPEN_PROBES = int(os.environ.get("CIRCUIT_HALF_OPEN_PROBES", "2"))
+
+CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+
+class CircuitOpenError(Exception):
+    """The breaker is open; retry after `retry_after` seconds"""
+
+    def __init__(self, name, retry_after):
+        super().__init__(f"{name} is unavailable (circuit open), retry in {retry_after:.0f}s")
+        self.name = name
+        self.retry_after = retry_after
+
+
+class _Call:
+    """One guarded call: records success, or failure if the block raises or fail() was called"""
+
+    def __init__(self, breaker):
+        self.breaker = breaker
+        self.probe = False
+        self.failed = False
+        self.skipped = False
+        self.start = None
+
+    def __enter__(self):
+        self.probe = self.breaker._acquire()
+        self.start = time.monotonic()
+        return self
+
+    def fail(self):
+        self.failed = True
+
+    def exclude(self, seconds):
+        """Don't count `seconds` of local waiting (rate limits, pool checkout) as upstream latency"""
+        self.start += seconds
+
+    def skip(self):
+        """Don't count this call (e.g. it never reached the upstream)"""
+        self.skipped = True
+
+    def __exit__(self, exc_type, exc, tb):
+        if self.skipped or (exc_type is not None and not issubclass(exc_type, Exception)):
+            # Skipped, or cancelled/shut down before an outcome: don't count it
+            self.breaker._release(self.probe)
+        else:
+            self.breaker._record(not (self.failed or exc_type is not None),
+                                 time.monotonic() - self.start, self.probe)
+        return False
+
+
+class CircuitBreaker:
+    def __init__(self, name, slow_seconds, window=CIRCUIT_WINDOW, min_calls=CIRCUIT_MIN_CALLS,
+                 failure_rate=CIRCUIT_FAILURE_RATE, slow_rate=CIRCUIT_SLOW_RATE,
+                 open_seconds=CIRCUIT_OPEN_SECONDS, probes=CIRCUIT_HALF_OPEN_PROBES):
+        self.name = name
+        self.slow_seconds = slow_seconds
+        self.min_calls = min_calls
+        self.failure_rate = failure_rate
+        self.slow_rate = slow_rate
+        self.open_seconds = open_seconds
+        self.probes = probes
+        self.state = CLOSED
+        self._outcomes = deque(maxlen=window)  # (failed, slow) of recent calls
+        self._opened_at = 0.0
+        self._probes_in_flight = 0
+        self._probe_successes = 0
+        self._lock = threading.Lock()
+        self._stats = {"calls": 0, "failures": 0, "slow": 0, "rejected": 0, "opened": 0}
+
+    def call(self):
+        """Guard an upstream call: `with breaker.call() as call:` (raises CircuitOpenError when open)"""
+        return _Call(self)
+
+    def _retry_after(self, now):
+        if self.state == OPEN:
+            return max(1.0, self._opened_at + self.open_seconds - now)
+        return 1.0  # half-open with every probe slot taken
+
+    def _acquire(self):
+        """Return True if the call is a half-open probe; raise CircuitOpenError if it may not run"""
+        with self._lock:
+            now = time.monotonic()
+            if self.state == OPEN and now - self._opened_at >= self.open_seconds:
+                self.state = HALF_OPEN
+                self._probes_in_flight = 0
+                self._probe_successes = 0
+                print(f"[Circuit] {self.name} half-open, probing", file=sys.stderr)
+            if self.state == CLOSED:
+                return False
+            if self.state == HALF_OPEN and self._probes_in_flight < self.probes:
+                self._probes_in_flight += 1
+                return True
+            self._stats["rejected"] += 1
+            raise CircuitOpenError(self.name, self._retry_after(now))
+
+    def _release(self, probe):
+        if probe:
+            with self._lock:
+                self._probes_in_flight = max(0, self._probes_in_flight - 1)
+
+    def _record(self, ok, elapsed, probe):
+        slow = elapsed >= self.slow_seconds
+        with self._lock:
+            self._stats["calls"] += 1
+            self._stats["failures"] += 0 if ok else 1
+            self._stats["slow"] += 1 if slow else 0
+            if probe:
+                self._probes_in_flight = max(0, self._probes_in_flight - 1)
+                if self.state != HALF_OPEN:
+                    return
+                if not ok or slow:
+                    self._open("probe failed")
+                else:
+                    self._probe_successes += 1
+                    if self._probe_successes >= self.probes:
+                        self.state = CLOSED
+                        self._outcomes.clear()
+                        print(f"[Circuit] {self.name} closed", file=sys.stderr)
+                return
+            if self.state != CLOSED:
+                return  # a call that started before the breaker opened
+            self._outcomes.append((not ok, slow))
+            calls = len(self._outcomes)
+            if calls < self.min_calls:
+                return
+            failures = sum(failed for failed, _ in self._outcomes)
+            slows = sum(was_slow for _, was_slow in self._outcomes)
+            if failures / calls >= self.failure_rate:
+                self._open(f"{failures}/{calls} recent calls failed")
+            elif slows / calls >= self.slow_rate:
+                self._open(f"{slows}/{calls} recent calls slower than {self.slow_seconds:.0f}s")
+
+    def _open(self, reason):
+        self.state = OPEN
+        self._opened_at = time.monotonic()
+        self._stats["opened"] += 1
+        print(f"[Circuit] {self.name} open for {self.open_seconds:.0f}s: {reason}", file=sys.stderr)
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats["state"] = self.state
+            if self.state == OPEN:
+                stats["retry_after"] = round(self._retry_after(time.monotonic()), 1)
+            return stats
+
+
+_breakers = {}
+_breakers_lock = threading.Lock()
+
+
+def get_breaker(name, slow_seconds):
+    """
+    The shared breaker for an upstream stage. CIRCUIT_SLOW_SECONDS_<NAME> overrides the
+    stage's default slow-call threshold.
+    """
+    with _breakers_lock:
+        breaker = _breakers.get(name)
+        if breaker is None:
+            env = "CIRCUIT_SLOW_SECONDS_" + name.upper()
+            breaker = _breakers[name] = CircuitBreaker(name, float(os.environ.get(env, slow_seconds)))
+        return breaker
+
+
+def breaker_stats():
+    with _breakers_lock:
+        breakers = list(_breakers.values())
+    return {breaker.name: breaker.stats() for breaker in breakers}
@@ -0,0 +1,38 @@
+"""
+Gzip for streamed responses.
+
+Starlette's GZipMiddleware writes each streamed chunk into zlib and sends only what zlib
+happens to emit, so a batch NDJSON stream reaches gzip clients in one piece at the end.
+StreamingGZipMiddleware sync-flushes after every chunk instead: each line goes out as soon
+as it is produced, while the compression window still spans the whole stream.
+"""
+import zlib
+
+from fastapi.middleware.gzip import GZipMiddleware
+from starlette.datastructures import Headers
+from starlette.middleware.gzip import GZipResponder
+
+
+class _FlushingGZipResponder(GZipResponder):
+    """GZipResponder that sync-flushes zlib after every chunk of a streamed body"""
+
+    def apply_compression(self, body, *, more_body):
+        if not more_body:
+            return super().apply_compression(body, more_body=more_body)
+        self.gzip_file.write(body)
+        self.gzip_file.flush(zlib.Z_SYNC_FLUSH)
+        body = self.gzip_buffer.getvalue()
+        self.gzip_buffer.seek(0)
+        self.gzip_buffer.truncate()
+        return body
+
+
+class StreamingGZipMiddleware(GZipMiddleware):
+    """GZipMiddleware whose streamed responses (batch NDJSON) still arrive line by line"""
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http" and "gzip" in Headers(scope=scope).get("Accept-Encoding", ""):
+            responder = _FlushingGZipResponder(self.app, self.minimum_size, compresslevel=self.compresslevel)
+            await responder(scope, receive, send)
+            return
+        await super().__call__(scope, receive, send)
@@ -0,0 +1,381 @@
+import asyncio
+import csv
+import json
+import os
+import re
+import shutil
+import time
+import uuid
+
+# Background batch jobs for spreadsheet uploads (CSV/XLSX). The upload is streamed to
+# disk, rows are read a chunk at a time (the sheet is never held in memory), each chunk
+# goes through the batch lookup path and its results are appended to a CSV as it finishes.
+# Each job's status is kept in status.json next to its results, so every API worker can
+# answer for any job and finished jobs survive a restart. A job's process rewrites the file
+# at least every JOB_HEARTBEAT seconds; a queued/running job whose file went quiet for
+# three heartbeats was interrupted (its process died) and is reported as failed.
+
+SERIAL_HEADERS = {
+    "serial", "serial number", "serial_number", "serialnumber", "sn", "s/n",
+    "serie", "numero de serie", "número de serie",
+}
+RESULT_COLUMNS = ["row", "serial", "brand", "status", "product_name", "warranty_start", "warranty_end", "error"]
+UPLOAD_KINDS = {".csv": "csv", ".txt": "csv", ".xlsx": "xlsx"}
+FINISHED = ("done", "failed", "cancelled")
+JOB_HEARTBEAT = 10.0
+JOB_ID = re.compile(r"[0-9a-f]{32}")
+# Job attributes kept in status.json besides id, filename and kind
+SAVED_FIELDS = ("status", "total", "processed", "succeeded", "failed", "error",
+                "created_at", "started_at", "finished_at", "updated_at")
+# Cells opened in Excel/Sheets run as formulas when they start with one of these
+FORMULA_PREFIXES = ("=", "+", "-", "@", "\t", "\r")
+
+
+class JobError(Exception):
+    """Rejected upload; `status` is the HTTP status to answer with"""
+
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+def _iter_csv_rows(path):
+    with open(path, newline="", encoding="utf-8-sig", errors="replace") as f:
+        sample = f.read(4096)
+        f.seek(0)
+        try:
+            dialect = csv.Sniffer().sniff(sample, delimiters=",;\t|")
+        except csv.Error:
+            dialect = csv.excel  # single column or nothing to sniff
+        yield from csv.reader(f, dialect)
+
+
+def _xlsx_cell(value):
+    if value is None:
+        return ""
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))  # numeric serials come back as floats
+    return str(value)
+
+
+def _iter_xlsx_rows(path):
+    from openpyxl import load_workbook  # only needed for XLSX uploads
+
+    # read_only streams rows from the zip instead of building the whole workbook
+    workbook = load_workbook(path, read_only=True, data_only=True)
+    try:
+        for row in workbook.active.iter_rows(values_only=True):
+            yield [_xlsx_cell(value) for value in row]
+    finally:
+        workbook.close()
+
+
+def iter_serials(path, kind):
+    """
+    Yield (row_number, serial) from the upload's serial column (1-based sheet rows).
+    The column is found by header name; without a recognized header the first column is used
+    and the first row counts as data.
+    """
+    rows = _iter_xlsx_rows(path) if kind == "xlsx" else _iter_csv_rows(path)
+    column = 0
+    for row_number, row in enumerate(rows, start=1):
+        if row_number == 1:
+            header = [cell.strip().lower() for cell in row]
+            matches = [i for i, name in enumerate(header) if name in SERIAL_HEADERS]
+            if matches:
+                column = matches[0]
+                continue
+        serial = row[column].strip() if column < len(row) else ""
+        if serial:
+            yield row_number, serial
+
+
+def count_serials(path, kind):
+    return sum(1 for _ in iter_serials(path, kind))
+
+
+def _take(iterator, size):
+    chunk = []
+    for item in iterator:
+        chunk.append(item)
+        if len(chunk) >= size:
+            break
+    return chunk
+
+
+def _csv_cell(value):
+    """Text starting like a formula gets a leading ' so spreadsheets show it as text"""
+    if isinstance(value, str) and value.startswith(FORMULA_PREFIXES):
+        return "'" + value
+    return value
+
+
+def _result_row(item):
+    result = item.get("result") or {}
+    row = [
+        item["index"], item["serial"], item["brand"], item["status"],
+        result.get("Product Name", ""), result.get("Warranty Start", ""), result.get("Warranty End", ""),
+        item.get("error", ""),
+    ]
+    return [_csv_cell(value) for value in row]
+
+
+class Job:
+    def __init__(self, job_id, filename, kind, directory):
+        self.id = job_id
+        self.filename = filename
+        self.kind = kind
+        self.directory = directory
+        self.upload_path = os.path.join(directory, "upload." + kind)
+        self.results_path = os.path.join(directory, "results.csv")
+        self.status_path = os.path.join(directory, "status.json")
+        self.cancel_path = os.path.join(directory, "cancel")  # asks the job's process to cancel it
+        self.status = "queued"
+        self.total = None  # known once the upload has been counted
+        self.processed = 0
+        self.succeeded = 0
+        self.failed = 0
+        self.error = None
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.updated_at = self.created_at
+        self.task = None  # set in the process running the job; None for jobs read from disk
+        self._changed = asyncio.Event()
+
+    @classmethod
+    def load(cls, directory):
+        """The job saved in `directory`, or None if it has no (readable) status.json"""
+        try:
+            with open(os.path.join(directory, "status.json"), encoding="utf-8") as f:
+                saved = json.load(f)
+        except (OSError, ValueError):
+            return None
+        job = cls(saved["id"], saved["filename"], saved["kind"], directory)
+        for field in SAVED_FIELDS:
+            setattr(job, field, saved.get(field))
+        if job.status not in FINISHED and time.time() - job.updated_at > 3 * JOB_HEARTBEAT:
+            job.status = "failed"
+            job.error = "Interrupted: the API process running the job stopped"
+            job.finished_at = job.updated_at
+            job.save()
+        return job
+
+    def save(self):
+        """Write status.json (atomically, so readers in other processes never see half a file)"""
+        self.updated_at = time.time()
+        tmp_path = self.status_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({**self.to_dict(), "kind": self.kind, "updated_at": self.updated_at}, f)
+        os.replace(tmp_path, self.status_path)
+
+    def notify(self):
+        """Save the status and wake everyone waiting in wait_changed()"""
+        self.save()
+        self._changed.set()
+        self._changed = asyncio.Event()
+
+    async def wait_changed(self, timeout):
+        if self.task is None:
+            return await self._poll_changed(timeout)
+        try:
+            await asyncio.wait_for(self._changed.wait(), timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+
+    async def _poll_changed(self, timeout):
+        """wait_changed for a job run by another process: re-read status.json once a second"""
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            await asyncio.sleep(min(1.0, max(0.0, deadline - time.monotonic())))
+            current = Job.load(self.directory)
+            if current is not None and current.updated_at != self.updated_at:
+                for field in SAVED_FIELDS:
+                    setattr(self, field, getattr(current, field))
+                return True
+        return False
+
+    def to_dict(self):
+        percent = None
+        if self.total:
+            percent = round(100 * self.processed / self.total, 1)
+        elif self.total == 0 and self.status == "done":
+            percent = 100.0
+        return {
+            "id": self.id,
+            "filename": self.filename,
+            "status": self.status,
+            "total": self.total,
+            "processed": self.processed,
+            "succeeded": self.succeeded,
+            "failed": self.failed,
+            "percent": percent,
+            "error": self.error,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+        }
+
+
+class JobManager:
+    """
+    Runs upload jobs in the background, `max_running` at a time. `run_batch` is the API's
+    batch lookup: an async generator taking (index, serial) items and yielding result dicts.
+    """
+
+    def __init__(self, directory, run_batch, chunk_size=500, max_running=1,
+                 max_upload_bytes=50 * 1024 * 1024, retention=7 * 86400):
+        self.directory = directory
+        self.chunk_size = chunk_size
+        self.max_upload_bytes = max_upload_bytes
+        self.retention = retention  # finished jobs (and their files) are dropped after this
+        self._run_batch = run_batch
+        self._slots = asyncio.Semaphore(max_running)
+        self.jobs = {}  # the jobs this process runs (or ran)
+
+    async def submit(self, upload, filename):
+        """Save `upload` (anything with an async read(n)) to disk and queue a job for it"""
+        kind = UPLOAD_KINDS.get(os.path.splitext(filename or "")[1].lower())
+        if kind is None:
+            raise JobError("Upload a .csv or .xlsx file")
+        self.prune()
+        job_id = uuid.uuid4().hex
+        directory = os.path.join(self.directory, job_id)
+        os.makedirs(directory, exist_ok=True)
+        job = Job(job_id, filename, kind, directory)
+        try:
+            size = 0
+            with open(job.upload_path, "wb") as f:
+                while True:
+                    data = await upload.read(1024 * 1024)
+                    if not data:
+                        break
+                    size += len(data)
+                    if size > self.max_upload_bytes:
+                        raise JobError(f"Upload exceeds {self.max_upload_bytes} bytes", status=413)
+                    f.write(data)
+        except BaseException:
+            shutil.rmtree(directory, ignore_errors=True)
+            raise
+        self.jobs[job_id] = job
+        job.save()
+        job.task = asyncio.create_task(self._run(job))
+        print(f"[Jobs] Queued job {job_id} for {filename} ({size} bytes)")
+        return job
+
+    def get(self, job_id):
+        """This process's job, else the one saved in JOBS_DIR (another worker's, or from before a restart)"""
+        job = self.jobs.get(job_id)
+        if job is not None:
+            return job
+        if not JOB_ID.fullmatch(job_id):
+            return None
+        return Job.load(os.path.join(self.directory, job_id))
+
+    def cancel(self, job_id):
+        job = self.get(job_id)
+        if job is None or job.status in FINISHED:
+            return job
+        if job.task is not None:
+            job.task.cancel()
+        else:
+            # Run by another process: it checks for the marker after every chunk
+            with open(job.cancel_path, "w"):
+                pass
+        return job
+
+    def restore(self):
+        """At startup: settle jobs interrupted by the restart and drop expired ones; returns the jobs kept"""
+        self.prune()
+        return sum(1 for _ in self._saved_jobs())
+
+    def _saved_jobs(self):
+        try:
+            names = os.listdir(self.directory)
+        except FileNotFoundError:
+            return
+        for name in names:
+            if JOB_ID.fullmatch(name) and name not in self.jobs:
+                job = Job.load(os.path.join(self.directory, name))
+                if job is not None:
+                    yield job
+
+    async def _heartbeat(self, job):
+        while True:
+            await asyncio.sleep(JOB_HEARTBEAT)
+            job.save()
+
+    async def _run(self, job):
+        loop = asyncio.get_running_loop()
+        serials = None
+        heartbeat = asyncio.create_task(self._heartbeat(job))
+        try:
+            async with self._slots:
+                job.status = "running"
+                job.started_at = time.time()
+                job.notify()
+                # Parsing is blocking (XLSX especially), so it runs off the event loop
+                job.total = await loop.run_in_executor(None, count_serials, job.upload_path, job.kind)
+                job.notify()
+                serials = iter_serials(job.upload_path, job.kind)
+                with open(job.results_path, "w", newline="", encoding="utf-8") as out:
+                    writer = csv.writer(out)
+                    writer.writerow(RESULT_COLUMNS)
+                    while True:
+                        chunk = await loop.run_in_executor(None, _take, serials, self.chunk_size)
+                        if not chunk:
+                            break
+                        results = [item async for item in self._run_batch(chunk)]
+                        results.sort(key=lambda item: item["index"])  # keep sheet order in the output
+                        for item in results:
+                            writer.writerow(_result_row(item))
+                            if item["status"] == 200:
+                                job.succeeded += 1
+                            else:
+                                job.failed += 1
+                        out.flush()
+                        job.processed += len(results)
+                        job.notify()
+                        if os.path.exists(job.cancel_path):
+                            raise asyncio.CancelledError  # cancelled through another worker
+            job.status = "done"
+        except asyncio.CancelledError:
+            job.status = "cancelled"
+        except Exception as e:
+            print(f"[Jobs] Job {job.id} failed: {e}")
+            job.status = "failed"
+            job.error = str(e)
+        finally:
+            heartbeat.cancel()
+            if serials is not None:
+                try:
+                    serials.close()
+                except ValueError:
+                    pass  # still running in the executor after a cancel; it is dropped with the job
+            job.finished_at = time.time()
+            job.notify()
+        print(f"[Jobs] Job {job.id} {job.status}: {job.processed}/{job.total} rows")
+
+    def prune(self):
+        """Forget finished jobs older than `retention` and delete their files (any process's)"""
+        cutoff = time.time() - self.retention
+        for job_id, job in list(self.jobs.items()):
+            if job.status in FINISHED and job.finished_at < cutoff:
+                del self.jobs[job_id]
+                shutil.rmtree(job.directory, ignore_errors=True)
+        for job in self._saved_jobs():
+            if job.status in FINISHED and job.finished_at < cutoff:
+                shutil.rmtree(job.directory, ignore_errors=True)
+
+    async def close(self):
+        tasks = [job.task for job in self.jobs.values() if job.status not in FINISHED]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    def stats(self):
+        counts = {}
+        for job in self.jobs.values():
+            counts[job.status] = counts.get(job.status, 0) + 1
+        return counts
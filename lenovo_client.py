@@ -0,0 +1,185 @@
+import httpx
+import os
+import sys
+from circuit import get_breaker
+from metrics import stage_timer
+from ratelimit import get_limiter, limited_call_async
+from lenovo_session import LenovoSession
+import recording
+
+# Async Lenovo warranty lookup on a shared, pooled HTTP client.
+# Same two-step flow as warrantylenovoo.get_lenovo_warranty_info (getproducts -> getIbaseInfo),
+# but connections are kept alive and reused across lookups instead of opened per call.
+
+LENOVO_BASE_URL = os.environ.get("LENOVO_BASE_URL", "https://pcsupport.lenovo.com").rstrip("/")
+LENOVO_MAX_CONNECTIONS = int(os.environ.get("LENOVO_MAX_CONNECTIONS", "32"))
+LENOVO_KEEPALIVE_EXPIRY = float(os.environ.get("LENOVO_KEEPALIVE_EXPIRY", "60"))
+
+try:
+    import h2  # noqa: F401  (enables HTTP/2 in httpx)
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+GET_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/136.0.0.0 Safari/537.36',
+    'Accept-Language': 'en-US,en;q=0.9',
+    'Accept': 'application/json, text/javascript, */*; q=0.01',
+}
+
+POST_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/136.0.0.0 Safari/537.36',
+    'Accept': 'application/json, text/plain, */*',
+    'Content-Type': 'application/json',
+    'Origin': 'https://pcsupport.lenovo.com',
+    'x-requested-timezone': 'America/Lima',
+    'x-requested-with': 'XMLHttpRequest',
+}
+
+_client = None
+_session = None
+_breaker = get_breaker("lenovo", slow_seconds=10)
+_products_limiter = get_limiter("lenovo_products", rate=10, burst=20)
+_ibase_limiter = get_limiter("lenovo_ibase", rate=10, burst=20)
+
+
+def get_client():
+    """Return the shared AsyncClient, creating it on first use"""
+    global _client, _session
+    if _client is None or _client.is_closed:
+        # All traffic goes to one host, so max_connections is effectively the per-host limit
+        limits = httpx.Limits(
+            max_connections=LENOVO_MAX_CONNECTIONS,
+            max_keepalive_connections=LENOVO_MAX_CONNECTIONS,
+            keepalive_expiry=LENOVO_KEEPALIVE_EXPIRY,
+        )
+        _client = httpx.AsyncClient(
+            http2=HTTP2_AVAILABLE,
+            limits=limits,
+            timeout=httpx.Timeout(20, connect=5),
+            # Only set with UPSTREAM_RECORDING (record/replay); it then owns http2 and limits
+            transport=recording.httpx_transport("lenovo", http2=HTTP2_AVAILABLE, limits=limits),
+        )
+        _session = LenovoSession(_client, LENOVO_BASE_URL)
+    return _client
+
+
+def get_session():
+    """Return the shared LenovoSession (cookies + CSRF token)"""
+    get_client()
+    return _session
+
+
+async def close_client():
+    """Close the shared client and stop session refresh (called on app shutdown)"""
+    global _client, _session
+    if _session is not None:
+        await _session.close()
+        _session = None
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
+
+def parse_product(data):
+    """Extract (model, product_id_full, machine_type_group) from a getproducts response"""
+    model = 'N/A'
+    product_id_full = None
+    machine_type_group = "N/A"
+    if isinstance(data, list) and len(data) > 0:
+        product_info = data[0]
+        model = product_info.get('Name', 'N/A')
+        product_id_full = product_info.get('Id')
+        if product_id_full:
+            # Path is typically /category/family/series/MACHINE_TYPE_GROUP/machine_type_specific/api_serial
+            path_parts = product_id_full.strip('/').split('/')
+            if len(path_parts) >= 3:
+                machine_type_group = path_parts[-3]
+    return model, product_id_full, machine_type_group
+
+
+async def get_lenovo_warranty_info_async(serial_number):
+    """
+    Async version of warrantylenovoo.get_lenovo_warranty_info.
+
+    Returns the raw getIbaseInfo JSON on success, a {"model", "warranties"} dict describing
+    the error when the product lookup or getIbaseInfo fails, or None if getproducts fails.
+    Raises CircuitOpenError without calling Lenovo while its circuit breaker is open.
+    """
+    with _breaker.call() as call:
+        return await _lookup(serial_number, call)
+
+
+async def _lookup(serial_number, call):
+    """The two Lenovo API calls; upstream failures are marked on the breaker `call`"""
+    client = get_client()
+    product_api_url = f"{LENOVO_BASE_URL}/us/en/api/v4/mse/getproducts"
+
+    # --- Step 1: Product ID, Model, and Machine Type Group ---
+    try:
+        async def get_products():
+            with stage_timer("lenovo_getproducts"):
+                return await client.get(product_api_url, params={"productId": serial_number},
+                                        headers=GET_HEADERS, timeout=15)
+
+        response_api = await limited_call_async(_products_limiter, get_products, call.exclude)
+        response_api.raise_for_status()
+        data = response_api.json()
+    except httpx.HTTPError as e:
+        print(f"[Lenovo] Error during product API request for {serial_number}: {e!r}", file=sys.stderr)
+        call.fail()
+        return None
+    except ValueError as e:
+        print(f"[Lenovo] Error decoding product API JSON response: {e}", file=sys.stderr)
+        call.fail()
+        return None
+
+    model, product_id_full, machine_type_group = parse_product(data)
+    if not product_id_full:
+        print(f"[Lenovo] Product not found or unexpected JSON structure for {serial_number}", file=sys.stderr)
+        return {"model": model, "warranties": [{"name": "Product API Error", "error_detail": "Product not found or unexpected structure.", "is_error": True}]}
+    if machine_type_group == "N/A":
+        return {"model": model, "warranties": [{"name": "Prerequisite Missing", "error_detail": "Machine Type Group or Product ID not available for getIbaseInfo.", "is_error": True}]}
+
+    # --- Step 2: getIbaseInfo (includes all warranties) ---
+    ibase_api_url = f"{LENOVO_BASE_URL}/us/en/api/v4/upsell/redport/getIbaseInfo"
+    headers = dict(POST_HEADERS)
+    headers['Referer'] = f"https://pcsupport.lenovo.com/us/en/products{product_id_full}/warranty/"
+    payload = {
+        "country": "us",
+        "language": "en",
+        "machineType": machine_type_group,
+        "serialNumber": serial_number
+    }
+
+    session = get_session()
+    try:
+        async def post_ibase():
+            with stage_timer("lenovo_getibaseinfo"):
+                return await client.post(ibase_api_url, headers={**headers, **session.headers()},
+                                         json=payload, timeout=20)
+
+        token = await session.ensure()
+        response_ibase_api = await limited_call_async(_ibase_limiter, post_ibase, call.exclude)
+        if response_ibase_api.status_code == 403:
+            # Token or cookies rejected: refresh once (shared with other callers) and retry,
+            # unless the session is backing off after failed bootstraps
+            print(f"[Lenovo] getIbaseInfo 403 for {serial_number}, refreshing session", file=sys.stderr)
+            if await session.refresh(stale_token=token) != token:
+                response_ibase_api = await limited_call_async(_ibase_limiter, post_ibase, call.exclude)
+        response_ibase_api.raise_for_status()
+        return response_ibase_api.json()
+    except httpx.HTTPStatusError as e:
+        status = e.response.status_code
+        print(f"[Lenovo] getIbaseInfo HTTP {status} for {serial_number}", file=sys.stderr)
+        error_detail = f"{e} | Status: {status}, Response: {e.response.text[:200]}"
+        call.fail()
+        return {"model": model, "warranties": [{"name": "IbaseAPI HTTP Error", "error_detail": error_detail, "is_error": True}]}
+    except httpx.HTTPError as e:
+        print(f"[Lenovo] getIbaseInfo request error for {serial_number}: {e!r}", file=sys.stderr)
+        call.fail()
+        return {"model": model, "warranties": [{"name": "IbaseAPI Request Error", "error_detail": str(e), "is_error": True}]}
+    except ValueError as e:
+        print(f"[Lenovo] Error decoding getIbaseInfo JSON response: {e}", file=sys.stderr)
+        call.fail()
+        return {"model": model, "warranties": [{"name": "IbaseAPI JSON Error", "error_detail": str(e), "is_error": True}]}
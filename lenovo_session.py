@@ -0,0 +1,148 @@
+import asyncio
+import os
+import re
+import sys
+import time
+
+# Long-lived pcsupport.lenovo.com session: cookies + x-csrf-token are fetched once from a
+# bootstrap page and shared by every lookup. A background task refreshes them before they
+# expire, and callers that get a 403 ask for one refresh and retry. Failed bootstraps back
+# off exponentially, and nobody bootstraps again until the backoff has passed.
+
+LENOVO_BOOTSTRAP_PATH = os.environ.get("LENOVO_BOOTSTRAP_PATH", "/us/en/")
+LENOVO_SESSION_TTL = float(os.environ.get("LENOVO_SESSION_TTL", "1800"))
+# Refresh this fraction of the TTL early so lookups never race an expiring token
+LENOVO_SESSION_REFRESH_MARGIN = float(os.environ.get("LENOVO_SESSION_REFRESH_MARGIN", "0.2"))
+# Wait after a failed bootstrap: doubles per consecutive failure, from MIN up to MAX seconds
+LENOVO_SESSION_RETRY_MIN = float(os.environ.get("LENOVO_SESSION_RETRY_MIN", "2"))
+LENOVO_SESSION_RETRY_MAX = float(os.environ.get("LENOVO_SESSION_RETRY_MAX", "300"))
+
+CSRF_PATTERNS = [
+    re.compile(r'<meta[^>]+name=["\']csrf-token["\'][^>]+content=["\']([^"\']+)["\']', re.I),
+    re.compile(r'<meta[^>]+content=["\']([^"\']+)["\'][^>]+name=["\']csrf-token["\']', re.I),
+    re.compile(r'["\']?(?:csrfToken|CSRFToken|x-csrf-token)["\']?\s*[:=]\s*["\']([A-Za-z0-9_\-+/=]{8,})["\']'),
+]
+CSRF_COOKIE_NAMES = ("XSRF-TOKEN", "csrf-token", "CSRF-TOKEN")
+
+BOOTSTRAP_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/136.0.0.0 Safari/537.36',
+    'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8',
+    'Accept-Language': 'en-US,en;q=0.9',
+}
+
+
+def extract_csrf_token(html, cookies=None):
+    """Find the CSRF token in a bootstrap page (meta tag or inline JS), falling back to cookies"""
+    for pattern in CSRF_PATTERNS:
+        m = pattern.search(html)
+        if m:
+            return m.group(1)
+    for name in CSRF_COOKIE_NAMES:
+        if cookies is not None and cookies.get(name):
+            return cookies.get(name)
+    return None
+
+
+class LenovoSession:
+    """Shared cookie jar + CSRF token for one httpx.AsyncClient"""
+
+    def __init__(self, client, base_url, ttl=LENOVO_SESSION_TTL, refresh_margin=LENOVO_SESSION_REFRESH_MARGIN):
+        self.client = client
+        self.base_url = base_url
+        self.ttl = ttl
+        self.refresh_margin = refresh_margin
+        self.token = None
+        self.fetched_at = 0.0
+        self.bootstraps = 0
+        self.failures = 0
+        self.consecutive_failures = 0
+        self.retry_at = 0.0  # no bootstrap before this time (after failures)
+        self._lock = asyncio.Lock()
+        self._refresh_task = None
+
+    @property
+    def expires_at(self):
+        return self.fetched_at + self.ttl
+
+    def is_fresh(self):
+        return self.token is not None and time.time() < self.expires_at
+
+    def backing_off(self):
+        return time.time() < self.retry_at
+
+    def headers(self):
+        """Per-request headers carrying the current token (cookies live in the client jar)"""
+        return {'x-csrf-token': self.token} if self.token else {}
+
+    async def ensure(self):
+        """Bootstrap on first use (or after expiry, unless backing off) and start background refresh"""
+        if not self.is_fresh() and not self.backing_off():
+            await self.refresh(stale_token=self.token)
+        if self._refresh_task is None or self._refresh_task.done():
+            self._refresh_task = asyncio.create_task(self._refresh_loop())
+        return self.token
+
+    async def refresh(self, stale_token=None):
+        """
+        Fetch new cookies and token. Concurrent callers that all saw the same stale token
+        share one bootstrap: whoever gets the lock second sees the token already changed.
+        While backing off after a failure, the current token (possibly None) is returned as is.
+        """
+        async with self._lock:
+            if self.token is not None and self.token != stale_token and self.is_fresh():
+                return self.token
+            if self.backing_off():
+                return self.token
+            url = f"{self.base_url}{LENOVO_BOOTSTRAP_PATH}"
+            try:
+                # New Set-Cookie values replace the old ones in the shared jar by name, so
+                # lookups already in flight keep a consistent cookie set
+                r = await self.client.get(url, headers=BOOTSTRAP_HEADERS, timeout=15, follow_redirects=True)
+                r.raise_for_status()
+                token = extract_csrf_token(r.text, self.client.cookies)
+            except Exception as e:
+                self._failed(f"Session bootstrap failed: {e!r}")
+                return self.token
+            if not token:
+                self._failed(f"No CSRF token found on {url}")
+                return self.token
+            self.token = token
+            self.fetched_at = time.time()
+            self.bootstraps += 1
+            self.consecutive_failures = 0
+            self.retry_at = 0.0
+            print(f"[Lenovo] Session bootstrapped ({len(self.client.cookies)} cookies)", file=sys.stderr)
+            return self.token
+
+    def _failed(self, message):
+        self.failures += 1
+        self.consecutive_failures += 1
+        backoff = min(LENOVO_SESSION_RETRY_MAX, LENOVO_SESSION_RETRY_MIN * 2 ** (self.consecutive_failures - 1))
+        self.retry_at = time.time() + backoff
+        print(f"[Lenovo] {message}; retrying in {backoff:.0f}s", file=sys.stderr)
+
+    async def _refresh_loop(self):
+        while True:
+            delay = self.expires_at - self.ttl * self.refresh_margin - time.time()
+            if self.backing_off() or self.token is None:
+                delay = self.retry_at - time.time()
+            await asyncio.sleep(max(delay, 1.0))
+            await self.refresh(stale_token=self.token)
+
+    async def close(self):
+        if self._refresh_task is not None:
+            self._refresh_task.cancel()
+            try:
+                await self._refresh_task
+            except asyncio.CancelledError:
+                pass
+            self._refresh_task = None
+
+    def stats(self):
+        return {
+            "has_token": self.token is not None,
+            "age_seconds": round(time.time() - self.fetched_at, 1) if self.token else None,
+            "bootstraps": self.bootstraps,
+            "failures": self.failures,
+            "retry_in": round(self.retry_at - time.time(), 1) if self.backing_off() else None,
+        }
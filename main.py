@@ -1,15 +1,57 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, File, HTTPException, Header, Response, UploadFile
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import FileResponse, JSONResponse, StreamingResponse
+from pydantic import BaseModel
 import uvicorn
-from datetime import datetime
-from warrantylenovoo import get_lenovo_warranty_info # Import the function
-from ultra_fast_warranty import extract_warranty_ultra_fast # Import the function
-import re
+import asyncio
+import os
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from cache import TTLCache
+from store import ResultStore
+from singleflight import SingleFlight
+from brand_rules import classifier as brand_classifier, normalizar_serial
+from circuit import breaker_stats
+from compression import StreamingGZipMiddleware
+from ratelimit import limiter_stats
+from metrics import BRAND_DETECTION_SECONDS, InFlightMiddleware, count_lookup, gauge_function, render as render_metrics
+from jobs import JobError, JobManager
+import recording
+import tracing
+from tracing import TracingMiddleware, current_span, run_in_executor, span
+from providers import ProviderError, get_provider, loaded_providers
+import json
+import math
+import tempfile
+import time
+
+
+@asynccontextmanager
+async def lifespan(app):
+    flush_task = None
+    if result_store is not None:
+        loaded = await run_in_executor(_store_executor, warm_cache_from_store)
+        print(f"Warm-started cache with {loaded} entries from {WARRANTY_DB_PATH}")
+        flush_task = asyncio.create_task(_store_maintenance_loop())
+    print(f"Restored {jobs.restore()} upload jobs from {JOBS_DIR}")
+    warmup_task = asyncio.create_task(warm_up())
+    yield
+    warmup_task.cancel()
+    await jobs.close()
+    if flush_task is not None:
+        flush_task.cancel()
+        await run_in_executor(_store_executor, result_store.flush_hits)
+        _store_executor.shutdown(wait=True)
+    for provider in loaded_providers().values():
+        await provider.close()
+    tracing.shutdown()
+
 
 app = FastAPI(
     title="Lenovo Warranty Check API",
     description="An API to check Lenovo warranty status using a serial number.",
     version="1.0.0",
+    lifespan=lifespan,
 )
 
 # Add CORS middleware
@@ -20,192 +62,448 @@ app.add_middleware(
     allow_methods=["*"],  # Allow all methods
     allow_headers=["*"],  # Allow all headers
 )
+# Compress large responses for clients that accept gzip; batch NDJSON lines are flushed as they finish
+app.add_middleware(StreamingGZipMiddleware, minimum_size=1024)
+app.add_middleware(InFlightMiddleware)
+# One trace per request: Server-Timing / X-Trace-Id headers, spans to TRACE_EXPORTER
+app.add_middleware(TracingMiddleware)
+if os.environ.get("TRACE_LOG_IDS", "1") == "1":
+    tracing.tag_logs()  # prefix request-time log lines with [trace=<id>]
+
+# Result cache keyed on the normalized serial. Found results live long; 404s and
+# unsupported brands expire quickly so fixes upstream show up soon.
+CACHE_TTL_FOUND = float(os.environ.get("CACHE_TTL_FOUND", "86400"))
+CACHE_TTL_NEGATIVE = float(os.environ.get("CACHE_TTL_NEGATIVE", "600"))
+CACHE_MAX_ENTRIES = int(os.environ.get("CACHE_MAX_ENTRIES", "50000"))
+CACHE_MAX_BYTES = int(os.environ.get("CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+# If set, /admin endpoints require a matching X-Admin-Token header
+ADMIN_TOKEN = os.environ.get("ADMIN_TOKEN", "")
+
+result_cache = TTLCache(max_entries=CACHE_MAX_ENTRIES, max_bytes=CACHE_MAX_BYTES)
+
+# Optional second tier on disk (SQLite/WAL), e.g. on a mounted volume. Empty = disabled.
+WARRANTY_DB_PATH = os.environ.get("WARRANTY_DB_PATH", "")
+WARRANTY_DB_WARM_ENTRIES = int(os.environ.get("WARRANTY_DB_WARM_ENTRIES", "5000"))
+WARRANTY_DB_FLUSH_INTERVAL = float(os.environ.get("WARRANTY_DB_FLUSH_INTERVAL", "60"))
+
+result_store = ResultStore(WARRANTY_DB_PATH) if WARRANTY_DB_PATH else None
+
+inflight = SingleFlight()
+_store_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="store")
+
+# Providers loaded and warmed up at startup (Lenovo session, HP browsers); the others are
+# imported on their first lookup. Empty = load everything lazily.
+WARM_PROVIDERS = [b.strip() for b in os.environ.get("WARM_PROVIDERS", "Lenovo,HP").split(",") if b.strip()]
+
+# Startup warm-up state, reported by GET /ready
+warmup = {"state": "pending", "providers": {}, "seconds": None, "errors": []}
+
+
+async def warm_up():
+    """Load the WARM_PROVIDERS and let each prepare for its first lookup, in parallel"""
+    warmup["state"] = "running"
+    start = time.perf_counter()
+
+    async def warm(brand):
+        provider = get_provider(brand)
+        if provider is None:
+            raise ValueError(f"no provider for {brand}")
+        warmup["providers"][brand] = await provider.warm_up()
+
+    # Failures are logged and reported but don't block readiness: lookups then pay the cold start
+    results = await asyncio.gather(*(warm(brand) for brand in WARM_PROVIDERS), return_exceptions=True)
+    for brand, result in zip(WARM_PROVIDERS, results):
+        if isinstance(result, Exception):
+            warmup["errors"].append(f"{brand}: {result}")
+            print(f"Warm-up of {brand} failed: {result}")
+    warmup["seconds"] = round(time.perf_counter() - start, 2)
+    warmup["state"] = "done"
+    print(f"Warm-up done in {warmup['seconds']}s ({warmup['providers']})")
+
+
+def warm_cache_from_store():
+    """Load the most-requested unexpired results from disk into the memory cache"""
+    now = time.time()
+    entries = result_store.hottest(WARRANTY_DB_WARM_ENTRIES)
+    # Coldest first, so the hottest end up most-recently-used in the LRU
+    for key, status, body, expires_at in reversed(entries):
+        result_cache.set(key, (status, body), expires_at - now)
+    return len(entries)
+
+
+async def _store_maintenance_loop():
+    while True:
+        await asyncio.sleep(WARRANTY_DB_FLUSH_INTERVAL)
+        try:
+            await run_in_executor(_store_executor, result_store.flush_hits)
+            await run_in_executor(_store_executor, result_store.prune)
+        except Exception as e:
+            print(f"Result store maintenance failed: {e}")
+
+
+async def get_cached_result(key):
+    """Memory cache first, then the on-disk store. Returns ((status, body), tier) or (None, None)"""
+    cached = result_cache.get(key)
+    if cached is not None:
+        if result_store is not None:
+            result_store.record_hit(key)
+        return cached, "HIT"
+    if result_store is None:
+        return None, None
+    try:
+        stored = await run_in_executor(_store_executor, result_store.get, key)
+    except Exception as e:
+        print(f"Result store read failed for {key}: {e}")
+        return None, None
+    if stored is None:
+        return None, None
+    status, body, fetched_at, expires_at = stored
+    result_store.record_hit(key)
+    result_cache.set(key, (status, body), expires_at - time.time())
+    return (status, body), "STORE"
+
+
+def _log_store_write(future):
+    if future.exception() is not None:
+        print(f"Result store write failed: {future.exception()}")
+
+
+def remember_result(key, status, body, ttl):
+    """Write-through to both tiers; the disk write happens in the background"""
+    result_cache.set(key, (status, body), ttl)
+    if result_store is not None:
+        _store_executor.submit(result_store.put, key, status, body, ttl).add_done_callback(_log_store_write)
+
+
+def cache_ttls(brand):
+    """(found, negative) cache TTLs for a brand: its provider's own, else the global defaults"""
+    provider = get_provider(brand)
+    found = getattr(provider, "cache_ttl", None)
+    negative = getattr(provider, "negative_cache_ttl", None)
+    return (CACHE_TTL_FOUND if found is None else found, CACHE_TTL_NEGATIVE if negative is None else negative)
+
 
 def determinar_marca_por_serial(serial_number):
-    if not serial_number or not isinstance(serial_number, str):
-        return "Dato no válido"
-
-    serial = serial_number.strip().upper()
-    serial = serial.replace("\n", "")
-    if serial.startswith('"') and serial.endswith('"'):
-        serial = serial[1:-1]
-
-    invalid_serials = {"N/A", "", "DESKTOP", "NINGUNO", "USB有线鼠标"}
-    if serial in invalid_serials or not serial:
-        return "Dato no válido"
-
-    # --- Dell Patterns ---
-    if serial.startswith("ZZQYH") and len(serial) == 15:
-        return "Dell"
-    if len(serial) == 7 and serial.isalnum() and not serial.isdigit():
-        if re.search(r"[A-Z]", serial) and re.search(r"[0-9]", serial):
-            return "Dell"
-        if serial.isalpha(): # e.g. SERVICE
-            return "Dell"
-    if len(serial) == 12:
-        if serial.startswith(("507NT", "909NT", "608NT")):
-            if serial == "909NTUW7K902": return "Dell" # Specific Dell
-            if serial == "608NTEPC4988": return "Dell" # Specific Dell
-            if serial.startswith("507NT"): return "Dell" # 507NTLE9B712
-            # Other 909NT and 608NT might be HP/Lenovo
-    if serial.startswith("AQCI") and len(serial) == 13 and serial == "AQCI11A001192": # Specific Dell
-        return "Dell"
-
-
-    # --- HP Patterns ---
-    # Corrected 10-char HP prefixes to include 1CR
-    hp_10char_prefixes = ("CND", "MXL", "1CZ", "5CD", "4CE", "8CG", "3CM", "6CM", "1CR")
-    if len(serial) == 10 and serial.startswith(hp_10char_prefixes):
-        return "HP" # This will now catch 1CR9160GKM as HP
-
-    if serial.startswith("APBH") and len(serial) == 13:
-        return "HP"
-    if serial.startswith("V8C9H") and len(serial) == 16:
-        return "HP"
-    if serial.startswith("AQCI") and len(serial) == 13: # AQCI11A001006 (HP)
-        return "HP" # General AQCI for HP if not specific Dell
-
-    if len(serial) == 12:
-        hp_12char_prefixes = ("011UX", "603NT", "312ND", "610NT", "409ND", "505NT", "107LT", "808NT")
-        if serial.startswith(hp_12char_prefixes):
-            return "HP"
-        if serial.startswith("909NT") and serial != "909NTUW7K902" and not serial.startswith("909NTNHJ"): # Avoid Dell and a Lenovo one
-            return "HP" # e.g., 909NTXR5K026
-
-    # Removed V5TW from HP 8-char, it's now Lenovo
-    # HP 8-char patterns are less common or conflict heavily. Most 8-chars starting V... are now Lenovo.
-
-    # --- Lenovo Patterns ---
-    if serial.startswith("20MK") and len(serial) == 8:
-        return "Lenovo"
-    if (serial.startswith("CN-0") or serial.startswith("CN-O")) and serial.count('-') >= 3 and len(serial) > 20:
-        return "Lenovo"
-    if serial.startswith("1S") and (len(serial) == 20 or len(serial) == 22 or len(serial) == 24):
-        return "Lenovo"
-    if serial.startswith("8SS") and len(serial) == 24:
-        return "Lenovo"
-
-    # Standard and New 8-char Lenovo prefixes (V5TW, VNA, V90C are now firmly Lenovo)
-    lenovo_8char_prefixes_original = ("MJ", "PC", "YL", "S1", "PW", "LR")
-    lenovo_8char_prefixes_new = ("V5TD", "VNA", "V90C", "V5TW") # Corrected: VNA (not VNA9), V5TW added
-    all_lenovo_8char_prefixes = lenovo_8char_prefixes_original + lenovo_8char_prefixes_new
-
-    if len(serial) == 8 and serial.startswith(all_lenovo_8char_prefixes):
-        return "Lenovo" # This will now catch V90C..., VNA..., V5TW... as Lenovo
-
-    if serial.startswith("PF") and (len(serial) == 8 or len(serial) == 10) and serial.isalnum():
-        return "Lenovo"
-
-    # Lenovo 10-char (1CR removed, as it's now HP based on your correction)
-    if len(serial) == 10:
-        if serial.startswith("CN") and not serial.startswith("CND"): # e.g. CN405225XM
-            return "Lenovo"
-
-    if len(serial) == 12:
-        lenovo_12char_prefixes = ("105NT", "608NT", "506NT", "908NT", "909NTNHJ", "605NT") # Made 909NT more specific
-        if serial.startswith(lenovo_12char_prefixes):
-             if serial != "608NTEPC4988": # Avoid specific Dell
-                return "Lenovo"
-
-    if serial.startswith("0ATS") and len(serial) == 15:
-        return "Lenovo"
-    if serial.startswith("UK0A") and len(serial) == 17: # UK0A1615013283BKK (Lenovo)
-        return "Lenovo"
-
-
-    # --- Acer Patterns ---
-    if serial.startswith("NHQ") and len(serial) > 15:
-        return "Acer"
-
-    # --- Fallback for UK0A if not Lenovo (could be HP) ---
-    if serial.startswith("UK0A") and len(serial) == 17: # e.g. UK0A1615012566K69 (HP)
-        return "HP" # If not caught by Lenovo's UK0A rule
-
-    # --- Fallback for ambiguous patterns ---
-    if len(serial) == 12 and serial.startswith("60"):
-        if serial.startswith("603NT"): return "HP"
-        if serial.startswith("608NT") or serial.startswith("605NT"):
-            if serial == "608NTEPC4988": return "Dell"
-            return "Lenovo"
-        return "Desconocido (Ambiguo 60...)"
-
-    return "Desconocido"
+    """Brand for a serial number (see brand_rules.BRAND_RULES for the patterns)"""
+    with BRAND_DETECTION_SECONDS.labels("single").time():
+        return brand_classifier.classify(serial_number)
 
 
 @app.get("/warranty/{serial_number}")
-async def check_warranty(serial_number: str):
+async def check_warranty(serial_number: str, response: Response):
     """
-    Retrieves warranty information for the given Lenovo serial number.
+    Retrieves warranty information for the given Lenovo or HP serial number.
     """
     print(f"API endpoint called for SN: {serial_number}") # Add logging
 
-    # Determine the brand based on the serial number
-    brand = determinar_marca_por_serial(serial_number)
+    status, body, tier, headers = await get_warranty(serial_number)
+    if status != 200:
+        raise HTTPException(status_code=status, detail=body, headers={"X-Cache": tier, **headers})
+    response.headers["X-Cache"] = tier
+    return body
+
+
+async def get_warranty(serial_number, brand=None):
+    """
+    Cache tiers first, then one shared upstream lookup per serial.
+    Returns (status, body, tier, headers): body is the normalized result for 200, else the
+    error detail; headers are extra response headers for errors (Retry-After).
+    `brand` skips detection when the caller already classified the serial (batch).
+    """
+    if brand is None:
+        brand = determinar_marca_por_serial(serial_number)
+    status, body, tier, headers = await _get_warranty(serial_number, brand)
+    count_lookup(brand, status, tier)
+    return status, body, tier, headers
+
+
+async def _get_warranty(serial_number, brand):
+    key = normalizar_serial(serial_number)
+    with span("cache") as cache_span:
+        cached, tier = await get_cached_result(key)
+        cache_span.set(tier=tier or "MISS")
+    if cached is not None:
+        status, body = cached
+        return status, body, tier, {}
+
+    # Concurrent requests for the same serial share one upstream lookup
+    tier = "COALESCED" if inflight.in_flight(key) else "MISS"
+    try:
+        with span("upstream", coalesced=tier == "COALESCED"):
+            result = await inflight.do(key, lambda: lookup_and_remember(key, serial_number, brand))
+    except HTTPException as e:
+        if e.status_code in (502, 503, 504) and result_store is not None:
+            # Vendor unavailable or too slow (circuit open, browsers saturated): an expired answer beats none
+            try:
+                stale = await run_in_executor(_store_executor, result_store.get, key, True)
+            except Exception as stale_error:
+                print(f"Result store read failed for {key}: {stale_error}")
+                stale = None
+            if stale is not None and stale[0] == 200:
+                return 200, stale[1], "STALE", {}
+        return e.status_code, e.detail, tier, dict(e.headers or {})
+    return 200, result, tier, {}
+
+
+async def lookup_and_remember(key, serial_number, brand):
+    """Upstream lookup plus write-through caching; runs once per serial at a time"""
+    ttl_found, ttl_negative = cache_ttls(brand)
+    try:
+        result = await lookup_warranty(serial_number, brand)
+    except HTTPException as e:
+        # Only definitive answers are cached; 5xx (upstream trouble) is retried next time
+        if e.status_code in (400, 404):
+            remember_result(key, e.status_code, e.detail, ttl_negative)
+        raise
+    # No dates (e.g. an HP page that rendered without them): answer it, but look again soon
+    dated = any(result.get(field, "N/A") != "N/A" for field in ("Warranty Start", "Warranty End"))
+    remember_result(key, 200, result, ttl_found if dated else ttl_negative)
+    return result
 
-    # Lenovo or HP
-    if brand not in ["Lenovo", "HP"]:
+
+async def lookup_warranty(serial_number, brand):
+    """
+    Query the brand's provider. Returns the normalized response dict or raises
+    HTTPException (400 unsupported brand, 404 not found, 5xx upstream errors).
+    """
+    current_span().set(serial=serial_number, brand=brand)
+
+    provider = get_provider(brand)
+    if provider is None:
         print(f"Unsupported brand for SN {serial_number}: {brand}")
         raise HTTPException(status_code=400, detail=f"Unsupported brand: {brand}")
-    if brand == "HP":
-        # If it's HP, use the ultra-fast warranty check
-        print(f"Using ultra-fast warranty check for HP SN: {serial_number}")
-        warranty_data = extract_warranty_ultra_fast(serial_number)
-        if not warranty_data or "error" in warranty_data:
-            detail = warranty_data.get("error", "Warranty information not found") if warranty_data else "Warranty information not found"
-            raise HTTPException(status_code=404, detail=detail)
-        # Normalize HP response to match Lenovo format
-        return {
-            "Brand": "HP",
-            "Product Name": warranty_data.get("product_name", "N/A") or "N/A",
-            "Serial Number": warranty_data.get("serial_number", serial_number),
-            "Warranty Start": warranty_data.get("warranty_start", "N/A") or "N/A",
-            "Warranty End": warranty_data.get("warranty_end", "N/A") or "N/A",
-        }
-    elif brand == "Lenovo":
-        warranty_data = get_lenovo_warranty_info(serial_number)
-
-        if isinstance(warranty_data, dict) and "data" in warranty_data:
-            machine_info = warranty_data["data"].get("machineInfo", {})
-            current_warranty = warranty_data["data"].get("currentWarranty", {})
-            
-            # Extract the specific fields you want
-            # Format dates from yyyy-mm-dd to dd/mm/yyyy
-            start_date = current_warranty.get("startDate", "N/A")
-            end_date = current_warranty.get("endDate", "N/A")
-            
-            formatted_start = "N/A"
-            formatted_end = "N/A"
-            
-            if start_date != "N/A":
-                try:
-                    formatted_start = datetime.strptime(start_date, "%Y-%m-%d").strftime("%d/%m/%Y")
-                except ValueError:
-                    formatted_start = start_date
-            
-            if end_date != "N/A":
-                try:
-                    formatted_end = datetime.strptime(end_date, "%Y-%m-%d").strftime("%d/%m/%Y")
-                except ValueError:
-                    formatted_end = end_date
-            
-            simplified_response = {
-                "Brand": "Lenovo",  # or you could use machine_info.get("brand", "Lenovo")
-                "Product Name": machine_info.get("productName", "N/A"),
-                "Serial Number": machine_info.get("serial", serial_number),
-                "Warranty Start": formatted_start,
-                "Warranty End": formatted_end
-            }
-            
-            return simplified_response
-        else:
-            print(f"Error retrieving warranty data for SN {serial_number}: {warranty_data}")
-            raise HTTPException(status_code=500, detail="Error retrieving warranty information.")
-    
+    try:
+        return await provider.get(serial_number)
+    except ProviderError as e:
+        headers = {"Retry-After": str(math.ceil(e.retry_after))} if e.retry_after else None
+        raise HTTPException(status_code=e.status, detail=str(e), headers=headers)
+
+
+BATCH_MAX_SERIALS = int(os.environ.get("BATCH_MAX_SERIALS", "10000"))
+
+
+class BatchRequest(BaseModel):
+    serials: list[str]
+
+
+def _batch_result(index, serial, brand, status, body, tier=None, headers=None):
+    item = {"index": index, "serial": serial, "brand": brand, "status": status}
+    if status == 200:
+        item["result"] = body
+    else:
+        item["error"] = body
+    if tier:
+        item["cache"] = tier
+    if headers and "Retry-After" in headers:
+        item["retry_after"] = int(headers["Retry-After"])
+    return item
+
+
+async def run_batch(items):
+    """
+    Classify (index, serial) items up front, then fan out per vendor with a fixed number of
+    workers each. Yields one NDJSON line per serial as soon as it finishes (completion order).
+    """
+    items = list(items)
+    start = time.perf_counter()
+    brands = brand_classifier.classify_many(serial for _, serial in items)
+    if items:
+        BRAND_DETECTION_SECONDS.labels("batch").observe((time.perf_counter() - start) / len(items))
+    by_vendor = {}
+    for (index, serial), brand in zip(items, brands):
+        if get_provider(brand) is None:
+            yield _batch_result(index, serial, brand, 400, f"Unsupported brand: {brand}")
+            continue
+        by_vendor.setdefault(brand, []).append((index, serial))
+
+    results = asyncio.Queue()
+
+    async def worker(brand, queue):
+        for index, serial in queue:
+            try:
+                status, body, tier, headers = await get_warranty(serial, brand)
+            except Exception as e:
+                status, body, tier, headers = 500, f"Error retrieving warranty information: {e}", None, None
+            await results.put(_batch_result(index, serial, brand, status, body, tier, headers))
+
+    workers = []
+    for brand, entries in by_vendor.items():
+        queue = iter(entries)  # shared iterator: each worker takes the next serial
+        # Per-vendor workers for this batch (the provider's own limit still applies on top)
+        count = min(get_provider(brand).batch_concurrency, len(entries))
+        workers.extend(asyncio.create_task(worker(brand, queue)) for _ in range(count))
+
+    try:
+        for _ in range(sum(len(entries) for entries in by_vendor.values())):
+            yield await results.get()
+    finally:
+        for task in workers:
+            task.cancel()
+
+
+@app.post("/warranty/batch")
+async def check_warranty_batch(request: BatchRequest):
+    """
+    Look up many serials at once. Streams newline-delimited JSON in completion order;
+    each line carries the serial's index in the request.
+    """
+    if len(request.serials) > BATCH_MAX_SERIALS:
+        raise HTTPException(status_code=413, detail=f"At most {BATCH_MAX_SERIALS} serials per batch")
+    print(f"Batch endpoint called for {len(request.serials)} serials")
+    lines = (json.dumps(item) + "\n" async for item in run_batch(enumerate(request.serials)))
+    return StreamingResponse(lines, media_type="application/x-ndjson")
+
+
+JOBS_DIR = os.environ.get("JOBS_DIR", os.path.join(tempfile.gettempdir(), "warranty-jobs"))
+jobs = JobManager(
+    JOBS_DIR,
+    run_batch,
+    chunk_size=int(os.environ.get("JOBS_CHUNK_SIZE", "500")),
+    max_running=int(os.environ.get("JOBS_MAX_RUNNING", "1")),
+    max_upload_bytes=int(os.environ.get("JOBS_MAX_UPLOAD_BYTES", str(50 * 1024 * 1024))),
+    retention=float(os.environ.get("JOBS_RETENTION", str(7 * 86400))),
+)
+
+
+def _get_job(job_id):
+    job = jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+
+@app.post("/jobs", status_code=202)
+async def create_job(file: UploadFile = File(...)):
+    """
+    Upload a CSV/XLSX inventory (serials in a "serial"/"serial number" column, or the first
+    column) and process it in the background. Returns the job with its id.
+    """
+    try:
+        job = await jobs.submit(file, file.filename)
+    except JobError as e:
+        raise HTTPException(status_code=e.status, detail=str(e))
+    return job.to_dict()
+
+
+@app.get("/jobs/{job_id}")
+async def get_job(job_id: str):
+    return _get_job(job_id).to_dict()
+
+
+@app.get("/jobs/{job_id}/events")
+async def job_events(job_id: str):
+    """Server-sent events: the job's progress on every change until it finishes"""
+    job = _get_job(job_id)
+
+    async def events():
+        while True:
+            yield f"data: {json.dumps(job.to_dict())}\n\n"
+            if job.status in ("done", "failed", "cancelled"):
+                return
+            while not await job.wait_changed(timeout=15):
+                yield ": keepalive\n\n"
+
+    return StreamingResponse(events(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
+
+
+@app.get("/jobs/{job_id}/results")
+async def get_job_results(job_id: str):
+    """Results CSV, one line per serial in sheet order (partial for failed/cancelled jobs)"""
+    job = _get_job(job_id)
+    if job.status in ("queued", "running"):
+        raise HTTPException(status_code=409, detail=f"Job is {job.status}")
+    if not os.path.exists(job.results_path):
+        raise HTTPException(status_code=404, detail="Job produced no results")
+    name = os.path.splitext(os.path.basename(job.filename))[0] + "-warranty.csv"
+    return FileResponse(job.results_path, media_type="text/csv", filename=name)
+
+
+@app.delete("/jobs/{job_id}")
+async def cancel_job(job_id: str):
+    job = _get_job(job_id)
+    jobs.cancel(job_id)
+    return {"id": job.id, "status": "cancelling" if job.status not in ("done", "failed", "cancelled") else job.status}
+
+
+def _check_admin(token):
+    # No ADMIN_TOKEN configured: the admin endpoints stay closed
+    if not ADMIN_TOKEN or token != ADMIN_TOKEN:
+        raise HTTPException(status_code=403, detail="Invalid admin token")
+
+
+@app.delete("/admin/cache/{serial_number}")
+async def purge_cached_serial(serial_number: str, x_admin_token: str = Header(default="")):
+    """Drop one serial from the result cache (and the on-disk store)"""
+    _check_admin(x_admin_token)
+    key = normalizar_serial(serial_number)
+    purged = int(result_cache.delete(key))
+    if result_store is not None:
+        purged = max(purged, await run_in_executor(_store_executor, result_store.delete, key))
+    return {"purged": purged}
+
+
+@app.delete("/admin/cache")
+async def purge_cache(x_admin_token: str = Header(default="")):
+    """Drop every entry from the result cache (and the on-disk store)"""
+    _check_admin(x_admin_token)
+    purged = result_cache.clear()
+    if result_store is not None:
+        purged = max(purged, await run_in_executor(_store_executor, result_store.clear))
+    return {"purged": purged}
+
 # Add a root endpoint for basic check
 @app.get("/")
 async def read_root():
     return {"message": "Welcome to the Lenovo Warranty Check API. Use /warranty/{serial_number} to check warranty."}
 
+gauge_function("warranty_upstream_lookups_in_flight", "Distinct serials being looked up upstream",
+               lambda: inflight.stats()["in_flight"])
+
+
+@app.get("/ready")
+async def read_ready():
+    """
+    Readiness: 503 until the startup warm-up has finished. A provider that failed to warm up is
+    listed under `errors` but doesn't keep the app unready; its lookups pay the cold start.
+    """
+    if warmup["state"] != "done":
+        return JSONResponse({"ready": False, "warmup": warmup}, status_code=503)
+    return {"ready": True, "warmup": warmup}
+
+
+@app.get("/metrics")
+async def read_metrics():
+    """Prometheus metrics: stage latency histograms, lookup counters, pool and in-flight gauges"""
+    body, content_type = render_metrics()
+    return Response(body, media_type=content_type)
+
+
+@app.get("/stats")
+async def read_stats():
+    """
+    Runtime stats: each loaded provider's limits and counters under `providers` plus its own
+    sections (HP browser pool or browser service workers, Lenovo session), result cache,
+    on-disk store, coalescing, circuit breakers, rate limiters, jobs, warm-up, trace export
+    and upstream recording counters.
+    """
+    providers = loaded_providers()
+    sections = {}
+    for provider in providers.values():
+        sections.update(provider.stats())
+    return {
+        **sections,
+        "providers": {brand: provider.limits() for brand, provider in providers.items()},
+        "cache": result_cache.stats(),
+        "singleflight": inflight.stats(),
+        "circuits": breaker_stats(),
+        "rate_limits": limiter_stats(),
+        "jobs": jobs.stats(),
+        "warmup": warmup,
+        "tracing": tracing.stats(),
+        "upstream_recording": recording.stats(),
+        "store": await run_in_executor(_store_executor, result_store.stats) if result_store else None,
+    }
+
 if __name__ == "__main__":
     # Run the app with uvicorn
     # host="0.0.0.0" makes it accessible on the network
@@ -0,0 +1,81 @@
+from contextlib import contextmanager
+
+from prometheus_client import CONTENT_TYPE_LATEST, Counter, Gauge, Histogram, generate_latest
+
+from tracing import record_span, span
+
+# Prometheus metrics, served by GET /metrics. Upstream and browser stage latencies share
+# one histogram labelled by stage, so p50/p99 per stage come from a single query.
+
+STAGE_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2, 3, 5, 8, 13, 20, 30, 60)
+
+STAGE_SECONDS = Histogram(
+    "warranty_stage_seconds",
+    "Latency of one lookup stage (lenovo_getproducts, lenovo_getibaseinfo, hp_product_api, "
+    "hp_warranty_api, browser_acquire, page_load, network_capture, dom_wait, extraction)",
+    ["stage"],
+    buckets=STAGE_BUCKETS,
+)
+BRAND_DETECTION_SECONDS = Histogram(
+    "warranty_brand_detection_seconds",
+    "Brand detection time per serial (mode=batch observes the per-serial average of a batch)",
+    ["mode"],
+    buckets=(1e-6, 2.5e-6, 5e-6, 1e-5, 2.5e-5, 5e-5, 1e-4, 2.5e-4, 1e-3, 1e-2),
+)
+LOOKUPS = Counter(
+    "warranty_lookups",
+    "Lookups answered, by brand, outcome (found, not_found, unsupported, unavailable, error) and cache tier",
+    ["brand", "outcome", "cache"],
+)
+REQUESTS_IN_FLIGHT = Gauge("warranty_http_requests_in_flight", "HTTP requests being handled (until the body is sent)")
+
+OUTCOMES = {200: "found", 400: "unsupported", 404: "not_found", 503: "unavailable"}
+
+
+@contextmanager
+def stage_timer(stage):
+    """Time one stage, into the histogram and as a span of the current trace: `with stage_timer("page_load"): ...`"""
+    with span(stage), STAGE_SECONDS.labels(stage).time():
+        yield
+
+
+def observe_stage(stage, seconds):
+    STAGE_SECONDS.labels(stage).observe(seconds)
+    record_span(stage, seconds)
+
+
+def count_lookup(brand, status, cache):
+    LOOKUPS.labels(brand, OUTCOMES.get(status, "error"), (cache or "none").lower()).inc()
+
+
+def gauge_function(name, documentation, func, label=None):
+    """
+    Gauge read at scrape time. With `label`, `func` maps each label value to its function.
+    """
+    if label is None:
+        Gauge(name, documentation).set_function(func)
+        return
+    gauge = Gauge(name, documentation, [label])
+    for value, value_func in func.items():
+        gauge.labels(value).set_function(value_func)
+
+
+def render():
+    """Return (body, content type) for the /metrics response"""
+    return generate_latest(), CONTENT_TYPE_LATEST
+
+
+class InFlightMiddleware:
+    """ASGI middleware counting HTTP requests in progress, including streamed responses"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        REQUESTS_IN_FLIGHT.inc()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            REQUESTS_IN_FLIGHT.dec()
@@ -0,0 +1,144 @@
+import asyncio
+import importlib
+import importlib.util
+import os
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from tracing import run_in_executor, span
+
+# Vendor providers. Each brand the classifier can return may have a module here named after
+# it (providers/hp.py for "HP") that defines `provider`, a Provider instance. Modules are
+# imported on first use, so a vendor's client code and dependencies (Selenium for HP) are
+# only loaded once a lookup, warm-up or batch needs them. Adding a vendor means adding a
+# module; brands without one are answered with 400.
+
+
+class ProviderError(Exception):
+    """Lookup failed; `status` is the HTTP status to answer with"""
+
+    def __init__(self, message, status=500, retry_after=None):
+        super().__init__(message)
+        self.status = status
+        self.retry_after = retry_after
+
+
+class Provider:
+    """
+    One vendor: lookup() calls it and returns its raw answer, normalize() turns that into the
+    API's response dict (or raises ProviderError). lookup() is a coroutine, or a plain function
+    run on the provider's own thread pool if `blocking` is set.
+
+    The class attributes are the vendor's defaults; <BRAND>_CONCURRENCY, BATCH_<BRAND>_CONCURRENCY,
+    <BRAND>_TIMEOUT, <BRAND>_CACHE_TTL and <BRAND>_CACHE_TTL_NEGATIVE override them.
+    """
+
+    brand = None
+    blocking = False
+    concurrency = 8  # concurrent lookups (threads, for blocking providers)
+    batch_concurrency = None  # workers per batch request; None = concurrency
+    timeout = 60.0  # seconds for a whole lookup, waiting for a slot included
+    cache_ttl = None  # seconds to cache found results; None = CACHE_TTL_FOUND
+    negative_cache_ttl = None  # not found / unsupported; None = CACHE_TTL_NEGATIVE
+
+    def __init__(self):
+        prefix = self.brand.upper()
+        env = os.environ.get
+        self.concurrency = int(env(f"{prefix}_CONCURRENCY", self.concurrency))
+        self.batch_concurrency = int(env(f"BATCH_{prefix}_CONCURRENCY", self.batch_concurrency or self.concurrency))
+        self.timeout = float(env(f"{prefix}_TIMEOUT", self.timeout))
+        if env(f"{prefix}_CACHE_TTL"):
+            self.cache_ttl = float(env(f"{prefix}_CACHE_TTL"))
+        if env(f"{prefix}_CACHE_TTL_NEGATIVE"):
+            self.negative_cache_ttl = float(env(f"{prefix}_CACHE_TTL_NEGATIVE"))
+        self._semaphore = asyncio.Semaphore(self.concurrency)
+        self._executor = None
+        if self.blocking:
+            self._executor = ThreadPoolExecutor(max_workers=self.concurrency,
+                                                thread_name_prefix=self.brand.lower())
+        self._stats = {"lookups": 0, "in_flight": 0, "timeouts": 0}
+
+    async def lookup(self, serial_number):
+        raise NotImplementedError
+
+    def normalize(self, serial_number, raw):
+        raise NotImplementedError
+
+    async def run_blocking(self, func, *args):
+        """Run a blocking call on this provider's thread pool"""
+        return await run_in_executor(self._executor, func, *args)
+
+    async def _call(self, serial_number):
+        async with self._semaphore:
+            if self.blocking:
+                return await self.run_blocking(self.lookup, serial_number)
+            return await self.lookup(serial_number)
+
+    async def get(self, serial_number):
+        """Look up and normalize one serial within the provider's concurrency limit and timeout"""
+        self._stats["lookups"] += 1
+        self._stats["in_flight"] += 1
+        try:
+            with span(self.brand.lower()):
+                # A timed-out blocking lookup keeps its thread until it finishes on its own
+                raw = await asyncio.wait_for(self._call(serial_number), self.timeout)
+        except asyncio.TimeoutError:
+            self._stats["timeouts"] += 1
+            raise ProviderError(f"{self.brand} lookup timed out after {self.timeout:.0f}s", status=504)
+        finally:
+            self._stats["in_flight"] -= 1
+        return self.normalize(serial_number, raw)
+
+    async def warm_up(self):
+        """Prepare for the first lookup (sessions, browsers); returns details for GET /ready"""
+        return {}
+
+    async def close(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def stats(self):
+        """Extra top-level sections for GET /stats"""
+        return {}
+
+    def limits(self):
+        return {
+            "concurrency": self.concurrency,
+            "batch_concurrency": self.batch_concurrency,
+            "timeout": self.timeout,
+            "cache_ttl": self.cache_ttl,
+            "negative_cache_ttl": self.negative_cache_ttl,
+            **self._stats,
+        }
+
+
+_providers = {}
+_lock = threading.Lock()
+
+
+def _module_name(brand):
+    name = brand.lower()
+    return f"{__name__}.{name}" if name.isidentifier() else None
+
+
+def get_provider(brand):
+    """The provider for `brand`, importing its module on first use; None if the brand has none"""
+    provider = _providers.get(brand)
+    if provider is not None or brand in _providers:
+        return provider
+    with _lock:
+        if brand not in _providers:
+            module = _module_name(brand)
+            if module is None or importlib.util.find_spec(module) is None:
+                _providers[brand] = None
+            else:
+                _providers[brand] = importlib.import_module(module).provider
+                print(f"Loaded {brand} provider", file=sys.stderr)
+        return _providers[brand]
+
+
+def loaded_providers():
+    """Providers imported so far, by brand"""
+    with _lock:
+        return {brand: provider for brand, provider in _providers.items() if provider is not None}
@@ -0,0 +1,62 @@
+from metrics import gauge_function
+from providers import Provider, ProviderError
+from ultra_fast_warranty import extract_warranty_ultra_fast, pool_stats, shutdown_browsers, warm_up_browsers
+
+# HP: blocking (requests + Selenium fallback), so lookups run on the provider's thread pool
+# and a slow browser session never stalls the event loop or Lenovo lookups.
+
+
+class HPProvider(Provider):
+    brand = "HP"
+    blocking = True
+    # Keep >= HP_BROWSER_POOL_SIZE; extra threads run the HP product API while waiting for a
+    # browser (the pool's wait queue is bounded by HP_BROWSER_MAX_WAITERS)
+    concurrency = 4
+    timeout = 120.0  # browser wait + page load + date wait, with room to spare
+
+    def lookup(self, serial_number):
+        print(f"Using ultra-fast warranty check for HP SN: {serial_number}")
+        return extract_warranty_ultra_fast(serial_number)
+
+    def normalize(self, serial_number, warranty_data):
+        if not warranty_data or "error" in warranty_data:
+            # Only a definitive vendor answer carries 404; anything else is an upstream failure
+            warranty_data = warranty_data or {}
+            raise ProviderError(warranty_data.get("error", "No warranty data from HP"),
+                                status=warranty_data.get("status", 502),
+                                retry_after=warranty_data.get("retry_after"))
+        result = {
+            "Brand": "HP",
+            "Product Name": warranty_data.get("product_name", "N/A") or "N/A",
+            "Serial Number": warranty_data.get("serial_number", serial_number),
+            "Warranty Start": warranty_data.get("warranty_start", "N/A") or "N/A",
+            "Warranty End": warranty_data.get("warranty_end", "N/A") or "N/A",
+        }
+        # Every coverage from the warranty JSON (base warranty, Care Packs, ...); the DOM scrape has none
+        if warranty_data.get("coverages"):
+            result["Coverages"] = [{
+                "Name": coverage.get("name") or "N/A",
+                "Status": coverage.get("status") or "N/A",
+                "Start": coverage.get("start") or "N/A",
+                "End": coverage.get("end") or "N/A",
+            } for coverage in warranty_data["coverages"]]
+        return result
+
+    async def warm_up(self):
+        return {"browsers": await self.run_blocking(warm_up_browsers)}
+
+    async def close(self):
+        await super().close()
+        shutdown_browsers()
+
+    def stats(self):
+        return {"hp_browser_pool": pool_stats()}
+
+
+gauge_function("warranty_hp_browsers", "HP browsers in the pool by state", {
+    "idle": lambda: pool_stats()["idle"],
+    "in_use": lambda: pool_stats()["in_use"],
+}, label="state")
+gauge_function("warranty_hp_browser_waiters", "HP lookups waiting for a free browser", lambda: pool_stats()["waiting"])
+
+provider = HPProvider()
@@ -0,0 +1,66 @@
+from datetime import datetime
+
+from circuit import CircuitOpenError
+from lenovo_client import close_client, get_lenovo_warranty_info_async, get_session
+from providers import Provider, ProviderError
+
+# Lenovo: native asyncio on a shared keep-alive client (see lenovo_client.py)
+
+
+def _format_date(value):
+    """yyyy-mm-dd -> dd/mm/yyyy (anything else is returned as is)"""
+    if value == "N/A":
+        return value
+    try:
+        return datetime.strptime(value, "%Y-%m-%d").strftime("%d/%m/%Y")
+    except ValueError:
+        return value
+
+
+def _product_not_found(warranty_data):
+    """getproducts answered but knows no such serial (as opposed to an upstream failure)"""
+    if not isinstance(warranty_data, dict):
+        return False
+    return any(w.get("name") == "Product API Error" for w in warranty_data.get("warranties", []))
+
+
+class LenovoProvider(Provider):
+    brand = "Lenovo"
+    concurrency = 32
+    timeout = 30.0
+
+    async def lookup(self, serial_number):
+        try:
+            return await get_lenovo_warranty_info_async(serial_number)
+        except CircuitOpenError as e:
+            raise ProviderError(str(e), status=503, retry_after=e.retry_after)
+
+    def normalize(self, serial_number, warranty_data):
+        if isinstance(warranty_data, dict) and "data" in warranty_data:
+            machine_info = warranty_data["data"].get("machineInfo", {})
+            current_warranty = warranty_data["data"].get("currentWarranty", {})
+            return {
+                "Brand": "Lenovo",
+                "Product Name": machine_info.get("productName", "N/A"),
+                "Serial Number": machine_info.get("serial", serial_number),
+                "Warranty Start": _format_date(current_warranty.get("startDate", "N/A")),
+                "Warranty End": _format_date(current_warranty.get("endDate", "N/A")),
+            }
+        if _product_not_found(warranty_data):
+            raise ProviderError("Warranty information not found", status=404)
+        print(f"Error retrieving warranty data for SN {serial_number}: {warranty_data}")
+        raise ProviderError("Error retrieving warranty information.", status=500)
+
+    async def warm_up(self):
+        await get_session().ensure()
+        return {"session": True}
+
+    async def close(self):
+        await super().close()
+        await close_client()
+
+    def stats(self):
+        return {"lenovo_session": get_session().stats()}
+
+
+provider = LenovoProvider()
@@ -0,0 +1,221 @@
+import asyncio
+import os
+import sys
+import threading
+import time
+
+# Token-bucket rate limits per upstream endpoint. Callers are never rejected: each one
+# reserves the next free token slot in arrival order (so waiting is FIFO-fair) and sleeps
+# until it. A 429 or captcha page halves the endpoint's rate (at most once per second, and
+# honours Retry-After); callers already queued are re-paced at the new rate and the throttled
+# call retries once (limited_call). After RATE_LIMIT_RECOVER_SECONDS without push-back the
+# rate climbs back by 10% of the configured one. Time spent waiting for a token is excluded
+# from the upstream latency the circuit breakers see.
+
+RATE_LIMIT_MIN_FACTOR = float(os.environ.get("RATE_LIMIT_MIN_FACTOR", "0.1"))
+RATE_LIMIT_RECOVER_SECONDS = float(os.environ.get("RATE_LIMIT_RECOVER_SECONDS", "60"))
+# Processes sharing each limit (uvicorn workers, browser service workers); each gets its share
+RATE_LIMIT_PROCESSES = max(1, int(os.environ.get("RATE_LIMIT_PROCESSES", os.environ.get("WEB_CONCURRENCY", "1"))))
+
+
+class RateLimiter:
+    def __init__(self, name, rate, burst):
+        self.name = name
+        self.base_rate = rate  # tokens per second; 0 disables the limit
+        self.rate = rate
+        self.burst = max(1, burst)
+        self._next_free = 0.0  # monotonic time at which the bucket is empty again (GCRA)
+        self._last_penalty = 0.0
+        self._last_recovery = 0.0
+        self._epoch = 0  # bumped on every rate cut
+        self._lock = threading.Lock()
+        self._stats = {"waits": 0, "queued": 0, "queued_max": 0, "wait_seconds_total": 0.0,
+                       "wait_seconds_max": 0.0, "throttled": 0}
+
+    def _reserve(self):
+        """Take the next token slot; returns (seconds to wait for it, rate epoch)"""
+        with self._lock:
+            now = time.monotonic()
+            self._recover(now)
+            interval = 1.0 / self.rate
+            slot = max(self._next_free, now)
+            self._next_free = slot + interval
+            delay = max(0.0, slot - (self.burst - 1) * interval - now)
+            if delay:
+                self._stats["queued"] += 1
+                self._stats["queued_max"] = max(self._stats["queued_max"], self._stats["queued"])
+            return delay, self._epoch
+
+    def _woke(self, epoch):
+        """Done sleeping; True if the rate was cut meanwhile (the slot was paced too fast)"""
+        with self._lock:
+            self._stats["queued"] -= 1
+            return epoch != self._epoch
+
+    def _waited(self, seconds):
+        with self._lock:
+            stats = self._stats
+            stats["waits"] += 1
+            stats["wait_seconds_total"] += seconds
+            stats["wait_seconds_max"] = max(stats["wait_seconds_max"], seconds)
+        return seconds
+
+    def wait(self):
+        """Block until the caller may hit the endpoint; returns seconds waited"""
+        if not self.base_rate:
+            return 0.0
+        waited = 0.0
+        while True:
+            delay, epoch = self._reserve()
+            if not delay:
+                return self._waited(waited)
+            try:
+                time.sleep(delay)
+            finally:
+                cut = self._woke(epoch)
+            waited += delay
+            if not cut:
+                return self._waited(waited)
+            # Re-queue at the reduced rate; callers wake in reservation order, so this stays FIFO
+
+    async def wait_async(self):
+        if not self.base_rate:
+            return 0.0
+        waited = 0.0
+        while True:
+            delay, epoch = self._reserve()
+            if not delay:
+                return self._waited(waited)
+            try:
+                await asyncio.sleep(delay)
+            finally:
+                cut = self._woke(epoch)
+            waited += delay
+            if not cut:
+                return self._waited(waited)
+
+    def throttled(self, retry_after=None):
+        """The vendor pushed back (429/captcha): halve the rate and pause for retry_after"""
+        if not self.base_rate:
+            return
+        with self._lock:
+            now = time.monotonic()
+            self._stats["throttled"] += 1
+            # One cut per second: the other calls already in flight get the same 429
+            if now - self._last_penalty >= 1.0:
+                self.rate = max(self.base_rate * RATE_LIMIT_MIN_FACTOR, self.rate / 2)
+                self._last_penalty = now
+                self._epoch += 1
+                self._next_free = min(self._next_free, now)  # later slots were paced at the old rate
+                print(f"[RateLimit] {self.name} throttled by upstream, rate now {self.rate:.2f}/s", file=sys.stderr)
+            if retry_after:
+                # Nobody gets a slot before retry_after, burst tolerance included
+                pause_until = now + retry_after + (self.burst - 1) / self.rate
+                self._next_free = max(self._next_free, pause_until)
+
+    def _recover(self, now):
+        # Additive recovery: +10% of the configured rate per quiet RATE_LIMIT_RECOVER_SECONDS
+        if self.rate >= self.base_rate:
+            return
+        since = now - max(self._last_penalty, self._last_recovery)
+        if since >= RATE_LIMIT_RECOVER_SECONDS:
+            self.rate = min(self.base_rate, self.rate + self.base_rate * 0.1)
+            self._last_recovery = now
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats.update({"rate": round(self.rate, 3), "base_rate": self.base_rate, "burst": self.burst})
+        waits = stats["waits"]
+        stats["wait_seconds_avg"] = round(stats["wait_seconds_total"] / waits, 3) if waits else 0.0
+        stats["wait_seconds_total"] = round(stats["wait_seconds_total"], 3)
+        stats["wait_seconds_max"] = round(stats["wait_seconds_max"], 3)
+        return stats
+
+
+_limiters = {}
+_limiters_lock = threading.Lock()
+
+
+def get_limiter(name, rate, burst):
+    """
+    The shared limiter for an upstream endpoint. RATE_LIMIT_<NAME> (requests/s, 0 = unlimited)
+    and RATE_BURST_<NAME> override the defaults; both are split across RATE_LIMIT_PROCESSES.
+    """
+    with _limiters_lock:
+        limiter = _limiters.get(name)
+        if limiter is None:
+            rate = float(os.environ.get("RATE_LIMIT_" + name.upper(), rate))
+            burst = int(os.environ.get("RATE_BURST_" + name.upper(), burst))
+            limiter = _limiters[name] = RateLimiter(name, rate / RATE_LIMIT_PROCESSES,
+                                                    -(-burst // RATE_LIMIT_PROCESSES))
+        return limiter
+
+
+def limiter_stats():
+    with _limiters_lock:
+        limiters = list(_limiters.values())
+    return {limiter.name: limiter.stats() for limiter in limiters}
+
+
+def retry_after_seconds(value):
+    """Parse a Retry-After header given in seconds (HTTP-date values are ignored)"""
+    try:
+        return max(0.0, float(value))
+    except (TypeError, ValueError):
+        return None
+
+
+# Bot-check pages: captcha widgets, challenge scripts and their wording. Specific on purpose:
+# bare "captcha"/"robot" also match ordinary pages (<meta name="robots">, captchaToken fields).
+BLOCK_MARKERS = (
+    "g-recaptcha", "recaptcha/api", "h-captcha", "hcaptcha.com", "challenges.cloudflare.com",
+    "cf-challenge", "_incapsula_resource", "px-captcha", "verify you are human", "not a robot",
+    "unusual traffic from your",
+)
+
+
+def is_block_page(html):
+    """True if an HTML (or text) body is a captcha/bot-check page"""
+    text = html.lower()
+    return any(marker in text for marker in BLOCK_MARKERS)
+
+
+def note_response(limiter, response):
+    """
+    Throttle `limiter` if `response` (requests or httpx) is a 429 or a captcha/bot-check page
+    served where JSON was expected. Returns True if the vendor pushed back.
+    """
+    blocked = response.status_code == 429
+    if not blocked and "json" not in response.headers.get("content-type", ""):
+        blocked = is_block_page(response.text)
+    if blocked:
+        limiter.throttled(retry_after_seconds(response.headers.get("Retry-After")))
+    return blocked
+
+
+def limited_call(limiter, send, on_wait=None):
+    """
+    Wait for a `limiter` token and `send()` a request (requests or httpx). If the vendor
+    pushed back (see note_response), queue once more at the reduced pace and send again.
+    `on_wait(seconds)` gets each token wait, e.g. a breaker call's exclude(). Returns the
+    last response.
+    """
+    for attempt in range(2):
+        waited = limiter.wait()
+        if on_wait is not None:
+            on_wait(waited)
+        response = send()
+        if not note_response(limiter, response) or attempt:
+            return response
+
+
+async def limited_call_async(limiter, send, on_wait=None):
+    """limited_call for coroutine `send`s, waiting for tokens without blocking the event loop"""
+    for attempt in range(2):
+        waited = await limiter.wait_async()
+        if on_wait is not None:
+            on_wait(waited)
+        response = await send()
+        if not note_response(limiter, response) or attempt:
+            return response
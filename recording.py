@@ -0,0 +1,277 @@
+import base64
+import json
+import os
+import re
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timezone
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+from lenovo_session import CSRF_PATTERNS
+
+# Record/replay of upstream HTTP traffic (Lenovo, HP product API, HP warranty API).
+# UPSTREAM_RECORDING=record appends every request/response pair to UPSTREAM_RECORDING_FILE
+# as a JSON line, with cookies, tokens and other secrets redacted. UPSTREAM_RECORDING=replay
+# answers from that file instead of the network: requests are matched on method, URL and
+# body, repeated matches cycle through the recorded responses in order, and anything not
+# recorded fails like an unreachable host. The HP browser fallback isn't recorded, so it is
+# skipped in replay mode.
+
+UPSTREAM_RECORDING = os.environ.get("UPSTREAM_RECORDING", "")  # "", "record" or "replay"
+UPSTREAM_RECORDING_FILE = os.environ.get(
+    "UPSTREAM_RECORDING_FILE", os.path.join(tempfile.gettempdir(), "warranty-upstream.jsonl"))
+
+RECORDING = UPSTREAM_RECORDING == "record"
+REPLAYING = UPSTREAM_RECORDING == "replay"
+if UPSTREAM_RECORDING not in ("", "record", "replay"):
+    raise ValueError(f"Unknown UPSTREAM_RECORDING {UPSTREAM_RECORDING!r} (expected record or replay)")
+
+REDACTED = "REDACTED"
+SECRET_HEADERS = {"authorization", "proxy-authorization", "cookie", "set-cookie", "x-csrf-token",
+                  "x-xsrf-token", "x-api-key"}
+SECRET_NAME = re.compile(r"token|secret|password|passwd|api[_-]?key|signature", re.I)
+# Hop-by-hop and encoding headers don't apply to the decoded bodies that are recorded
+_DROPPED_RESPONSE_HEADERS = {"content-encoding", "content-length", "transfer-encoding", "connection"}
+
+
+def _redact_header(name, value):
+    name = name.lower()
+    if name == "cookie":
+        return "; ".join(f"{pair.split('=', 1)[0].strip()}={REDACTED}" for pair in value.split(";") if pair.strip())
+    if name == "set-cookie":
+        cookie, sep, attributes = value.partition(";")
+        return f"{cookie.split('=', 1)[0]}={REDACTED}{sep}{attributes}"
+    if name in SECRET_HEADERS:
+        return REDACTED
+    return value
+
+
+def redact_headers(headers):
+    return [[name, _redact_header(name, value)] for name, value in headers]
+
+
+def redact_url(url):
+    parts = urlsplit(url)
+    if not parts.query:
+        return url
+    query = [(k, REDACTED if SECRET_NAME.search(k) and v else v) for k, v in parse_qsl(parts.query, keep_blank_values=True)]
+    return urlunsplit(parts._replace(query=urlencode(query)))
+
+
+def _redact_json(value):
+    if isinstance(value, dict):
+        return {k: REDACTED if SECRET_NAME.search(k) and isinstance(v, str) and v else _redact_json(v)
+                for k, v in value.items()}
+    if isinstance(value, list):
+        return [_redact_json(v) for v in value]
+    return value
+
+
+def redact_body(text):
+    """Secret JSON fields and CSRF tokens embedded in pages replaced by REDACTED"""
+    if not text:
+        return text
+    try:
+        return json.dumps(_redact_json(json.loads(text)), ensure_ascii=False)
+    except ValueError:
+        pass
+    for pattern in CSRF_PATTERNS:
+        text = pattern.sub(lambda m: m.group(0).replace(m.group(1), REDACTED), text)
+    return text
+
+
+def _decode_body(content):
+    """(text, encoding) for a JSON line: UTF-8 text as is, anything else base64"""
+    try:
+        return content.decode("utf-8"), "text"
+    except UnicodeDecodeError:
+        return base64.b64encode(content).decode("ascii"), "base64"
+
+
+def _encode_body(body, encoding):
+    return base64.b64decode(body) if encoding == "base64" else (body or "").encode("utf-8")
+
+
+def _request_key(method, url, body):
+    """Replay match key; the body is compared after redaction, JSON with sorted keys"""
+    body = redact_body(body or "")
+    try:
+        body = json.dumps(json.loads(body), sort_keys=True, separators=(",", ":"))
+    except ValueError:
+        pass
+    return method.upper(), redact_url(url), body
+
+
+_stats = {"recorded": 0, "replayed": 0, "missed": 0}
+_write_lock = threading.Lock()
+
+
+def record(client, method, url, request_headers, request_body, status, response_headers, response_body, elapsed):
+    """Append one redacted request/response pair to UPSTREAM_RECORDING_FILE"""
+    request_text, _ = _decode_body(request_body or b"")
+    response_text, response_encoding = _decode_body(response_body)
+    if response_encoding == "text":
+        response_text = redact_body(response_text)
+    entry = {
+        "recorded_at": datetime.now(timezone.utc).isoformat(timespec="milliseconds"),
+        "client": client,
+        "method": method.upper(),
+        "url": redact_url(url),
+        "request": {"headers": redact_headers(request_headers), "body": redact_body(request_text)},
+        "response": {
+            "status": status,
+            "headers": redact_headers((k, v) for k, v in response_headers if k.lower() not in _DROPPED_RESPONSE_HEADERS),
+            "body": response_text,
+            "encoding": response_encoding,
+        },
+        "elapsed_ms": round(elapsed * 1000, 1),
+    }
+    line = json.dumps(entry, ensure_ascii=False) + "\n"
+    with _write_lock:
+        with open(UPSTREAM_RECORDING_FILE, "a", encoding="utf-8") as f:
+            f.write(line)
+        _stats["recorded"] += 1
+
+
+class Recordings:
+    """Recorded responses by request key, served in recorded order (cycling when exhausted)"""
+
+    def __init__(self, path):
+        self.path = path
+        self._responses = {}
+        self._next = {}
+        self._lock = threading.Lock()
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    entry = json.loads(line)
+                    key = _request_key(entry["method"], entry["url"], entry["request"].get("body"))
+                    self._responses.setdefault(key, []).append(entry["response"])
+
+    def __len__(self):
+        return sum(len(responses) for responses in self._responses.values())
+
+    def match(self, method, url, body):
+        key = _request_key(method, url, body)
+        with self._lock:
+            responses = self._responses.get(key)
+            if not responses:
+                _stats["missed"] += 1
+                return None
+            index = self._next.get(key, 0)
+            self._next[key] = index + 1
+            _stats["replayed"] += 1
+        return responses[index % len(responses)]
+
+
+_recordings = None
+_recordings_lock = threading.Lock()
+
+
+def recordings():
+    """The replay file, loaded on first use"""
+    global _recordings
+    with _recordings_lock:
+        if _recordings is None:
+            _recordings = Recordings(UPSTREAM_RECORDING_FILE)
+            print(f"[Replay] Loaded {len(_recordings)} recorded responses from {UPSTREAM_RECORDING_FILE}", file=sys.stderr)
+        return _recordings
+
+
+def _replay_miss(method, url):
+    message = f"no recorded response for {method} {redact_url(url)}"
+    print(f"[Replay] {message}", file=sys.stderr)
+    return message
+
+
+def stats():
+    return {"mode": UPSTREAM_RECORDING or None, "file": UPSTREAM_RECORDING_FILE if UPSTREAM_RECORDING else None, **_stats}
+
+
+# --- httpx (Lenovo) ---
+
+def httpx_transport(client, **transport_kwargs):
+    """
+    Transport for an httpx.AsyncClient: None (httpx's default) unless recording or replaying.
+    `transport_kwargs` (http2, limits) configure the real transport when recording.
+    """
+    import httpx
+
+    class RecordingTransport(httpx.AsyncBaseTransport):
+        def __init__(self):
+            self._transport = httpx.AsyncHTTPTransport(**transport_kwargs)
+
+        async def handle_async_request(self, request):
+            start = time.perf_counter()
+            response = await self._transport.handle_async_request(request)
+            # Read (and decode) the body here so it can be recorded; the caller gets it decoded
+            response = httpx.Response(response.status_code, headers=response.headers,
+                                      stream=response.stream, extensions=response.extensions, request=request)
+            content = await response.aread()
+            await response.aclose()
+            headers = [(k, v) for k, v in response.headers.multi_items() if k.lower() not in _DROPPED_RESPONSE_HEADERS]
+            record(client, request.method, str(request.url), request.headers.multi_items(), request.content,
+                   response.status_code, headers, content, time.perf_counter() - start)
+            return httpx.Response(response.status_code, headers=headers, content=content,
+                                  extensions=response.extensions, request=request)
+
+        async def aclose(self):
+            await self._transport.aclose()
+
+    class ReplayTransport(httpx.AsyncBaseTransport):
+        async def handle_async_request(self, request):
+            body = (await request.aread()).decode("utf-8", "replace")
+            recorded = recordings().match(request.method, str(request.url), body)
+            if recorded is None:
+                raise httpx.ConnectError(_replay_miss(request.method, str(request.url)), request=request)
+            return httpx.Response(recorded["status"], headers=recorded["headers"],
+                                  content=_encode_body(recorded["body"], recorded.get("encoding")), request=request)
+
+    if RECORDING:
+        return RecordingTransport()
+    if REPLAYING:
+        return ReplayTransport()
+    return None
+
+
+# --- requests (HP) ---
+
+def requests_adapter(client, **adapter_kwargs):
+    """HTTPAdapter for a requests.Session, recording or replaying when enabled"""
+    import requests
+    from requests.adapters import HTTPAdapter
+    from requests.structures import CaseInsensitiveDict
+    from requests.utils import get_encoding_from_headers
+
+    class RecordingAdapter(HTTPAdapter):
+        def send(self, request, **kwargs):
+            start = time.perf_counter()
+            response = super().send(request, **kwargs)
+            body = request.body.encode("utf-8") if isinstance(request.body, str) else request.body
+            record(client, request.method, request.url, request.headers.items(), body, response.status_code,
+                   response.headers.items(), response.content, time.perf_counter() - start)
+            return response
+
+    class ReplayAdapter(HTTPAdapter):
+        def send(self, request, **kwargs):
+            body = request.body.decode("utf-8", "replace") if isinstance(request.body, bytes) else request.body
+            recorded = recordings().match(request.method, request.url, body)
+            if recorded is None:
+                raise requests.ConnectionError(_replay_miss(request.method, request.url), request=request)
+            response = requests.Response()
+            response.status_code = recorded["status"]
+            response.headers = CaseInsensitiveDict(dict(recorded["headers"]))
+            response._content = _encode_body(recorded["body"], recorded.get("encoding"))
+            response.encoding = get_encoding_from_headers(response.headers)
+            response.url = request.url
+            response.request = request
+            response.reason = "Replayed"
+            return response
+
+    if RECORDING:
+        return RecordingAdapter(**adapter_kwargs)
+    if REPLAYING:
+        return ReplayAdapter(**adapter_kwargs)
+    return HTTPAdapter(**adapter_kwargs)
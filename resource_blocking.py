@@ -0,0 +1,122 @@
+import os
+import threading
+
+# Resource blocking for the HP browser: requests the warranty lookup doesn't need (images,
+# fonts, media, analytics, ads, consent banners) are refused by Chrome itself through the
+# DevTools Network.setBlockedURLs list. Optional traffic measurement counts the requests and
+# bytes each lookup still downloads, to compare profiles.
+
+HP_BLOCK_PROFILE = os.environ.get("HP_BLOCK_PROFILE", "default")
+HP_BLOCK_TYPES = os.environ.get("HP_BLOCK_TYPES")  # comma-separated, replaces the profile's types
+HP_BLOCK_URLS = os.environ.get("HP_BLOCK_URLS", "")  # comma-separated extra URL patterns
+HP_MEASURE_TRAFFIC = os.environ.get("HP_MEASURE_TRAFFIC", "0") == "1"
+
+# setBlockedURLs only matches URLs, so resource types map to file extensions. Images are also
+# switched off in Chrome's content settings, which catches the extension-less ones.
+RESOURCE_TYPE_EXTENSIONS = {
+    "image": ("png", "jpg", "jpeg", "gif", "webp", "avif", "svg", "ico", "bmp"),
+    "font": ("woff", "woff2", "ttf", "otf", "eot"),
+    "media": ("mp4", "webm", "m4v", "m3u8", "mp3", "ogg", "wav"),
+    "stylesheet": ("css",),
+}
+
+BLOCK_PROFILES = {
+    "none": {"types": (), "urls": ()},
+    # Safe default: nothing the result page's scripts or its warranty XHR depend on
+    "default": {
+        "types": ("image", "font", "media"),
+        "urls": (
+            # Analytics and tag managers
+            "*google-analytics.com*", "*googletagmanager.com*", "*adobedtm.com*", "*omtrdc.net*",
+            "*demdex.net*", "*hotjar.com*", "*clarity.ms*", "*qualtrics.com*", "*contentsquare.net*",
+            # Ads and social pixels
+            "*doubleclick.net*", "*googlesyndication.com*", "*googleadservices.com*",
+            "*facebook.net*", "*bat.bing.com*", "*linkedin.com/px*", "*ads-twitter.com*",
+            # OneTrust consent banner
+            "*cookielaw.org*", "*onetrust.com*", "*otSDKStub.js*", "*otBannerSdk.js*",
+            # Embedded video
+            "*youtube.com*", "*ytimg.com*", "*brightcove*",
+        ),
+    },
+}
+
+
+def blocked_types(profile=HP_BLOCK_PROFILE, types=HP_BLOCK_TYPES):
+    if types is not None:
+        return [t.strip() for t in types.split(",") if t.strip()]
+    if profile not in BLOCK_PROFILES:
+        raise ValueError(f"Unknown HP_BLOCK_PROFILE {profile!r} (expected one of {', '.join(BLOCK_PROFILES)})")
+    return list(BLOCK_PROFILES[profile]["types"])
+
+
+def blocked_url_patterns(profile=HP_BLOCK_PROFILE, types=HP_BLOCK_TYPES, extra=HP_BLOCK_URLS):
+    """The Network.setBlockedURLs patterns for a profile, resource type list and extra patterns"""
+    patterns = []
+    for resource_type in blocked_types(profile, types):
+        if resource_type not in RESOURCE_TYPE_EXTENSIONS:
+            raise ValueError(f"Unknown resource type {resource_type!r} in HP_BLOCK_TYPES")
+        for extension in RESOURCE_TYPE_EXTENSIONS[resource_type]:
+            patterns.extend((f"*.{extension}", f"*.{extension}?*"))
+    if profile in BLOCK_PROFILES:
+        patterns.extend(BLOCK_PROFILES[profile]["urls"])
+    patterns.extend(p.strip() for p in extra.split(",") if p.strip())
+    return patterns
+
+
+def configure_options(options):
+    """Chrome options side of blocking (set before the driver starts)"""
+    if "image" in blocked_types():
+        options.add_experimental_option("prefs", {"profile.managed_default_content_settings.images": 2})
+
+
+def apply_blocking(driver):
+    """Install the blocklist in a running driver; returns the number of patterns"""
+    patterns = blocked_url_patterns()
+    if patterns:
+        driver.execute_cdp_cmd("Network.enable", {})
+        driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": patterns})
+    return len(patterns)
+
+
+class TrafficMeter:
+    """Requests, bytes and blocked requests of one lookup, fed with DevTools network events"""
+
+    def __init__(self):
+        self.requests = 0
+        self.bytes = 0
+        self.blocked = 0
+
+    def add(self, message):
+        method, params = message.get("method"), message.get("params", {})
+        if method == "Network.requestWillBeSent":
+            self.requests += 1
+        elif method == "Network.loadingFinished":
+            self.bytes += int(params.get("encodedDataLength", 0))
+        elif method == "Network.loadingFailed" and params.get("blockedReason"):
+            self.blocked += 1
+
+
+_traffic = {"lookups": 0, "requests": 0, "bytes": 0, "blocked": 0}
+_traffic_lock = threading.Lock()
+
+
+def record_traffic(meter):
+    with _traffic_lock:
+        _traffic["lookups"] += 1
+        _traffic["requests"] += meter.requests
+        _traffic["bytes"] += meter.bytes
+        _traffic["blocked"] += meter.blocked
+
+
+def traffic_stats():
+    """Per-lookup averages of the measured browser traffic (HP_MEASURE_TRAFFIC=1)"""
+    with _traffic_lock:
+        traffic = dict(_traffic)
+    lookups = traffic["lookups"]
+    return {
+        "profile": HP_BLOCK_PROFILE,
+        "lookups": lookups,
+        "requests_per_lookup": round(traffic["requests"] / lookups, 1) if lookups else 0.0,
+        "kb_per_lookup": round(traffic["bytes"] / 1024 / lookups, 1) if lookups else 0.0,
+        "blocked_per_lookup": round(traffic["blocked"] / lookups, 1) if lookups else 0.0,
+    }
@@ -0,0 +1,40 @@
+import asyncio
+
+# In-flight request coalescing: concurrent callers for the same key await one shared
+# upstream call and all get its result (or its exception).
+
+
+class SingleFlight:
+    def __init__(self):
+        self._inflight = {}
+        self.upstream_calls = 0
+        self.coalesced = 0  # upstream calls saved
+
+    def in_flight(self, key):
+        return key in self._inflight
+
+    async def do(self, key, func):
+        """Await func() once per key at a time; later callers share the running call"""
+        task = self._inflight.get(key)
+        if task is None:
+            # Run as its own task so one caller disconnecting doesn't cancel it for the others
+            task = asyncio.ensure_future(func())
+            self._inflight[key] = task
+            self.upstream_calls += 1
+            task.add_done_callback(lambda t: self._done(key, t))
+        else:
+            self.coalesced += 1
+        return await asyncio.shield(task)
+
+    def _done(self, key, task):
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        if not task.cancelled():
+            task.exception()  # mark retrieved even if every waiter went away
+
+    def stats(self):
+        return {
+            "in_flight": len(self._inflight),
+            "upstream_calls": self.upstream_calls,
+            "coalesced": self.coalesced,
+        }
@@ -0,0 +1,72 @@
+"""
+Latency and error injection shared by the stand-in vendor servers.
+
+STANDIN_LATENCY_MS is the mean delay of every upstream call, drawn from
+STANDIN_LATENCY_DIST: fixed (default), uniform (mean ± spread), normal, lognormal (a long
+right tail, like real vendor APIs) or exponential. STANDIN_LATENCY_SPREAD_MS is the
+half-width for uniform and the standard deviation for normal and lognormal.
+STANDIN_ERROR_RATE (0-1) answers that share of API calls with an error status picked
+from STANDIN_ERROR_STATUS (comma-separated, default 500; 429 carries Retry-After: 1).
+STANDIN_SEED makes the draws reproducible.
+"""
+import asyncio
+import math
+import os
+import random
+
+from fastapi.responses import JSONResponse
+
+STANDIN_LATENCY_MS = float(os.environ.get("STANDIN_LATENCY_MS", "0"))
+STANDIN_LATENCY_DIST = os.environ.get("STANDIN_LATENCY_DIST", "fixed")
+STANDIN_LATENCY_SPREAD_MS = float(os.environ.get("STANDIN_LATENCY_SPREAD_MS", "0"))
+STANDIN_ERROR_RATE = float(os.environ.get("STANDIN_ERROR_RATE", "0"))
+STANDIN_ERROR_STATUS = [int(s) for s in os.environ.get("STANDIN_ERROR_STATUS", "500").split(",") if s.strip()]
+STANDIN_SEED = os.environ.get("STANDIN_SEED")
+
+LATENCY_DISTRIBUTIONS = ("fixed", "uniform", "normal", "lognormal", "exponential")
+if STANDIN_LATENCY_DIST not in LATENCY_DISTRIBUTIONS:
+    raise ValueError(f"Unknown STANDIN_LATENCY_DIST {STANDIN_LATENCY_DIST!r} "
+                     f"(expected one of {', '.join(LATENCY_DISTRIBUTIONS)})")
+
+_random = random.Random(STANDIN_SEED)
+injected = {}  # status -> errors answered
+
+
+def latency_ms(mean=STANDIN_LATENCY_MS, dist=STANDIN_LATENCY_DIST, spread=STANDIN_LATENCY_SPREAD_MS):
+    """One delay draw in milliseconds"""
+    if mean <= 0:
+        return 0.0
+    if dist == "uniform":
+        return max(0.0, _random.uniform(mean - spread, mean + spread))
+    if dist == "normal":
+        return max(0.0, _random.gauss(mean, spread))
+    if dist == "lognormal":
+        # mu/sigma chosen so the draws have the given mean and standard deviation
+        sigma2 = math.log(1 + (spread / mean) ** 2)
+        return _random.lognormvariate(math.log(mean) - sigma2 / 2, math.sqrt(sigma2))
+    if dist == "exponential":
+        return _random.expovariate(1 / mean)
+    return mean
+
+
+async def latency():
+    delay = latency_ms()
+    if delay:
+        await asyncio.sleep(delay / 1000)
+
+
+def injected_error():
+    """An error response for STANDIN_ERROR_RATE of the calls, else None"""
+    if not STANDIN_ERROR_RATE or _random.random() >= STANDIN_ERROR_RATE:
+        return None
+    status = _random.choice(STANDIN_ERROR_STATUS)
+    injected[status] = injected.get(status, 0) + 1
+    headers = {"Retry-After": "1"} if status == 429 else None
+    return JSONResponse({"code": status, "msg": "injected error"}, status_code=status, headers=headers)
+
+
+def stats():
+    return {"latency": {"mean_ms": STANDIN_LATENCY_MS, "dist": STANDIN_LATENCY_DIST,
+                        "spread_ms": STANDIN_LATENCY_SPREAD_MS},
+            "error_rate": STANDIN_ERROR_RATE,
+            "injected_errors": {str(status): count for status, count in sorted(injected.items())}}
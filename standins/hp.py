@@ -0,0 +1,164 @@
+"""
+Local stand-in for the support.hp.com endpoints used by the HP lookup.
+
+Run with:
+    uvicorn standins.hp:app --port 9002
+and point the API at it with HP_BASE_URL=http://127.0.0.1:9002.
+
+Serves the product search API (wcc-services/search/sn), the warranty-details API the
+result page calls, and a static warranty result page for the browser fallback, which
+renders its dates STANDIN_RENDER_DELAY_MS after load (like the real single-page app).
+The page also pulls in the kind of weight the real one carries (hero image, web font,
+promo video, a OneTrust-style consent script), served from /assets, so resource
+blocking can be measured.
+
+Serials containing "NOTFOUND" are unknown. STANDIN_WARRANTY_API_FAIL=1 makes the
+warranty API answer 500 so the browser fallback is exercised. Latency and injected
+errors are configured as described in standins/_faults.py (STANDIN_LATENCY_MS,
+STANDIN_LATENCY_DIST, STANDIN_ERROR_RATE, ...) and apply to the JSON APIs, including
+the warranty call the result page makes. GET /standin/stats counts calls and injected
+errors.
+"""
+import os
+
+from fastapi import FastAPI, Request
+from fastapi.responses import HTMLResponse, JSONResponse, Response
+
+from standins import _faults
+
+STANDIN_RENDER_DELAY_MS = float(os.environ.get("STANDIN_RENDER_DELAY_MS", "800"))
+STANDIN_WARRANTY_API_FAIL = os.environ.get("STANDIN_WARRANTY_API_FAIL", "0") == "1"
+
+PRODUCT_NAME = "HP EliteBook 840 G8 Notebook PC"
+
+app = FastAPI(title="HP stand-in")
+
+_stats = {"searches": 0, "warranty_calls": 0, "result_pages": 0}
+
+
+@app.get("/standin/stats")
+async def stats():
+    return {**_stats, **_faults.stats()}
+
+
+def _coverages(serial):
+    return [
+        {"type": "Base", "offerDescription": "Base Warranty", "status": "Active",
+         "startDate": "2022-02-01", "endDate": "2025-01-31"},
+        {"type": "Care Pack", "offerDescription": "HP Care Pack Next Business Day", "status": "Active",
+         "startDate": "2022-02-01", "endDate": "2026-01-31"},
+    ]
+
+
+@app.get("/wcc-services/search/sn/us-en")
+async def search_serial(serialNumber: str = ""):
+    await _faults.latency()
+    _stats["searches"] += 1
+    error = _faults.injected_error()
+    if error is not None:
+        return error
+    if not serialNumber or "NOTFOUND" in serialNumber.upper():
+        return {"code": 404, "data": None}
+    return {
+        "code": 200,
+        "data": {
+            "productName": PRODUCT_NAME,
+            "SEOFriendlyName": "hp-elitebook-840-g8-notebook-pc",
+            "productSeriesOID": "38492736",
+            "productNameOID": "38492737",
+            "productNumber": "3C6D5UT#ABA",
+        },
+    }
+
+
+@app.post("/wcc-services/profile/devices/warranty/specs")
+async def warranty_specs(request: Request):
+    await _faults.latency()
+    _stats["warranty_calls"] += 1
+    error = _faults.injected_error()
+    if error is not None:
+        return error
+    if STANDIN_WARRANTY_API_FAIL:
+        return JSONResponse({"code": 500, "msg": "internal error"}, status_code=500)
+    body = await request.json()
+    devices = []
+    for device in body.get("deviceList", []):
+        serial = device.get("serialNumber", "")
+        devices.append({
+            "serialNumber": serial,
+            "productNumber": device.get("productNumber"),
+            "productName": PRODUCT_NAME,
+            "warranty": _coverages(serial)[0],
+            "offers": _coverages(serial)[1:],
+        })
+    return {"code": 200, "data": {"devices": devices}}
+
+
+RESULT_PAGE = """<!doctype html>
+<html><head><title>Warranty Check | HP Support</title>
+<link rel="stylesheet" href="/assets/site.css">
+<link rel="preload" as="font" type="font/woff2" href="/assets/forma.woff2" crossorigin>
+<script src="/assets/otSDKStub.js" async></script>
+</head>
+<body>
+<h1>Warranty information</h1>
+<img src="/assets/hero.jpg" alt="">
+<video src="/assets/promo.mp4" preload="auto" muted></video>
+<div id="app">Loading...</div>
+<script>
+  setTimeout(function () {
+    var serial = new URLSearchParams(location.search).get('serialnumber') || '';
+    fetch('/wcc-services/profile/devices/warranty/specs?cache=true&authState=anonymous&template=checkWarranty', {
+      method: 'POST', headers: {'Content-Type': 'application/json'},
+      body: JSON.stringify({deviceList: [{serialNumber: serial}]})
+    }).then(function (r) { return r.json(); }).then(function (payload) {
+      document.getElementById('app').innerHTML =
+        '<h2 class="product-title">%(product)s</h2>' +
+        '<div>Start date</div><div>February 1, 2022</div>' +
+        '<div>End date</div><div>January 31, 2025</div>';
+    });
+  }, %(delay)d);
+</script>
+</body></html>
+"""
+
+
+@app.get("/us-en/warrantyresult/{seo_name}/{series_oid}/model/{model_oid}", response_class=HTMLResponse)
+async def warranty_result_page(seo_name: str, series_oid: str, model_oid: str):
+    _stats["result_pages"] += 1
+    return RESULT_PAGE % {"product": PRODUCT_NAME, "delay": STANDIN_RENDER_DELAY_MS}
+
+
+# name -> (content type, size in bytes), roughly what the real page downloads per kind
+ASSETS = {
+    "site.css": ("text/css", 60_000),
+    "forma.woff2": ("font/woff2", 45_000),
+    "otSDKStub.js": ("application/javascript", 120_000),
+    "hero.jpg": ("image/jpeg", 250_000),
+    "promo.mp4": ("video/mp4", 1_500_000),
+}
+
+
+@app.get("/assets/{name}")
+async def asset(name: str):
+    if name not in ASSETS:
+        return Response(status_code=404)
+    content_type, size = ASSETS[name]
+    if content_type.startswith(("text/", "application/javascript")):
+        body = b"/*" + b" " * (size - 4) + b"*/"  # valid, inert CSS/JS
+    else:
+        body = b"\0" * size
+    return Response(body, media_type=content_type)
+
+
+@app.get("/us-en/check-warranty", response_class=HTMLResponse)
+async def check_warranty_page():
+    return """<!doctype html><html><body>
+<input id="inputtextpfinder"><button id="FindMyProduct">Submit</button>
+<script>
+  document.getElementById('FindMyProduct').addEventListener('click', function () {
+    var serial = encodeURIComponent(document.getElementById('inputtextpfinder').value);
+    location.href = '/us-en/warrantyresult/product/0/model/0?serialnumber=' + serial;
+  });
+</script>
+</body></html>"""
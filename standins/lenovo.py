@@ -0,0 +1,134 @@
+"""
+Local stand-in for the pcsupport.lenovo.com endpoints used by the Lenovo lookup.
+
+Run with:
+    uvicorn standins.lenovo:app --port 9001
+and point the API at it with LENOVO_BASE_URL=http://127.0.0.1:9001.
+
+Serials containing "NOTFOUND" return an empty product list. Latency and injected errors
+are configured as described in standins/_faults.py (STANDIN_LATENCY_MS,
+STANDIN_LATENCY_DIST, STANDIN_ERROR_RATE, ...); errors hit the two API endpoints only.
+
+Like the real site, getIbaseInfo requires the session cookie and x-csrf-token handed out
+by the bootstrap page (GET /us/en/) and answers 403 otherwise. Tokens expire after
+STANDIN_TOKEN_TTL seconds; POST /standin/rotate invalidates all of them at once.
+GET /standin/stats reports bootstraps, accepted and rejected calls and injected errors. Set
+STANDIN_REQUIRE_CSRF=0 to accept any token (e.g. for the hardcoded-token CLI).
+
+STANDIN_RATE_LIMIT (requests/s over both API endpoints, 0 = off) answers 429 with
+Retry-After: 1 beyond that rate, like the real site's throttling.
+"""
+import os
+import secrets
+import time
+
+from fastapi import FastAPI, Request
+from fastapi.responses import HTMLResponse, JSONResponse
+
+from standins import _faults
+
+STANDIN_TOKEN_TTL = float(os.environ.get("STANDIN_TOKEN_TTL", "3600"))
+STANDIN_REQUIRE_CSRF = os.environ.get("STANDIN_REQUIRE_CSRF", "1") == "1"
+STANDIN_RATE_LIMIT = float(os.environ.get("STANDIN_RATE_LIMIT", "0"))
+SESSION_COOKIE = "JSESSIONID"
+
+app = FastAPI(title="Lenovo stand-in")
+
+# session id -> (csrf token, expires at)
+_sessions = {}
+_stats = {"bootstraps": 0, "accepted": 0, "rejected": 0, "throttled": 0}
+_window = [0, 0]  # [current second, calls in it]
+
+
+@app.get("/us/en/", response_class=HTMLResponse)
+async def bootstrap_page():
+    await _faults.latency()
+    session_id, token = secrets.token_hex(16), secrets.token_urlsafe(16)
+    _sessions[session_id] = (token, time.time() + STANDIN_TOKEN_TTL)
+    _stats["bootstraps"] += 1
+    html = f'<html><head><meta name="csrf-token" content="{token}"></head><body>PC Support</body></html>'
+    response = HTMLResponse(html)
+    response.set_cookie(SESSION_COOKIE, session_id, httponly=True)
+    return response
+
+
+@app.post("/standin/rotate")
+async def rotate():
+    _sessions.clear()
+    return {"rotated": True}
+
+
+@app.get("/standin/stats")
+async def stats():
+    return {**_stats, **_faults.stats()}
+
+
+def _throttled():
+    """True (and counted) if this API call is over STANDIN_RATE_LIMIT"""
+    if not STANDIN_RATE_LIMIT:
+        return False
+    second = int(time.time())
+    if _window[0] != second:
+        _window[0], _window[1] = second, 0
+    _window[1] += 1
+    if _window[1] > STANDIN_RATE_LIMIT:
+        _stats["throttled"] += 1
+        return True
+    return False
+
+
+def _too_many():
+    return JSONResponse({"code": 429, "msg": "too many requests"}, status_code=429, headers={"Retry-After": "1"})
+
+
+def _session_valid(request):
+    entry = _sessions.get(request.cookies.get(SESSION_COOKIE, ""))
+    if entry is None:
+        return False
+    token, expires_at = entry
+    return token == request.headers.get("x-csrf-token") and time.time() < expires_at
+
+
+@app.get("/us/en/api/v4/mse/getproducts")
+async def getproducts(productId: str):
+    await _faults.latency()
+    if _throttled():
+        return _too_many()
+    error = _faults.injected_error()
+    if error is not None:
+        return error
+    if "NOTFOUND" in productId.upper():
+        return []
+    serial = productId.lower()
+    return [{
+        "Id": f"/laptops-and-netbooks/thinkpad-t-series-laptops/thinkpad-t14-gen-2-type-20w0-20w1/20w0/20w0s00000/{serial}",
+        "Name": "ThinkPad T14 Gen 2 (Type 20W0, 20W1) Laptop",
+    }]
+
+
+@app.post("/us/en/api/v4/upsell/redport/getIbaseInfo")
+async def get_ibase_info(request: Request):
+    await _faults.latency()
+    if _throttled():
+        return _too_many()
+    error = _faults.injected_error()
+    if error is not None:
+        return error
+    if STANDIN_REQUIRE_CSRF and not _session_valid(request):
+        _stats["rejected"] += 1
+        return JSONResponse({"code": 403, "msg": "invalid csrf token"}, status_code=403)
+    _stats["accepted"] += 1
+    payload = await request.json()
+    serial = payload.get("serialNumber", "")
+    return {
+        "code": 0,
+        "msg": "success",
+        "data": {
+            "machineInfo": {
+                "serial": serial.upper(),
+                "type": payload.get("machineType", "").upper(),
+                "productName": "ThinkPad T14 Gen 2 (Type 20W0, 20W1) Laptop",
+            },
+            "currentWarranty": {"startDate": "2022-03-01", "endDate": "2025-02-28"},
+        },
+    }
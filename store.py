@@ -0,0 +1,113 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+
+# Optional on-disk result store (SQLite, WAL mode) behind the in-memory cache, so restarts
+# and redeploys start warm. WAL lets the API's reader threads run while a writer commits.
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS results (
+    serial     TEXT PRIMARY KEY,
+    status     INTEGER NOT NULL,
+    body       TEXT NOT NULL,
+    fetched_at REAL NOT NULL,
+    expires_at REAL NOT NULL,
+    hits       INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS results_hits ON results (hits DESC);
+"""
+
+
+class ResultStore:
+    def __init__(self, path, retention=30 * 86400):
+        self.path = path
+        self.retention = retention  # keep expired rows this long (stale fallback, hotness)
+        self._local = threading.local()
+        self._pending_hits = {}
+        self._hits_lock = threading.Lock()
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        conn = self._conn()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.executescript(SCHEMA)
+
+    def _conn(self):
+        """One connection per thread; sqlite3 connections must not be shared across threads"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA busy_timeout=5000")
+            self._local.conn = conn
+        return conn
+
+    def get(self, serial, include_expired=False):
+        """Return (status, body, fetched_at, expires_at) or None if missing (or expired)"""
+        row = self._conn().execute(
+            "SELECT status, body, fetched_at, expires_at FROM results WHERE serial = ?", (serial,)
+        ).fetchone()
+        if row is None:
+            return None
+        status, body, fetched_at, expires_at = row
+        if not include_expired and expires_at <= time.time():
+            return None
+        return status, json.loads(body), fetched_at, expires_at
+
+    def put(self, serial, status, body, ttl):
+        now = time.time()
+        self._conn().execute(
+            "INSERT INTO results (serial, status, body, fetched_at, expires_at) VALUES (?, ?, ?, ?, ?) "
+            "ON CONFLICT(serial) DO UPDATE SET status = excluded.status, body = excluded.body, "
+            "fetched_at = excluded.fetched_at, expires_at = excluded.expires_at",
+            (serial, status, json.dumps(body), now, now + ttl),
+        )
+
+    def delete(self, serial):
+        return self._conn().execute("DELETE FROM results WHERE serial = ?", (serial,)).rowcount
+
+    def clear(self):
+        return self._conn().execute("DELETE FROM results").rowcount
+
+    def record_hit(self, serial):
+        """Count a lookup of `serial`; counts are written in batches by flush_hits()"""
+        with self._hits_lock:
+            self._pending_hits[serial] = self._pending_hits.get(serial, 0) + 1
+
+    def flush_hits(self):
+        with self._hits_lock:
+            pending, self._pending_hits = self._pending_hits, {}
+        if pending:
+            conn = self._conn()
+            conn.execute("BEGIN")
+            conn.executemany("UPDATE results SET hits = hits + ? WHERE serial = ?",
+                             [(count, serial) for serial, count in pending.items()])
+            conn.execute("COMMIT")
+        return len(pending)
+
+    def prune(self):
+        """Delete rows that expired more than `retention` seconds ago"""
+        return self._conn().execute(
+            "DELETE FROM results WHERE expires_at < ?", (time.time() - self.retention,)
+        ).rowcount
+
+    def hottest(self, limit):
+        """Unexpired entries with the most hits, for warming the memory cache at boot"""
+        rows = self._conn().execute(
+            "SELECT serial, status, body, expires_at FROM results WHERE expires_at > ? "
+            "ORDER BY hits DESC LIMIT ?", (time.time(), limit)
+        ).fetchall()
+        return [(serial, status, json.loads(body), expires_at) for serial, status, body, expires_at in rows]
+
+    def stats(self):
+        count, live = self._conn().execute(
+            "SELECT COUNT(*), COALESCE(SUM(expires_at > ?), 0) FROM results", (time.time(),)
+        ).fetchone()
+        return {"path": self.path, "entries": count, "unexpired": live}
+
+    def close(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
@@ -0,0 +1,27 @@
+"""The /admin cache purge endpoints are closed unless ADMIN_TOKEN is configured and sent."""
+import asyncio
+
+import httpx
+
+import main
+
+
+def purge(token=None):
+    async def go():
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            headers = {"X-Admin-Token": token} if token is not None else {}
+            return await client.delete("/admin/cache/5CD0000701", headers=headers)
+    return asyncio.run(go())
+
+
+def test_purge_denied_without_admin_token(monkeypatch):
+    monkeypatch.setattr(main, "ADMIN_TOKEN", "")
+    assert purge().status_code == 403
+    assert purge("").status_code == 403
+
+
+def test_purge_needs_the_configured_token(monkeypatch):
+    monkeypatch.setattr(main, "ADMIN_TOKEN", "s3cret")
+    assert purge("wrong").status_code == 403
+    assert purge("s3cret").status_code == 200
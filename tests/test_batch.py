@@ -0,0 +1,53 @@
+"""POST /warranty/batch: per-vendor fan-out, one NDJSON line per serial in completion order."""
+import asyncio
+import json
+
+import httpx
+
+import main
+
+DELAYS = {"PF000001": 0.1, "PF000002": 0.01, "PF000003": 0.01, "5CD0000901": 0.03}
+
+
+def _batch(payload):
+    async def go():
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return await client.post("/warranty/batch", json=payload)
+    return asyncio.run(go())
+
+
+def test_lines_arrive_in_completion_order_within_vendor_limits(monkeypatch):
+    running, peaks = {}, {}
+
+    async def get_warranty(serial, brand):
+        running[brand] = running.get(brand, 0) + 1
+        peaks[brand] = max(peaks.get(brand, 0), running[brand])
+        await asyncio.sleep(DELAYS[serial])
+        running[brand] -= 1
+        if serial == "PF000003":
+            raise RuntimeError("boom")
+        if serial == "5CD0000901":
+            return 503, "HP is unavailable", None, {"Retry-After": "30"}
+        return 200, {"Serial Number": serial}, "MISS", None
+    monkeypatch.setattr(main, "get_warranty", get_warranty)
+    monkeypatch.setattr(main.get_provider("Lenovo"), "batch_concurrency", 2)
+
+    response = _batch({"serials": ["PF000001", "XYZ0000901", "PF000002", "5CD0000901", "PF000003"]})
+    lines = [json.loads(line) for line in response.text.splitlines()]
+
+    assert response.headers["Content-Type"] == "application/x-ndjson"
+    assert [item["index"] for item in lines] == [1, 2, 4, 3, 0]
+    assert lines[0] == {"index": 1, "serial": "XYZ0000901", "brand": "Desconocido", "status": 400,
+                        "error": "Unsupported brand: Desconocido"}
+    assert lines[1] == {"index": 2, "serial": "PF000002", "brand": "Lenovo", "status": 200,
+                        "result": {"Serial Number": "PF000002"}, "cache": "MISS"}
+    assert lines[2]["status"] == 500 and "boom" in lines[2]["error"]
+    assert lines[3]["retry_after"] == 30
+    assert peaks["Lenovo"] == 2
+
+
+def test_oversized_batch_is_rejected(monkeypatch):
+    monkeypatch.setattr(main, "BATCH_MAX_SERIALS", 2)
+    response = _batch({"serials": ["PF000001", "PF000002", "PF000003"]})
+    assert response.status_code == 413
@@ -0,0 +1,31 @@
+"""Batch NDJSON lines stream through a real server even when the client accepts gzip."""
+import json
+import time
+
+import httpx
+
+from bench._util import serve
+
+LENOVO_LATENCY_MS = 750
+APP_ENV = {"CACHE_TTL_FOUND": "0", "CACHE_TTL_NEGATIVE": "0", "WARRANTY_DB_PATH": "", "WARM_PROVIDERS": "Lenovo"}
+
+
+def test_first_batch_line_arrives_gzipped_before_the_batch_ends():
+    with serve("standins.lenovo:app", env={"STANDIN_LATENCY_MS": str(LENOVO_LATENCY_MS)}) as (lenovo_url, _), \
+            serve("main:app", env=dict(APP_ENV, LENOVO_BASE_URL=lenovo_url)) as (base_url, _):
+        # The unsupported serial answers at once; the Lenovo ones wait on the slow stand-in
+        serials = ["XYZ123", "PF000001", "PF000002"]
+        arrivals = []
+        with httpx.Client(base_url=base_url, timeout=30) as client:
+            start = time.perf_counter()
+            with client.stream("POST", "/warranty/batch", json={"serials": serials},
+                               headers={"Accept-Encoding": "gzip"}) as response:
+                assert response.headers["Content-Encoding"] == "gzip"
+                for line in response.iter_lines():
+                    if line:
+                        arrivals.append((time.perf_counter() - start, json.loads(line)))
+
+    assert sorted(item["serial"] for _, item in arrivals) == sorted(serials)
+    (first_at, first), (last_at, _) = arrivals[0], arrivals[-1]
+    assert first["serial"] == "XYZ123" and first["status"] == 400
+    assert last_at - first_at > LENOVO_LATENCY_MS / 1000
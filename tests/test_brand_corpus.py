@@ -0,0 +1,9 @@
+"""Every serial in the golden corpus (bench/brand_corpus.json) still gets its expected brand."""
+from bench.brand_detection import check_corpus, load_corpus
+
+
+def test_golden_corpus_matches():
+    entries = load_corpus()
+    assert entries
+    mismatches = [(entry["serial"], entry["brand"], got) for entry, got in check_corpus(entries)]
+    assert mismatches == []
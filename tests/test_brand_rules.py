@@ -0,0 +1,43 @@
+"""The brand rule table compiled into prefix tries: first match wins, exclusions and checks apply."""
+from brand_rules import AMBIGUOUS_60, INVALID, UNKNOWN, BrandClassifier, classifier, normalizar_serial, rule
+
+
+def test_prefix_and_length_pick_the_brand():
+    assert classifier.classify("5CD1234567") == "HP"
+    assert classifier.classify("PF0ABC12") == "Lenovo"
+    assert classifier.classify("1S20W0S0SH00PF3ABCDE") == "Lenovo"
+    assert classifier.classify("NHQ1234567890ABCD") == "Acer"  # min_length rule
+    assert classifier.classify("600123456789") == AMBIGUOUS_60
+    assert classifier.classify("5CD123456") == UNKNOWN  # right prefix, wrong length
+
+
+def test_excludes_checks_and_exact_serials():
+    assert classifier.classify("CND1234567") == "HP"  # Lenovo's CN rule excludes CND
+    assert classifier.classify("CN405225XM") == "Lenovo"
+    assert classifier.classify("909NTNHJ1234") == "Lenovo"  # HP's 909NT rule excludes it
+    assert classifier.classify("909NTXR5K026") == "HP"
+    assert classifier.classify("909NTUW7K902") == "Dell"  # exact serial beats the prefix rules
+    assert classifier.classify("ABC1234") == "Dell"  # 7-char service tag check
+    assert classifier.classify("1234567") == UNKNOWN  # all digits fails the check
+
+
+def test_invalid_values_and_normalization():
+    for value in (None, "", "N/A", "desktop", 42):
+        assert classifier.classify(value) == INVALID
+    assert normalizar_serial(' "5cd1234567"\n') == "5CD1234567"
+    assert classifier.classify(' "5cd1234567"\n') == "HP"
+
+
+def test_first_matching_row_wins_across_tries():
+    table = [
+        rule("Generic", "AB", min_length=4),
+        rule("Specific", "ABC", lengths=(6,)),
+    ]
+    rules = BrandClassifier(table, exact={}, invalid=set())
+    assert rules.classify("ABCDEF") == "Generic"  # earlier row, even though a longer prefix matches
+    assert BrandClassifier(table[::-1], exact={}, invalid=set()).classify("ABCDEF") == "Specific"
+
+
+def test_classify_many_matches_classify():
+    serials = ["5CD1234567", "pf0abc12", "5CD1234567", None, "ZZZ"]
+    assert classifier.classify_many(serials) == [classifier.classify(s) for s in serials]
@@ -0,0 +1,125 @@
+"""BrowserPool with a fake driver factory: checkout/checkin, bounded waiting, recycling and reaping."""
+import itertools
+import threading
+import time
+
+import pytest
+
+from ultra_fast_warranty import BrowserPool, BrowserPoolError
+
+
+class _SwitchTo:
+    def __init__(self, driver):
+        self.driver = driver
+
+    def window(self, handle):
+        self.driver.current_window_handle = handle
+
+    def new_window(self, kind):
+        handle = f"{self.driver.name}-tab{len(self.driver.handles) + 1}"
+        self.driver.handles.append(handle)
+        self.driver.current_window_handle = handle
+
+
+class _Driver:
+    _names = itertools.count(1)
+
+    def __init__(self):
+        self.name = f"chrome{next(self._names)}"
+        self.handles = [f"{self.name}-tab1"]
+        self.current_window_handle = self.handles[0]
+        self.switch_to = _SwitchTo(self)
+        self.title = "HP"
+        self.closed = []
+        self.quit_called = False
+
+    def execute_cdp_cmd(self, cmd, params):
+        return {"targetInfo": {"targetId": f"target-{self.current_window_handle}"}}
+
+    def close(self):
+        self.closed.append(self.current_window_handle)
+
+    def quit(self):
+        self.quit_called = True
+
+
+def _pool(**overrides):
+    drivers = []
+
+    def factory():
+        drivers.append(_Driver())
+        return drivers[-1]
+    options = dict(size=1, max_uses=100, max_age=1800, idle_timeout=300, acquire_timeout=5,
+                   max_waiters=4, factory=factory)
+    options.update(overrides)
+    return BrowserPool(**options), drivers
+
+
+def test_checked_in_tab_is_reused():
+    pool, drivers = _pool()
+    tab, _ = pool.checkout()
+    pool.checkin(tab)
+    again, _ = pool.checkout()
+    assert again is tab and len(drivers) == 1
+    stats = pool.stats()
+    assert stats["checkouts"] == 2 and stats["created"] == 1 and stats["in_use"] == 1
+
+
+def test_full_pool_times_out_or_rejects_waiters():
+    pool, _ = _pool(acquire_timeout=0.05, max_waiters=1)
+    pool.checkout()
+    with pytest.raises(BrowserPoolError, match="No HP browser available"):
+        pool.checkout()
+
+    pool.max_waiters = 0
+    with pytest.raises(BrowserPoolError, match="queue full"):
+        pool.checkout()
+    assert pool.stats()["timeouts"] == 1 and pool.stats()["rejected"] == 1
+
+
+def test_waiter_gets_the_tab_when_it_is_checked_in():
+    pool, _ = _pool()
+    tab, _ = pool.checkout()
+    threading.Timer(0.05, pool.checkin, args=(tab,)).start()
+    again, waited = pool.checkout()
+    assert again is tab and waited >= 0.04
+
+
+def test_browser_is_recycled_after_max_uses():
+    pool, drivers = _pool(max_uses=2)
+    for _ in range(2):
+        tab, _ = pool.checkout()
+        pool.checkin(tab)
+    assert drivers[0].quit_called
+    tab, _ = pool.checkout()
+    assert tab.browser.driver is drivers[1]
+    assert pool.stats()["recycled"] == 1 and pool.stats()["created"] == 2
+
+
+def test_broken_tab_quits_its_browser():
+    pool, drivers = _pool()
+    tab, _ = pool.checkout()
+    pool.checkin(tab, broken=True)
+    assert drivers[0].quit_called
+    assert pool.stats()["broken"] == 1 and pool.stats()["size"] == 0
+
+
+def test_idle_tabs_are_reaped():
+    pool, drivers = _pool(idle_timeout=0.01)
+    tab, _ = pool.checkout()
+    pool.checkin(tab)
+    time.sleep(0.02)
+    assert pool.reap_idle() == 1
+    assert drivers[0].quit_called and pool.stats()["browsers"] == 0
+
+
+def test_tabs_fill_a_browser_before_the_next_one_starts():
+    pool, drivers = _pool(size=2, tabs=2)
+    tabs = [pool.checkout()[0] for _ in range(3)]
+    assert [t.browser.driver for t in tabs] == [drivers[0], drivers[0], drivers[1]]
+    assert tabs[0].handle != tabs[1].handle
+    assert [t.target_id for t in tabs] == [f"target-{t.handle}" for t in tabs]
+
+    # Closing one of two tabs closes the window, not the browser
+    pool.checkin(tabs[1], broken=True)
+    assert drivers[0].closed == [tabs[1].handle] and not drivers[0].quit_called
@@ -0,0 +1,42 @@
+"""The API never waits on a slow browser service, and the service never waits forever on a worker."""
+import threading
+import time
+
+import browser_service
+
+
+def test_stats_never_block_on_a_slow_service(monkeypatch):
+    answered = threading.Event()
+
+    def slow_request(message, timeout=10):
+        time.sleep(0.5)
+        answered.set()
+        return {"size": 2, "idle": 2, "in_use": 0, "waiting": 0}
+    monkeypatch.setattr(browser_service, "_request", slow_request)
+    monkeypatch.setattr(browser_service, "_stats_cache", {"at": 0.0, "stats": None, "refreshing": False})
+
+    start = time.monotonic()
+    first = browser_service.stats()
+    assert time.monotonic() - start < 0.1
+    assert first["service"] == "pending"
+
+    assert answered.wait(5)
+    time.sleep(0.05)
+    assert browser_service.stats()["size"] == 2
+
+
+class _SilentConn:
+    def send(self, message):
+        pass  # the worker is wedged: it never answers
+
+
+def test_call_gives_up_on_a_wedged_worker():
+    service = browser_service.BrowserService("/tmp/unused.sock", workers=1)
+    worker = service.workers[0]
+    worker.conn = _SilentConn()
+
+    start = time.monotonic()
+    response = service.call(worker, {"op": "stats"}, timeout=0.2)
+    assert time.monotonic() - start < 2
+    assert "did not answer" in response["error"]
+    assert worker.pending == {}
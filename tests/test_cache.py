@@ -0,0 +1,59 @@
+"""TTLCache: per-entry expiry and LRU eviction by entry count and bytes."""
+from cache import TTLCache
+
+
+def test_entries_expire_after_their_own_ttl(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr("cache.time.time", lambda: now[0])
+    cache = TTLCache(max_entries=10, max_bytes=10_000)
+    cache.set("found", (200, "ok"), ttl=100)
+    cache.set("missing", (404, "nope"), ttl=10)
+
+    now[0] += 11
+    assert cache.get("missing") is None
+    assert cache.get("found") == (200, "ok")
+    now[0] += 90
+    assert cache.get("found") is None
+    assert cache.stats()["expirations"] == 2
+
+
+def test_least_recently_used_is_evicted_first():
+    cache = TTLCache(max_entries=2, max_bytes=10_000)
+    cache.set("a", 1, ttl=60)
+    cache.set("b", 2, ttl=60)
+    cache.get("a")  # now "b" is the least recently used
+    cache.set("c", 3, ttl=60)
+
+    assert cache.get("b") is None
+    assert (cache.get("a"), cache.get("c")) == (1, 3)
+    assert cache.stats()["evictions"] == 1
+
+
+def test_byte_budget_evicts_and_oversized_values_are_skipped():
+    cache = TTLCache(max_entries=100, max_bytes=700)
+    for key in ("a", "b", "c", "d"):
+        cache.set(key, "x" * 50, ttl=60)  # ~253 bytes each
+    assert cache.stats()["entries"] == 2
+    assert cache.stats()["bytes"] <= 700
+
+    cache.set("huge", "x" * 1000, ttl=60)
+    assert cache.get("huge") is None
+
+
+def test_zero_ttl_is_not_cached_and_hit_rate_counts():
+    cache = TTLCache(max_entries=10, max_bytes=10_000)
+    cache.set("a", 1, ttl=0)
+    assert cache.get("a") is None
+    cache.set("a", 1, ttl=60)
+    assert cache.get("a") == 1
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["hit_rate"]) == (1, 1, 0.5)
+
+
+def test_delete_and_clear():
+    cache = TTLCache(max_entries=10, max_bytes=10_000)
+    cache.set("a", 1, ttl=60)
+    cache.set("b", 2, ttl=60)
+    assert cache.delete("a") and not cache.delete("a")
+    assert cache.clear() == 1
+    assert cache.stats()["bytes"] == 0
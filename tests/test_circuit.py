@@ -0,0 +1,99 @@
+"""Circuit breaker states: closed -> open on failures or slow calls, half-open probes, closed again."""
+import pytest
+
+import circuit
+from circuit import CLOSED, HALF_OPEN, OPEN, CircuitBreaker, CircuitOpenError
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(circuit.time, "monotonic", lambda: now[0])
+    return now
+
+
+def breaker(**kwargs):
+    settings = dict(window=4, min_calls=4, failure_rate=0.5, slow_rate=0.75, open_seconds=30, probes=2)
+    settings.update(kwargs)
+    return CircuitBreaker("test", slow_seconds=5, **settings)
+
+
+def run(b, fail=False, seconds=0.0, clock=None):
+    with b.call() as call:
+        if clock is not None:
+            clock[0] += seconds
+        if fail:
+            call.fail()
+
+
+def test_opens_on_failure_rate_and_fails_fast(clock):
+    b = breaker()
+    for fail in (False, True, False, True):
+        run(b, fail)
+    assert b.state == OPEN
+
+    with pytest.raises(CircuitOpenError) as e:
+        run(b)
+    assert e.value.retry_after == 30
+    assert b.stats()["rejected"] == 1
+
+
+def test_needs_min_calls_before_opening(clock):
+    b = breaker()
+    for _ in range(3):
+        run(b, fail=True)
+    assert b.state == CLOSED
+
+
+def test_opens_on_slow_calls(clock):
+    b = breaker()
+    for seconds in (6, 6, 6, 1):
+        run(b, seconds=seconds, clock=clock)
+    assert b.state == OPEN
+
+
+def test_excluded_waiting_is_not_latency(clock):
+    b = breaker()
+    for _ in range(4):
+        with b.call() as call:
+            clock[0] += 10
+            call.exclude(9)  # 9 s waiting for a rate-limit token, 1 s upstream
+    assert b.state == CLOSED
+
+
+def test_half_open_probes_close_the_breaker(clock):
+    b = breaker()
+    for _ in range(4):
+        run(b, fail=True)
+    clock[0] += 30
+
+    with b.call():
+        assert b.state == HALF_OPEN
+        with b.call():
+            with pytest.raises(CircuitOpenError):
+                run(b)  # only `probes` calls at a time while half-open
+    assert b.state == CLOSED
+
+
+def test_failed_probe_reopens(clock):
+    b = breaker()
+    for _ in range(4):
+        run(b, fail=True)
+    clock[0] += 30
+    run(b, fail=True)
+    assert b.state == OPEN
+    assert b.stats()["opened"] == 2
+
+
+def test_skipped_and_exceptions(clock):
+    b = breaker()
+    for _ in range(4):
+        with b.call() as call:
+            call.skip()  # never reached the upstream
+    assert b.stats()["calls"] == 0
+
+    for _ in range(4):
+        with pytest.raises(RuntimeError):
+            with b.call():
+                raise RuntimeError("connection reset")
+    assert b.state == OPEN
@@ -0,0 +1,68 @@
+"""Waiting for HP warranty dates: one MutationObserver script per page, polled when tabs share a browser."""
+import pytest
+from selenium.common.exceptions import TimeoutException, WebDriverException
+
+import ultra_fast_warranty
+from ultra_fast_warranty import _poll_for_dates, _wait_for_dates
+
+
+class _Driver:
+    """Answers scripts from `results`, raising the ones that are exceptions"""
+
+    def __init__(self, results):
+        self.results = list(results)
+        self.scripts = []
+
+    def _next(self, script, args):
+        self.scripts.append((script, args))
+        result = self.results.pop(0)
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+    def set_script_timeout(self, seconds):
+        pass
+
+    def execute_async_script(self, script, *args):
+        return self._next(script, args)
+
+    def execute_script(self, script, *args):
+        return self._next(script, args)
+
+
+@pytest.fixture(autouse=True)
+def observer_mode(monkeypatch):
+    monkeypatch.setattr(ultra_fast_warranty, "HP_DOM_WAIT", "observer")
+    monkeypatch.setattr(ultra_fast_warranty, "HP_BROWSER_TABS", 1)
+
+
+def test_observer_returns_once_dates_are_in_the_dom():
+    driver = _Driver(["dates"])
+    assert _wait_for_dates(driver, timeout=5, grace=0.5) == "dates"
+    (script, (timeout_ms, grace_ms)), = driver.scripts
+    assert "MutationObserver" in script and 4000 < timeout_ms <= 5000 and grace_ms == 500
+
+
+def test_observer_restarts_on_the_new_document_after_navigation():
+    driver = _Driver([WebDriverException("javascript error: document unloaded"), "labels"])
+    assert _wait_for_dates(driver, timeout=5) == "labels"
+    assert len(driver.scripts) == 2
+
+
+def test_observer_timeout_raises():
+    with pytest.raises(TimeoutException, match="No warranty dates"):
+        _wait_for_dates(_Driver(["timeout"]), timeout=5)
+
+
+def test_with_several_tabs_the_observer_is_started_then_polled(monkeypatch):
+    monkeypatch.setattr(ultra_fast_warranty, "HP_BROWSER_TABS", 2)
+    # Not watching yet -> start the observer; still waiting; then document replaced -> start again
+    driver = _Driver([None, None, "", WebDriverException("navigating"), None, None, "dates"])
+    assert _wait_for_dates(driver, timeout=5) == "dates"
+    started = [args for script, args in driver.scripts if args]
+    assert len(started) == 2 and all(grace == 1000 for _, grace in started)
+
+
+def test_polled_observer_timeout_raises():
+    with pytest.raises(TimeoutException):
+        _poll_for_dates(_Driver([None, None, "timeout"]), timeout=5, grace=1.0)
@@ -0,0 +1,66 @@
+"""Browserless HP lookups: product search and warranty JSON, parsed into the browser path's dict."""
+import pytest
+
+import ultra_fast_warranty
+from bench._util import serve
+from circuit import CircuitBreaker
+from ultra_fast_warranty import SerialNotFound, convert_date_to_ddmmyyyy, parse_hp_warranty_payload
+
+
+@pytest.fixture(scope="module")
+def hp_url():
+    with serve("standins.hp:app", env={"STANDIN_LATENCY_MS": "0"}) as (url, _):
+        yield url
+
+
+@pytest.fixture
+def standin(hp_url, monkeypatch):
+    monkeypatch.setattr(ultra_fast_warranty, "HP_BASE_URL", hp_url)
+    monkeypatch.setattr(ultra_fast_warranty, "_product_breaker", CircuitBreaker("hp_product", slow_seconds=8))
+    monkeypatch.setattr(ultra_fast_warranty, "_warranty_api_breaker",
+                        CircuitBreaker("hp_warranty_api", slow_seconds=8))
+
+
+@pytest.mark.parametrize("raw, expected", [
+    ("2022-02-01", "01/02/2022"),
+    ("2022-02-01T00:00:00Z", "01/02/2022"),
+    ("February 1, 2022", "01/02/2022"),
+    ("02/01/2022", "01/02/2022"),
+    ("", None),
+    ("sometime", "sometime"),
+])
+def test_convert_date_to_ddmmyyyy(raw, expected):
+    assert convert_date_to_ddmmyyyy(raw) == expected
+
+
+def test_payload_without_devices_or_dates():
+    flat = {"productName": "HP ProBook", "coverageStartDate": "2021-05-01", "coverageEndDate": "2024-04-30",
+            "warrantyType": "Base", "warrantyStatus": "Expired"}
+    result = parse_hp_warranty_payload(flat, "5CD0000701")
+    assert result["product_name"] == "HP ProBook"
+    assert (result["warranty_start"], result["warranty_end"]) == ("01/05/2021", "30/04/2024")
+    assert result["coverages"] == [{"name": "Base", "status": "Expired", "start": "01/05/2021", "end": "30/04/2024"}]
+
+    assert parse_hp_warranty_payload({"code": 200, "data": {"devices": [{"serialNumber": "x"}]}}, "x") is None
+    assert parse_hp_warranty_payload(["not", "a", "dict"], "x") is None
+
+
+def test_product_search_and_warranty_api(standin):
+    product = ultra_fast_warranty.get_hp_product_info("5CD0000702")
+    assert product["productNumber"] == "3C6D5UT#ABA"
+
+    result = ultra_fast_warranty.get_hp_warranty_via_api("5CD0000702", product)
+    assert result["product_name"] == "HP EliteBook 840 G8 Notebook PC"
+    assert (result["warranty_start"], result["warranty_end"]) == ("01/02/2022", "31/01/2025")
+    assert [c["name"] for c in result["coverages"]] == ["Base Warranty", "HP Care Pack Next Business Day"]
+
+
+def test_unknown_serial_raises_serial_not_found(standin):
+    with pytest.raises(SerialNotFound):
+        ultra_fast_warranty.get_hp_product_info("5CDNOTFOUND")
+
+
+def test_warranty_api_failure_returns_none(standin, monkeypatch):
+    # Nothing listens here, so the browser fallback would take over
+    monkeypatch.setattr(ultra_fast_warranty, "HP_BASE_URL", "http://127.0.0.1:9")
+    assert ultra_fast_warranty.get_hp_warranty_via_api("5CD0000703", {"productNumber": "3C6D5UT#ABA"}) is None
@@ -0,0 +1,60 @@
+"""HP network mode: the warranty XHR's JSON is picked out of the DevTools performance log."""
+import base64
+import json
+
+import ultra_fast_warranty
+from ultra_fast_warranty import HP_WARRANTY_API_PATH, _capture_warranty_response
+
+WARRANTY_URL = f"https://support.hp.com{HP_WARRANTY_API_PATH}?cache=true"
+PAYLOAD = {"code": 200, "data": {"devices": [{"warranty": {"startDate": "2022-02-01", "endDate": "2025-01-31"}}]}}
+
+
+def _entry(method, **params):
+    return {"message": json.dumps({"message": {"method": method, "params": params}, "webview": "T1"})}
+
+
+def _response(request_id, url, status=200, kind="XHR"):
+    return _entry("Network.responseReceived", requestId=request_id, type=kind,
+                  response={"url": url, "status": status})
+
+
+class _Driver:
+    """Hands out one batch of log entries per get_log call; bodies by request id"""
+
+    def __init__(self, batches, bodies=None):
+        self.batches = list(batches)
+        self.bodies = bodies or {}
+
+    def get_log(self, log_type):
+        return self.batches.pop(0) if self.batches else []
+
+    def execute_cdp_cmd(self, cmd, params):
+        assert cmd == "Network.getResponseBody"
+        return self.bodies[params["requestId"]]
+
+
+def test_returns_the_warranty_json_once_loaded():
+    driver = _Driver([
+        [_response("1", "https://support.hp.com/assets/app.js", kind="Script"),
+         _response("2", "https://support.hp.com/wcc-services/search/sn/us-en")],
+        [_response("3", WARRANTY_URL)],
+        [_entry("Network.loadingFinished", requestId="2"), _entry("Network.loadingFinished", requestId="3")],
+    ], bodies={"3": {"body": base64.b64encode(json.dumps(PAYLOAD).encode()).decode(), "base64Encoded": True}})
+    assert _capture_warranty_response(driver, timeout=2) == PAYLOAD
+
+
+def test_failed_or_missing_xhr_returns_none():
+    driver = _Driver([
+        [_response("1", WARRANTY_URL), _entry("Network.loadingFailed", requestId="1")],
+        [_entry("Network.loadingFinished", requestId="1")],
+        [_response("2", WARRANTY_URL, status=500), _entry("Network.loadingFinished", requestId="2")],
+    ])
+    assert _capture_warranty_response(driver, timeout=0.3) is None
+
+
+def test_throttled_xhr_slows_the_browser_limiter(monkeypatch):
+    throttled = []
+    monkeypatch.setattr(ultra_fast_warranty._browser_limiter, "throttled", lambda: throttled.append(1))
+    driver = _Driver([[_response("1", WARRANTY_URL, status=429), _entry("Network.loadingFinished", requestId="1")]])
+    assert _capture_warranty_response(driver, timeout=0.2) is None
+    assert throttled == [1]
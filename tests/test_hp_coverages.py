@@ -0,0 +1,28 @@
+"""HP answers from the warranty JSON list every coverage, not just the first."""
+from providers.hp import provider
+from ultra_fast_warranty import parse_hp_warranty_payload
+
+PAYLOAD = {"code": 200, "data": {"devices": [{
+    "serialNumber": "5CD0000901",
+    "productName": "HP EliteBook 840 G8",
+    "warranty": {"type": "Base", "offerDescription": "Base Warranty", "status": "Active",
+                 "startDate": "2022-02-01", "endDate": "2025-01-31"},
+    "offers": [{"type": "Care Pack", "offerDescription": "HP Care Pack Next Business Day", "status": "Active",
+                "startDate": "2022-02-01", "endDate": "2026-01-31"}],
+}]}}
+
+
+def test_all_coverages_reach_the_response():
+    result = provider.normalize("5CD0000901", parse_hp_warranty_payload(PAYLOAD, "5CD0000901"))
+
+    assert (result["Warranty Start"], result["Warranty End"]) == ("01/02/2022", "31/01/2025")
+    assert result["Coverages"] == [
+        {"Name": "Base Warranty", "Status": "Active", "Start": "01/02/2022", "End": "31/01/2025"},
+        {"Name": "HP Care Pack Next Business Day", "Status": "Active", "Start": "01/02/2022", "End": "31/01/2026"},
+    ]
+
+
+def test_dom_result_has_no_coverages():
+    result = provider.normalize("5CD0000902", {"product_name": "HP ProBook", "serial_number": "5CD0000902",
+                                               "warranty_start": "01/02/2022", "warranty_end": "31/01/2025"})
+    assert "Coverages" not in result
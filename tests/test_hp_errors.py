@@ -0,0 +1,104 @@
+"""HP failures map to retryable 5xx answers; only HP's own "not found" is cached."""
+import asyncio
+import json
+import time
+
+import httpx
+import pytest
+import requests
+from selenium.common.exceptions import TimeoutException
+
+import circuit
+import main
+import ultra_fast_warranty
+
+
+def get_twice(serial):
+    async def go():
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return [await client.get(f"/warranty/{serial}") for _ in range(2)]
+    return asyncio.run(go())
+
+
+def _json_response(payload):
+    response = requests.Response()
+    response.status_code = 200
+    response.headers["Content-Type"] = "application/json"
+    response._content = json.dumps(payload).encode()
+    return response
+
+
+class _TimingOutDriver:
+    def __getattr__(self, name):
+        raise TimeoutException("page load timed out")
+
+
+class _TimingOutOnNormalPage(_TimingOutDriver):
+    page_source = '<html><head><meta name="robots" content="index, follow"></head><body>Warranty Check</body></html>'
+
+
+class _Tab:
+    uses = 1
+    driver = _TimingOutDriver()
+
+    class browser:
+        uses = 1
+
+
+@pytest.fixture
+def no_product_info(monkeypatch):
+    monkeypatch.setattr(ultra_fast_warranty, "get_hp_product_info", lambda serial: None)
+    monkeypatch.setattr(ultra_fast_warranty._pool, "checkin", lambda tab, broken=False: None)
+
+
+def test_browser_start_failure_is_503_and_not_cached(no_product_info, monkeypatch):
+    def checkout():
+        raise RuntimeError("chromedriver missing")
+    monkeypatch.setattr(ultra_fast_warranty._pool, "checkout", checkout)
+
+    first, second = get_twice("5CD0000601")
+    assert first.status_code == second.status_code == 503
+    assert "Chrome driver failed" in first.json()["detail"]
+    assert first.headers["X-Cache"] == second.headers["X-Cache"] == "MISS"
+
+
+def test_browser_timeout_is_504_and_not_cached(no_product_info, monkeypatch):
+    monkeypatch.setattr(ultra_fast_warranty._pool, "checkout", lambda: (_Tab(), 0.0))
+
+    first, second = get_twice("5CD0000602")
+    assert first.status_code == second.status_code == 504
+    assert first.headers["X-Cache"] == second.headers["X-Cache"] == "MISS"
+
+
+def test_timeout_on_page_mentioning_robots_is_not_a_captcha(no_product_info, monkeypatch):
+    tab = _Tab()
+    tab.driver = _TimingOutOnNormalPage()
+    monkeypatch.setattr(ultra_fast_warranty._pool, "checkout", lambda: (tab, 0.0))
+
+    first, _ = get_twice("5CD0000606")
+    assert first.status_code == 504
+    assert "CAPTCHA" not in first.json()["detail"]
+
+
+def test_vendor_not_found_is_404_and_cached(monkeypatch):
+    monkeypatch.setattr(ultra_fast_warranty._http, "get",
+                        lambda *args, **kwargs: _json_response({"code": 404, "data": None}))
+
+    first, second = get_twice("5CD0000603")
+    assert first.status_code == second.status_code == 404
+    assert (first.headers["X-Cache"], second.headers["X-Cache"]) == ("MISS", "HIT")
+
+
+def test_open_product_breaker_fails_fast_without_browser(monkeypatch):
+    monkeypatch.setattr(ultra_fast_warranty._product_breaker, "state", circuit.OPEN)
+    monkeypatch.setattr(ultra_fast_warranty._product_breaker, "_opened_at", time.monotonic())
+
+    def checkout():
+        raise AssertionError("browser used while the product API breaker is open")
+    monkeypatch.setattr(ultra_fast_warranty._pool, "checkout", checkout)
+
+    first, second = get_twice("5CD0000604")
+    assert first.status_code == second.status_code == 503
+    assert int(first.headers["Retry-After"]) >= 1
+    assert first.headers["X-Cache"] == second.headers["X-Cache"] == "MISS"
@@ -0,0 +1,126 @@
+"""Upload jobs through the API, and their status shared via JOBS_DIR across workers and restarts."""
+import asyncio
+import json
+import os
+import time
+
+import jobs
+from jobs import Job, JobManager
+
+
+class _Upload:
+    def __init__(self, data):
+        self.data = data
+
+    async def read(self, size):
+        chunk, self.data = self.data[:size], self.data[size:]
+        return chunk
+
+
+def batch(delay=0.0):
+    async def run_batch(items):
+        for index, serial in items:
+            await asyncio.sleep(delay)
+            yield {"index": index, "serial": serial, "brand": "Lenovo", "status": 200,
+                   "result": {"Product Name": "ThinkPad", "Warranty Start": "01/01/2024", "Warranty End": "01/01/2027"}}
+    return run_batch
+
+
+async def _finish(job):
+    await job.task
+
+
+def test_finished_job_is_visible_to_other_workers_and_after_restart(tmp_path):
+    async def go():
+        worker = JobManager(str(tmp_path), batch(), chunk_size=2)
+        job = await worker.submit(_Upload(b"serial\nPF000001\nPF000002\nPF000003\n"), "inventory.csv")
+        await _finish(job)
+        return job.id
+    job_id = asyncio.run(go())
+
+    restarted = JobManager(str(tmp_path), batch())
+    assert restarted.restore() == 1
+    job = restarted.get(job_id)
+    assert (job.status, job.total, job.processed, job.succeeded) == ("done", 3, 3, 3)
+    assert os.path.exists(job.results_path)
+
+
+def test_unknown_or_malformed_ids_are_not_found(tmp_path):
+    manager = JobManager(str(tmp_path), batch())
+    assert manager.get("0" * 32) is None
+    assert manager.get("..") is None
+
+
+def test_job_left_running_by_a_dead_process_is_failed(tmp_path):
+    job = Job("a" * 32, "inventory.csv", "csv", str(tmp_path / ("a" * 32)))
+    os.makedirs(job.directory)
+    job.status = "running"
+    job.save()
+    with open(job.status_path) as f:
+        saved = json.load(f)
+    saved["updated_at"] = time.time() - 4 * jobs.JOB_HEARTBEAT
+    with open(job.status_path, "w") as f:
+        json.dump(saved, f)
+
+    loaded = JobManager(str(tmp_path), batch()).get(job.id)
+    assert loaded.status == "failed"
+    assert "Interrupted" in loaded.error
+
+
+def test_cancel_through_another_worker(tmp_path):
+    async def go():
+        owner = JobManager(str(tmp_path), batch(delay=0.05), chunk_size=1)
+        other = JobManager(str(tmp_path), batch())
+        serials = "".join(f"PF{i:06d}\n" for i in range(50)).encode()
+        job = await owner.submit(_Upload(b"serial\n" + serials), "inventory.csv")
+        await asyncio.sleep(0.3)
+        assert other.get(job.id).status == "running"
+        other.cancel(job.id)
+        await _finish(job)
+        return job, other.get(job.id)
+    job, seen_by_other = asyncio.run(go())
+
+    assert job.status == seen_by_other.status == "cancelled"
+    assert 0 < job.processed < 50
+
+
+def test_other_worker_sees_progress_as_it_happens(tmp_path):
+    async def go():
+        owner = JobManager(str(tmp_path), batch(delay=0.2), chunk_size=1)
+        serials = "".join(f"PF{i:06d}\n" for i in range(5)).encode()
+        job = await owner.submit(_Upload(b"serial\n" + serials), "inventory.csv")
+        await asyncio.sleep(0.1)
+        seen = JobManager(str(tmp_path), batch()).get(job.id)
+        before = seen.processed
+        changed = await seen.wait_changed(timeout=3)
+        owner.cancel(job.id)
+        await asyncio.gather(job.task, return_exceptions=True)
+        return before, changed, seen.processed
+    before, changed, after = asyncio.run(go())
+    assert changed and after > before
+
+
+def test_upload_job_through_the_api(tmp_path, monkeypatch):
+    import httpx
+
+    import main
+    monkeypatch.setattr(main, "jobs", JobManager(str(tmp_path), main.run_batch))
+
+    async def go():
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            files = {"file": ("inventory.csv", b"serial\nXYZ0001\n=HYPERLINK(1)\n")}
+            created = await client.post("/jobs", files=files)
+            job_id = created.json()["id"]
+            while (await client.get(f"/jobs/{job_id}")).json()["status"] != "done":
+                await asyncio.sleep(0.01)
+            results = await client.get(f"/jobs/{job_id}/results")
+            rejected = await client.post("/jobs", files={"file": ("inventory.pdf", b"x")})
+            return created, results, rejected
+    created, results, rejected = asyncio.run(go())
+
+    assert created.status_code == 202
+    lines = results.text.splitlines()
+    assert lines[0].startswith("row,serial,brand,status")
+    assert lines[2].startswith("3,'=HYPERLINK(1),")
+    assert rejected.status_code == 400
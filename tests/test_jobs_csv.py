@@ -0,0 +1,45 @@
+"""Reading serials from CSV/XLSX uploads, and writing results that can't run as spreadsheet formulas."""
+from jobs import _result_row, count_serials, iter_serials
+
+
+def _write(tmp_path, name, text):
+    path = tmp_path / name
+    path.write_text(text, encoding="utf-8")
+    return str(path)
+
+
+def test_serial_column_found_by_header_and_delimiter_sniffed(tmp_path):
+    path = _write(tmp_path, "inventory.csv", "asset;Serial Number;owner\nA1;PF000001;ana\nA2;;luis\nA3; 5CD1234567 ;eva\n")
+    assert list(iter_serials(path, "csv")) == [(2, "PF000001"), (4, "5CD1234567")]
+    assert count_serials(path, "csv") == 2
+
+
+def test_without_a_header_the_first_column_is_data(tmp_path):
+    path = _write(tmp_path, "serials.txt", "PF000001\nPF000002\n")
+    assert list(iter_serials(path, "csv")) == [(1, "PF000001"), (2, "PF000002")]
+
+
+def test_utf8_bom_and_spanish_header(tmp_path):
+    path = _write(tmp_path, "inventario.csv", "\ufeffNúmero de serie,equipo\nPF000001,laptop\n")
+    assert list(iter_serials(path, "csv")) == [(2, "PF000001")]
+
+
+def test_xlsx_numeric_serials_lose_the_float(tmp_path):
+    from openpyxl import Workbook
+
+    workbook = Workbook()
+    sheet = workbook.active
+    sheet.append(["SN", "model"])
+    sheet.append(["PF000001", "T14"])
+    sheet.append([123456789.0, "desk"])
+    sheet.append([None, "empty"])
+    path = str(tmp_path / "inventory.xlsx")
+    workbook.save(path)
+    assert list(iter_serials(path, "xlsx")) == [(2, "PF000001"), (3, "123456789")]
+
+
+def test_formula_like_cells_are_quoted():
+    item = {"index": 3, "serial": "=HYPERLINK(\"http://x\",\"y\")", "brand": "Desconocido", "status": 400,
+            "error": "@SUM(A1)", "result": {"Product Name": "+cmd", "Warranty Start": "-1", "Warranty End": "2026-01-01"}}
+    assert _result_row(item) == [3, "'=HYPERLINK(\"http://x\",\"y\")", "Desconocido", 400,
+                                 "'+cmd", "'-1", "2026-01-01", "'@SUM(A1)"]
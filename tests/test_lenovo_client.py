@@ -0,0 +1,65 @@
+"""Async Lenovo client against the in-process stand-in: pooled client, shared session, 403 refresh."""
+import asyncio
+
+import httpx
+import pytest
+
+import lenovo_client
+from circuit import CircuitBreaker
+from lenovo_session import LenovoSession
+from standins import lenovo as standin
+
+BASE_URL = "http://lenovo.test"
+
+
+@pytest.fixture
+def client(monkeypatch):
+    """Point lenovo_client's shared client and session at the stand-in app"""
+    http = httpx.AsyncClient(transport=httpx.ASGITransport(app=standin.app))
+    monkeypatch.setattr(lenovo_client, "LENOVO_BASE_URL", BASE_URL)
+    monkeypatch.setattr(lenovo_client, "_client", http)
+    monkeypatch.setattr(lenovo_client, "_session", LenovoSession(http, BASE_URL))
+    monkeypatch.setattr(standin, "_sessions", {})
+    monkeypatch.setattr(standin, "_stats", {"bootstraps": 0, "accepted": 0, "rejected": 0, "throttled": 0})
+    monkeypatch.setattr(lenovo_client, "_breaker", CircuitBreaker("lenovo", slow_seconds=10))
+    return http
+
+
+def _lookup(*serials, between=None):
+    async def go():
+        results = []
+        for serial in serials:
+            results.append(await lenovo_client.get_lenovo_warranty_info_async(serial))
+            if between is not None:
+                between()
+        await lenovo_client.close_client()
+        return results
+    return asyncio.run(go())
+
+
+def test_parse_product_takes_the_machine_type_group_from_the_path():
+    data = [{"Name": "ThinkPad T14", "Id": "/laptops/thinkpad-t/t14-gen-2/20W0/20w0s00000/pf000001"}]
+    assert lenovo_client.parse_product(data) == ("ThinkPad T14", data[0]["Id"], "20W0")
+    assert lenovo_client.parse_product([]) == ("N/A", None, "N/A")
+
+
+def test_lookups_share_one_session_bootstrap(client):
+    first, second = _lookup("PF000001", "PF000002")
+    assert first["data"]["machineInfo"] == {"serial": "PF000001", "type": "20W0",
+                                            "productName": "ThinkPad T14 Gen 2 (Type 20W0, 20W1) Laptop"}
+    assert second["data"]["currentWarranty"] == {"startDate": "2022-03-01", "endDate": "2025-02-28"}
+    assert standin._stats["bootstraps"] == 1 and standin._stats["accepted"] == 2
+
+
+def test_rejected_token_is_refreshed_once_and_retried(client):
+    # Invalidate every stand-in session between the two lookups, as a token rotation would
+    first, second = _lookup("PF000001", "PF000002", between=standin._sessions.clear)
+    assert "data" in first and "data" in second
+    assert standin._stats["bootstraps"] == 2
+    assert standin._stats["rejected"] == 1 and standin._stats["accepted"] == 2
+
+
+def test_unknown_product_is_reported_without_calling_getibaseinfo(client):
+    (result,) = _lookup("NOTFOUND01")
+    assert result["warranties"][0]["name"] == "Product API Error"
+    assert standin._stats["bootstraps"] == 0 and standin._stats["accepted"] == 0
@@ -0,0 +1,95 @@
+"""LenovoSession: one shared bootstrap for the CSRF token, with backoff after failures."""
+import asyncio
+
+import httpx
+import pytest
+
+import lenovo_session
+from lenovo_session import LenovoSession, extract_csrf_token
+
+BASE_URL = "https://pcsupport.example"
+
+
+def _session(pages):
+    """A session whose bootstrap GETs answer from pages (one (status, html) per call)"""
+    calls = []
+
+    async def handler(request):
+        calls.append(request.url.path)
+        await asyncio.sleep(0.01)
+        status, html = pages[min(len(calls), len(pages)) - 1]
+        return httpx.Response(status, text=html)
+    client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    return LenovoSession(client, BASE_URL), calls
+
+
+def _page(token):
+    return f'<html><head><meta name="csrf-token" content="{token}"></head></html>'
+
+
+def test_extract_csrf_token_from_meta_script_or_cookie():
+    assert extract_csrf_token(_page("tok-meta")) == "tok-meta"
+    assert extract_csrf_token('<meta content="tok-rev" name="csrf-token">') == "tok-rev"
+    assert extract_csrf_token('<script>window.csrfToken = "abcdef123456";</script>') == "abcdef123456"
+    assert extract_csrf_token("<html></html>", {"XSRF-TOKEN": "tok-cookie"}) == "tok-cookie"
+    assert extract_csrf_token("<html></html>", {}) is None
+
+
+def test_concurrent_refreshes_share_one_bootstrap():
+    session, calls = _session([(200, _page("tok-1"))])
+
+    async def go():
+        tokens = await asyncio.gather(*(session.refresh() for _ in range(5)))
+        await session.client.aclose()
+        return tokens
+    assert asyncio.run(go()) == ["tok-1"] * 5
+    assert calls == [lenovo_session.LENOVO_BOOTSTRAP_PATH]
+    assert session.headers() == {"x-csrf-token": "tok-1"}
+
+
+def test_refresh_after_rejection_replaces_the_stale_token():
+    session, calls = _session([(200, _page("tok-1")), (200, _page("tok-2"))])
+
+    async def go():
+        first = await session.refresh()
+        # A caller still holding an older token gets the current one without a new bootstrap
+        same = await session.refresh(stale_token="tok-0")
+        renewed = await session.refresh(stale_token=first)
+        await session.client.aclose()
+        return first, same, renewed
+    assert asyncio.run(go()) == ("tok-1", "tok-1", "tok-2")
+    assert len(calls) == 2 and session.bootstraps == 2
+
+
+def test_failed_bootstraps_back_off_exponentially(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(lenovo_session.time, "time", lambda: now[0])
+    monkeypatch.setattr(lenovo_session, "LENOVO_SESSION_RETRY_MIN", 2.0)
+    monkeypatch.setattr(lenovo_session, "LENOVO_SESSION_RETRY_MAX", 5.0)
+    session, calls = _session([(503, "down"), (200, "<html>no token</html>"), (500, "down"), (200, _page("tok-1"))])
+
+    async def refresh():
+        return await session.refresh()
+
+    assert asyncio.run(refresh()) is None
+    assert session.retry_at == 1002.0
+    # While backing off nobody bootstraps
+    assert asyncio.run(refresh()) is None and len(calls) == 1
+    now[0] = 1002.0
+    assert asyncio.run(refresh()) is None
+    assert session.retry_at == 1006.0
+    now[0] = 1006.0
+    assert asyncio.run(refresh()) is None
+    assert session.retry_at == 1011.0  # capped at RETRY_MAX
+    now[0] = 1011.0
+    assert asyncio.run(refresh()) == "tok-1"
+    assert session.failures == 3 and session.consecutive_failures == 0 and not session.backing_off()
+    asyncio.run(session.client.aclose())
+
+
+@pytest.mark.parametrize("fetched_at, fresh", [(1000.0, True), (1000.0 - 1800.0, False)])
+def test_token_is_fresh_until_its_ttl(monkeypatch, fetched_at, fresh):
+    monkeypatch.setattr(lenovo_session.time, "time", lambda: 1000.0)
+    session = LenovoSession(client=None, base_url=BASE_URL, ttl=1800)
+    session.token, session.fetched_at = "tok-1", fetched_at
+    assert session.is_fresh() is fresh
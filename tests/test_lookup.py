@@ -0,0 +1,37 @@
+"""A lookup detects the serial's brand once, whether it is answered upstream or from cache."""
+import asyncio
+
+import httpx
+
+import main
+
+
+def test_brand_classified_once_per_request(monkeypatch):
+    classify, calls = main.brand_classifier.classify, []
+
+    def counting_classify(serial):
+        calls.append(serial)
+        return classify(serial)
+    monkeypatch.setattr(main.brand_classifier, "classify", counting_classify)
+
+    async def go():
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return [await client.get("/warranty/XYZ0000801") for _ in range(2)]
+    first, second = asyncio.run(go())
+
+    assert first.status_code == second.status_code == 400
+    assert (first.headers["X-Cache"], second.headers["X-Cache"]) == ("MISS", "HIT")
+    assert calls == ["XYZ0000801", "XYZ0000801"]
+
+
+def test_result_without_dates_gets_the_negative_ttl(monkeypatch):
+    async def undated(serial_number, brand):
+        return {"Brand": "HP", "Product Name": "HP ProBook", "Serial Number": serial_number,
+                "Warranty Start": "N/A", "Warranty End": "N/A"}
+    remembered = []
+    monkeypatch.setattr(main, "lookup_warranty", undated)
+    monkeypatch.setattr(main, "remember_result", lambda key, status, body, ttl: remembered.append((status, ttl)))
+
+    asyncio.run(main.lookup_and_remember("5CD0000802", "5CD0000802", "HP"))
+    assert remembered == [(200, main.cache_ttls("HP")[1])]
@@ -0,0 +1,44 @@
+"""Prometheus metrics: stage histograms and lookup counters, served by GET /metrics."""
+import asyncio
+
+import httpx
+from prometheus_client import REGISTRY
+
+import main
+from metrics import count_lookup, stage_timer
+
+
+def _sample(name, **labels):
+    return REGISTRY.get_sample_value(name, labels) or 0.0
+
+
+def test_stage_timer_observes_the_stage_histogram():
+    before = _sample("warranty_stage_seconds_count", stage="test_stage")
+    with stage_timer("test_stage"):
+        pass
+    assert _sample("warranty_stage_seconds_count", stage="test_stage") == before + 1
+
+
+def test_count_lookup_maps_status_to_outcome():
+    before = _sample("warranty_lookups_total", brand="Dell", outcome="error", cache="none")
+    count_lookup("Dell", 502, None)
+    assert _sample("warranty_lookups_total", brand="Dell", outcome="error", cache="none") == before + 1
+
+
+def test_lookups_show_up_on_the_metrics_endpoint():
+    labels = {"brand": "Desconocido", "outcome": "unsupported"}
+    before = {cache: _sample("warranty_lookups_total", cache=cache, **labels) for cache in ("miss", "hit")}
+
+    async def go():
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            for _ in range(2):
+                await client.get("/warranty/XYZ0001501")
+            return await client.get("/metrics")
+    response = asyncio.run(go())
+
+    assert response.status_code == 200
+    assert response.headers["Content-Type"].startswith("text/plain")
+    assert "warranty_stage_seconds_bucket" in response.text
+    assert _sample("warranty_lookups_total", cache="miss", **labels) == before["miss"] + 1
+    assert _sample("warranty_lookups_total", cache="hit", **labels) == before["hit"] + 1
@@ -0,0 +1,100 @@
+"""Providers: lazily loaded per brand, each bounding its concurrency and lookup time."""
+import asyncio
+import threading
+import time
+
+import pytest
+
+from providers import Provider, ProviderError
+
+
+class _Slow(Provider):
+    brand = "Slowvendor"
+    concurrency = 2
+    timeout = 5.0
+
+    def __init__(self, delay):
+        super().__init__()
+        self.delay = delay
+        self.running = 0
+        self.peak = 0
+
+    async def lookup(self, serial_number):
+        self.running += 1
+        self.peak = max(self.peak, self.running)
+        await asyncio.sleep(self.delay)
+        self.running -= 1
+        return serial_number
+
+    def normalize(self, serial_number, raw):
+        return {"Serial Number": raw}
+
+
+class _Blocking(_Slow):
+    blocking = True
+    concurrency = 3
+
+    def lookup(self, serial_number):
+        time.sleep(self.delay)
+        return threading.current_thread().name
+
+
+def test_concurrency_is_bounded():
+    provider = _Slow(delay=0.05)
+
+    async def go():
+        return await asyncio.gather(*(provider.get(f"S{i}") for i in range(6)))
+    results = asyncio.run(go())
+    assert [r["Serial Number"] for r in results] == [f"S{i}" for i in range(6)]
+    assert provider.peak == 2
+    assert provider.limits()["lookups"] == 6 and provider.limits()["in_flight"] == 0
+
+
+def test_slow_lookup_times_out_with_504(monkeypatch):
+    provider = _Slow(delay=1.0)
+    provider.timeout = 0.05
+    with pytest.raises(ProviderError) as e:
+        asyncio.run(provider.get("S1"))
+    assert e.value.status == 504
+    assert provider.limits()["timeouts"] == 1
+
+
+def test_blocking_lookups_run_on_the_providers_own_threads_without_stalling_the_loop():
+    provider = _Blocking(delay=0.2)
+
+    async def go():
+        ticks = 0
+
+        async def ticker():
+            nonlocal ticks
+            while True:
+                await asyncio.sleep(0.01)
+                ticks += 1
+        task = asyncio.create_task(ticker())
+        results = await asyncio.gather(*(provider.get(f"S{i}") for i in range(3)))
+        task.cancel()
+        return results, ticks
+    results, ticks = asyncio.run(go())
+    assert all(r["Serial Number"].startswith("slowvendor") for r in results)
+    assert ticks >= 10  # the event loop kept running while the lookups slept
+
+
+def test_env_overrides_the_class_defaults(monkeypatch):
+    monkeypatch.setenv("SLOWVENDOR_CONCURRENCY", "7")
+    monkeypatch.setenv("BATCH_SLOWVENDOR_CONCURRENCY", "3")
+    monkeypatch.setenv("SLOWVENDOR_TIMEOUT", "12")
+    monkeypatch.setenv("SLOWVENDOR_CACHE_TTL", "60")
+    limits = _Slow(delay=0).limits()
+    assert (limits["concurrency"], limits["batch_concurrency"], limits["timeout"], limits["cache_ttl"]) == (7, 3, 12.0, 60.0)
+
+
+def test_registry_loads_vendor_modules_lazily():
+    import providers
+
+    assert providers.get_provider("Desconocido") is None
+    assert providers.get_provider("Dato no válido") is None  # not an importable module name
+    lenovo = providers.get_provider("Lenovo")
+    assert lenovo.brand == "Lenovo"
+    assert providers.get_provider("Lenovo") is lenovo
+    assert providers.loaded_providers()["Lenovo"] is lenovo
+    assert "Desconocido" not in providers.loaded_providers()
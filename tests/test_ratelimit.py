@@ -0,0 +1,135 @@
+"""Upstream push-back detection and the adaptive token-bucket limiter."""
+import asyncio
+
+import pytest
+import requests
+
+from ratelimit import RateLimiter, get_limiter, is_block_page, limited_call, limited_call_async, note_response
+
+NORMAL_PAGE = """<!doctype html><html><head><meta name="robots" content="index, follow">
+<title>Warranty Check | HP Support</title></head><body><form><input name="captchaToken" type="hidden">
+<p>Check your HP warranty</p></form></body></html>"""
+CAPTCHA_PAGE = """<html><head><script src="https://www.google.com/recaptcha/api.js"></script></head>
+<body><div class="g-recaptcha" data-sitekey="x"></div><p>Please confirm you are not a robot.</p></body></html>"""
+
+
+def _response(status, body, content_type="text/html", headers=None):
+    response = requests.Response()
+    response.status_code = status
+    response.headers["Content-Type"] = content_type
+    response.headers.update(headers or {})
+    response._content = body.encode()
+    return response
+
+
+def test_normal_page_mentioning_robots_is_not_a_block_page():
+    limiter = RateLimiter("test", rate=10, burst=1)
+    assert not is_block_page(NORMAL_PAGE)
+    assert not note_response(limiter, _response(500, NORMAL_PAGE))
+    assert limiter.rate == 10
+
+
+def test_captcha_page_throttles():
+    limiter = RateLimiter("test", rate=10, burst=1)
+    assert is_block_page(CAPTCHA_PAGE)
+    assert note_response(limiter, _response(200, CAPTCHA_PAGE))
+    assert limiter.rate == 5
+
+
+def test_429_throttles_and_json_is_never_sniffed():
+    limiter = RateLimiter("test", rate=10, burst=1)
+    assert note_response(limiter, _response(429, "", headers={"Retry-After": "1"}))
+    assert not note_response(limiter, _response(200, '{"note": "g-recaptcha"}', "application/json"))
+
+
+def test_limited_call_retries_once_after_push_back():
+    limiter = RateLimiter("test", rate=0, burst=1)  # unlimited: no sleeping
+    answers = [_response(429, ""), _response(429, ""), _response(200, "{}", "application/json")]
+    waits = []
+    response = limited_call(limiter, lambda: answers.pop(0), waits.append)
+    assert response.status_code == 429 and len(answers) == 1
+    assert waits == [0.0, 0.0]
+
+
+def test_limited_call_async_sends_once_when_not_throttled():
+    limiter = RateLimiter("test", rate=0, burst=1)
+    sent = []
+
+    async def send():
+        sent.append(1)
+        return _response(200, "{}", "application/json")
+    assert asyncio.run(limited_call_async(limiter, send)).status_code == 200
+    assert sent == [1]
+
+
+class _Clock:
+    """monotonic() and sleep() on a fake timeline"""
+
+    def __init__(self):
+        self.now = 100.0
+        self.slept = []
+
+    def monotonic(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.slept.append(round(seconds, 6))
+        self.now += seconds
+
+
+def _fake_time(monkeypatch):
+    clock = _Clock()
+    monkeypatch.setattr("ratelimit.time.monotonic", clock.monotonic)
+    monkeypatch.setattr("ratelimit.time.sleep", clock.sleep)
+    return clock
+
+
+def test_burst_passes_then_callers_are_paced(monkeypatch):
+    clock = _fake_time(monkeypatch)
+    limiter = RateLimiter("test", rate=2, burst=3)
+    waits = [limiter.wait() for _ in range(5)]
+    assert waits == [0.0, 0.0, 0.0, 0.5, 0.5]
+    assert clock.slept == [0.5, 0.5]
+    assert limiter.stats()["wait_seconds_max"] == 0.5
+
+
+def test_throttle_halves_the_rate_once_per_second_and_honours_retry_after(monkeypatch):
+    clock = _fake_time(monkeypatch)
+    limiter = RateLimiter("test", rate=4, burst=1)
+    limiter.throttled()
+    limiter.throttled()  # same second: one cut only
+    assert limiter.rate == 2
+    clock.now += 1
+    limiter.throttled(retry_after=3)
+    assert limiter.rate == 1
+    assert limiter.wait() == pytest.approx(3)
+
+
+def test_rate_never_drops_below_the_floor_and_recovers(monkeypatch):
+    clock = _fake_time(monkeypatch)
+    monkeypatch.setattr("ratelimit.RATE_LIMIT_MIN_FACTOR", 0.25)
+    monkeypatch.setattr("ratelimit.RATE_LIMIT_RECOVER_SECONDS", 60)
+    limiter = RateLimiter("test", rate=8, burst=1)
+    for _ in range(5):
+        limiter.throttled()
+        clock.now += 1
+    assert limiter.rate == 2
+
+    clock.now += 60
+    limiter.wait()
+    assert limiter.rate == pytest.approx(2.8)  # +10% of the configured rate per quiet period
+
+
+def test_zero_rate_is_unlimited(monkeypatch):
+    clock = _fake_time(monkeypatch)
+    limiter = RateLimiter("test", rate=0, burst=1)
+    assert [limiter.wait() for _ in range(100)] == [0.0] * 100
+    assert clock.slept == []
+
+
+def test_limits_are_split_across_processes(monkeypatch):
+    monkeypatch.setattr("ratelimit.RATE_LIMIT_PROCESSES", 4)
+    monkeypatch.setenv("RATE_LIMIT_TEST_SPLIT", "10")
+    monkeypatch.setenv("RATE_BURST_TEST_SPLIT", "5")
+    limiter = get_limiter("test_split", rate=1, burst=1)
+    assert (limiter.base_rate, limiter.burst) == (2.5, 2)
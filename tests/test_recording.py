@@ -0,0 +1,85 @@
+"""Record/replay of upstream traffic: secrets redacted on disk, recorded answers served back in order."""
+import asyncio
+import json
+
+import httpx
+import pytest
+import requests
+
+import recording
+from recording import REDACTED, Recordings, redact_body, redact_headers, redact_url
+
+IBASE_URL = "https://pcsupport.lenovo.com/us/en/api/v4/upsell/redport/getIbaseInfo"
+SEARCH_URL = "https://support.hp.com/wcc-services/search/sn/us-en?serialNumber=5CD0002401"
+
+
+@pytest.fixture
+def recording_file(tmp_path, monkeypatch):
+    path = tmp_path / "upstream.jsonl"
+    monkeypatch.setattr(recording, "UPSTREAM_RECORDING_FILE", str(path))
+    monkeypatch.setattr(recording, "_recordings", None)
+    return path
+
+
+def _record(url, body, status, response_body, method="POST"):
+    recording.record("test", method, url, [("Content-Type", "application/json"), ("x-csrf-token", "tok")],
+                     body, status, [("Content-Type", "application/json")], response_body, 0.25)
+
+
+def test_headers_urls_and_bodies_are_redacted():
+    assert redact_headers([("Cookie", "a=1; JSESSIONID=abc"), ("Set-Cookie", "sid=xyz; Path=/; HttpOnly"),
+                           ("X-CSRF-Token", "tok"), ("Accept", "*/*")]) == [
+        ["Cookie", f"a={REDACTED}; JSESSIONID={REDACTED}"], ["Set-Cookie", f"sid={REDACTED}; Path=/; HttpOnly"],
+        ["X-CSRF-Token", REDACTED], ["Accept", "*/*"]]
+    assert redact_url("https://h.test/p?serial=1&api_key=k&captchaToken=") == \
+        f"https://h.test/p?serial=1&api_key={REDACTED}&captchaToken="
+    assert json.loads(redact_body('{"serial": "1", "auth": {"accessToken": "t"}}')) == \
+        {"serial": "1", "auth": {"accessToken": REDACTED}}
+    assert redact_body('<meta name="csrf-token" content="secret123">') == \
+        f'<meta name="csrf-token" content="{REDACTED}">'
+
+
+def test_recorded_line_holds_no_secrets(recording_file):
+    _record(IBASE_URL, b'{"serialNumber": "PF000001", "token": "abc"}', 200, b'{"code": 0}')
+    (entry,) = [json.loads(line) for line in recording_file.read_text().splitlines()]
+    assert entry["method"] == "POST" and entry["elapsed_ms"] == 250.0
+    assert ["x-csrf-token", REDACTED] in entry["request"]["headers"]
+    assert json.loads(entry["request"]["body"]) == {"serialNumber": "PF000001", "token": REDACTED}
+    assert entry["response"] == {"status": 200, "headers": [["Content-Type", "application/json"]],
+                                 "body": '{"code": 0}', "encoding": "text"}
+
+
+def test_repeated_requests_cycle_through_recorded_responses(recording_file):
+    _record(IBASE_URL, b'{"a": 1, "b": 2}', 500, b'{"n": 1}')
+    _record(IBASE_URL, b'{"a": 1, "b": 2}', 200, b'{"n": 2}')
+    recordings = Recordings(str(recording_file))
+    # JSON bodies match regardless of key order
+    statuses = [recordings.match("post", IBASE_URL, '{"b": 2, "a": 1}')["status"] for _ in range(3)]
+    assert statuses == [500, 200, 500]
+    assert recordings.match("POST", IBASE_URL, '{"a": 2}') is None
+
+
+def test_httpx_replay_transport_answers_from_the_file(recording_file, monkeypatch):
+    _record(IBASE_URL, b'{"serialNumber": "PF000001"}', 200, b'{"code": 0, "msg": "success"}')
+    monkeypatch.setattr(recording, "REPLAYING", True)
+
+    async def go():
+        async with httpx.AsyncClient(transport=recording.httpx_transport("lenovo")) as client:
+            found = await client.post(IBASE_URL, json={"serialNumber": "PF000001"})
+            with pytest.raises(httpx.ConnectError, match="no recorded response"):
+                await client.post(IBASE_URL, json={"serialNumber": "PF000002"})
+            return found
+    response = asyncio.run(go())
+    assert response.status_code == 200 and response.json() == {"code": 0, "msg": "success"}
+
+
+def test_requests_replay_adapter_answers_from_the_file(recording_file, monkeypatch):
+    _record(SEARCH_URL, None, 200, b'{"code": 404, "data": null}', method="GET")
+    monkeypatch.setattr(recording, "REPLAYING", True)
+    session = requests.Session()
+    session.mount("https://", recording.requests_adapter("hp"))
+
+    response = session.get(SEARCH_URL)
+    assert response.status_code == 200 and response.json() == {"code": 404, "data": None}
+    with pytest.raises(requests.ConnectionError, match="no recorded response"):
+        session.get(SEARCH_URL.replace("2401", "2402"))
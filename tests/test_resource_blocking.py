@@ -0,0 +1,61 @@
+"""HP resource blocking: blocklist patterns per profile, the DevTools calls and traffic counting."""
+import pytest
+
+import resource_blocking
+from resource_blocking import TrafficMeter, apply_blocking, blocked_url_patterns
+
+
+class _Driver:
+    def __init__(self):
+        self.commands = []
+
+    def execute_cdp_cmd(self, cmd, params):
+        self.commands.append((cmd, params))
+
+
+def test_default_profile_blocks_heavy_types_and_trackers():
+    patterns = blocked_url_patterns("default", None, "")
+    for pattern in ("*.jpg", "*.jpg?*", "*.woff2", "*.mp4", "*googletagmanager.com*", "*otSDKStub.js*"):
+        assert pattern in patterns
+    # Scripts, stylesheets and the warranty XHR are left alone
+    assert "*.css" not in patterns and not any("wcc-services" in p for p in patterns)
+
+
+def test_types_override_and_extra_patterns():
+    patterns = blocked_url_patterns("none", "font, stylesheet", "*cdn.example/*,")
+    assert patterns == ["*.woff", "*.woff?*", "*.woff2", "*.woff2?*", "*.ttf", "*.ttf?*", "*.otf", "*.otf?*",
+                        "*.eot", "*.eot?*", "*.css", "*.css?*", "*cdn.example/*"]
+    assert blocked_url_patterns("none", None, "") == []
+
+
+@pytest.mark.parametrize("profile, types, message", [
+    ("aggressive", None, "Unknown HP_BLOCK_PROFILE"),
+    ("none", "script", "Unknown resource type"),
+])
+def test_unknown_profile_or_type_is_rejected(profile, types, message):
+    with pytest.raises(ValueError, match=message):
+        blocked_url_patterns(profile, types, "")
+
+
+def test_apply_blocking_installs_the_list_through_devtools(monkeypatch):
+    driver = _Driver()
+    monkeypatch.setattr(resource_blocking, "blocked_url_patterns", lambda: ["*.png", "*ads.example*"])
+    assert apply_blocking(driver) == 2
+    assert driver.commands == [("Network.enable", {}), ("Network.setBlockedURLs", {"urls": ["*.png", "*ads.example*"]})]
+
+    driver = _Driver()
+    monkeypatch.setattr(resource_blocking, "blocked_url_patterns", lambda: [])
+    assert apply_blocking(driver) == 0 and driver.commands == []
+
+
+def test_traffic_meter_counts_requests_bytes_and_blocked():
+    meter = TrafficMeter()
+    for message in (
+        {"method": "Network.requestWillBeSent", "params": {}},
+        {"method": "Network.requestWillBeSent", "params": {}},
+        {"method": "Network.loadingFinished", "params": {"encodedDataLength": 2048}},
+        {"method": "Network.loadingFailed", "params": {"blockedReason": "inspector"}},
+        {"method": "Network.loadingFailed", "params": {"errorText": "net::ERR_ABORTED"}},
+    ):
+        meter.add(message)
+    assert (meter.requests, meter.bytes, meter.blocked) == (2, 2048, 1)
@@ -0,0 +1,69 @@
+"""SingleFlight: concurrent callers for one key share a single upstream call."""
+import asyncio
+
+import pytest
+
+from singleflight import SingleFlight
+
+
+def test_concurrent_callers_share_one_call():
+    flight, calls = SingleFlight(), []
+
+    async def fetch():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return "result"
+
+    async def go():
+        return await asyncio.gather(*(flight.do("PF000001", fetch) for _ in range(5)))
+    assert asyncio.run(go()) == ["result"] * 5
+    assert calls == [1]
+    assert flight.stats() == {"in_flight": 0, "upstream_calls": 1, "coalesced": 4}
+
+
+def test_different_keys_and_later_calls_run_separately():
+    flight, calls = SingleFlight(), []
+
+    async def fetch(key):
+        calls.append(key)
+        await asyncio.sleep(0.01)
+        return key
+
+    async def go():
+        first = await asyncio.gather(flight.do("a", lambda: fetch("a")), flight.do("b", lambda: fetch("b")))
+        second = await flight.do("a", lambda: fetch("a"))
+        return first, second
+    assert asyncio.run(go()) == (["a", "b"], "a")
+    assert calls == ["a", "b", "a"]
+
+
+def test_every_waiter_gets_the_exception():
+    flight = SingleFlight()
+
+    async def fail():
+        await asyncio.sleep(0.01)
+        raise ValueError("vendor down")
+
+    async def go():
+        return await asyncio.gather(flight.do("k", fail), flight.do("k", fail), return_exceptions=True)
+    results = asyncio.run(go())
+    assert [type(r) for r in results] == [ValueError, ValueError]
+    assert not flight.in_flight("k")
+
+
+def test_a_cancelled_waiter_does_not_cancel_the_shared_call():
+    flight = SingleFlight()
+
+    async def fetch():
+        await asyncio.sleep(0.05)
+        return "done"
+
+    async def go():
+        first = asyncio.ensure_future(flight.do("k", fetch))
+        second = asyncio.ensure_future(flight.do("k", fetch))
+        await asyncio.sleep(0.01)
+        first.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await first
+        return await second
+    assert asyncio.run(go()) == "done"
@@ -0,0 +1,54 @@
+"""ResultStore: SQLite rows with expiry, kept past it for the stale fallback, ranked by hits."""
+import threading
+
+from store import ResultStore
+
+
+def test_put_get_and_expiry(tmp_path, monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr("store.time.time", lambda: now[0])
+    store = ResultStore(str(tmp_path / "warranty.db"))
+    store.put("PF000001", 200, {"Brand": "Lenovo"}, ttl=60)
+    assert store.get("PF000001") == (200, {"Brand": "Lenovo"}, 1000.0, 1060.0)
+
+    now[0] += 61
+    assert store.get("PF000001") is None
+    assert store.get("PF000001", include_expired=True)[:2] == (200, {"Brand": "Lenovo"})
+
+    store.put("PF000001", 404, "not found", ttl=60)  # overwrites
+    assert store.get("PF000001")[:2] == (404, "not found")
+
+
+def test_hottest_orders_by_flushed_hits_and_skips_expired(tmp_path):
+    store = ResultStore(str(tmp_path / "warranty.db"))
+    for serial in ("a", "b", "c"):
+        store.put(serial, 200, serial, ttl=60)
+    store.put("gone", 200, "gone", ttl=-1)
+    for serial, hits in (("a", 1), ("b", 3), ("gone", 5)):
+        for _ in range(hits):
+            store.record_hit(serial)
+    assert store.flush_hits() == 3
+    assert [row[0] for row in store.hottest(2)] == ["b", "a"]
+
+
+def test_prune_keeps_expired_rows_for_the_retention(tmp_path, monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr("store.time.time", lambda: now[0])
+    store = ResultStore(str(tmp_path / "warranty.db"), retention=100)
+    store.put("old", 200, "x", ttl=10)
+    now[0] += 50
+    assert store.prune() == 0
+    now[0] += 100
+    assert store.prune() == 1
+    assert store.stats()["entries"] == 0
+
+
+def test_each_thread_gets_its_own_connection(tmp_path):
+    store = ResultStore(str(tmp_path / "warranty.db"))
+    store.put("main", 200, "x", ttl=60)
+    seen = []
+    thread = threading.Thread(target=lambda: seen.append(store.get("main")))
+    thread.start()
+    thread.join()
+    assert seen[0][:2] == (200, "x")
+    assert store.delete("main") == 1 and store.clear() == 0
@@ -0,0 +1,78 @@
+"""The on-disk store behind the API: STORE and STALE answers, and failures that never become a 500."""
+import asyncio
+import sqlite3
+import time
+
+import httpx
+from fastapi import HTTPException
+
+import main
+from store import ResultStore
+
+
+class _BrokenStore:
+    def get(self, key, include_expired=False):
+        raise sqlite3.OperationalError("database is locked")
+
+    def put(self, key, status, body, ttl):
+        raise sqlite3.OperationalError("disk I/O error")
+
+
+def test_stale_read_error_keeps_the_upstream_status(monkeypatch):
+    async def unavailable(key, serial_number, brand):
+        raise HTTPException(status_code=503, detail="HP unavailable", headers={"Retry-After": "30"})
+    monkeypatch.setattr(main, "result_store", _BrokenStore())
+    monkeypatch.setattr(main, "lookup_and_remember", unavailable)
+
+    async def go():
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return await client.get("/warranty/5CD0001001")
+    response = asyncio.run(go())
+
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "30"
+
+
+def test_failed_store_write_is_logged(monkeypatch, capsys):
+    monkeypatch.setattr(main, "result_store", _BrokenStore())
+    main.remember_result("5CD0001002", 200, {"Brand": "HP"}, 60)
+
+    deadline = time.monotonic() + 5
+    out = ""
+    while "Result store write failed" not in out and time.monotonic() < deadline:
+        time.sleep(0.01)
+        out += capsys.readouterr().out
+    assert "disk I/O error" in out
+
+
+def _get(serial):
+    async def go():
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return await client.get(f"/warranty/{serial}")
+    return asyncio.run(go())
+
+
+def test_expired_result_is_served_stale_when_the_vendor_is_down(tmp_path, monkeypatch):
+    store = ResultStore(str(tmp_path / "warranty.db"))
+    store.put("5CD0001003", 200, {"Brand": "HP", "Warranty End": "31/01/2026"}, ttl=-1)
+
+    async def unavailable(key, serial_number, brand):
+        raise HTTPException(status_code=503, detail="HP unavailable")
+    monkeypatch.setattr(main, "result_store", store)
+    monkeypatch.setattr(main, "lookup_and_remember", unavailable)
+
+    response = _get("5CD0001003")
+    assert response.status_code == 200
+    assert response.headers["X-Cache"] == "STALE"
+    assert response.json()["Warranty End"] == "31/01/2026"
+
+
+def test_unexpired_row_is_answered_from_the_store_tier(tmp_path, monkeypatch):
+    store = ResultStore(str(tmp_path / "warranty.db"))
+    store.put("5CD0001004", 404, "Warranty information not found", ttl=600)
+    monkeypatch.setattr(main, "result_store", store)
+
+    response = _get("5CD0001004")
+    assert (response.status_code, response.headers["X-Cache"]) == (404, "STORE")
@@ -0,0 +1,41 @@
+"""With several tabs per browser, each tab gets the performance-log entries of its own target."""
+import json
+import threading
+
+from ultra_fast_warranty import PooledTab
+
+
+def _entry(webview, method):
+    message = {"message": {"method": method, "params": {}}, "webview": webview}
+    return {"level": "INFO", "message": json.dumps(message), "timestamp": 0}
+
+
+class _Driver:
+    def __init__(self, entries):
+        self.entries = entries
+
+    def get_log(self, log_type):
+        entries, self.entries = self.entries, []
+        return entries
+
+
+class _Browser:
+    def __init__(self, entries):
+        self.lock = threading.RLock()
+        self.current_handle = None
+        self.logs = {}
+        self.driver = _Driver(entries)
+
+
+def _methods(entries):
+    return [json.loads(entry["message"])["message"]["method"] for entry in entries]
+
+
+def test_performance_log_is_split_by_webview():
+    browser = _Browser([_entry("T1", "Network.requestWillBeSent"), _entry("T2", "Network.responseReceived"),
+                        _entry("T1", "Network.loadingFinished"), {"level": "INFO", "message": "not json"}])
+    first, second = PooledTab(browser, "h1", "T1"), PooledTab(browser, "h2", "T2")
+
+    assert _methods(first.driver.get_log("performance")) == ["Network.requestWillBeSent", "Network.loadingFinished"]
+    assert _methods(second.driver.get_log("performance")) == ["Network.responseReceived"]
+    assert first.driver.get_log("performance") == []
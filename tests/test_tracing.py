@@ -0,0 +1,91 @@
+"""Per-request traces: nested spans, Server-Timing and X-Trace-Id headers, traceparent, export."""
+import asyncio
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import httpx
+from fastapi import FastAPI
+
+import tracing
+from metrics import stage_timer
+from tracing import JsonFileExporter, TracingMiddleware, span
+
+TRACE_ID = "4bf92f3577b34da6a3ce929d0e0e4736"
+
+_executor = ThreadPoolExecutor(max_workers=1)
+app = FastAPI()
+app.add_middleware(TracingMiddleware)
+
+
+def _blocking_step():
+    with stage_timer("page_load"):
+        time.sleep(0.01)
+
+
+@app.get("/lookup")
+async def lookup():
+    with span("cache") as s:
+        s.set(tier="MISS")
+    with span("vendor_lookup"):
+        await tracing.run_in_executor(_executor, _blocking_step)
+    return {"ok": True}
+
+
+class _Collector:
+    def __init__(self):
+        self.traces = []
+
+    def export(self, trace):
+        self.traces.append(trace)
+
+
+def _get(path, headers=None):
+    async def go():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return await client.get(path, headers=headers)
+    return asyncio.run(go())
+
+
+def test_response_carries_server_timing_per_span():
+    response = _get("/lookup")
+    entries = dict(item.split(";dur=") for item in response.headers["Server-Timing"].split(", "))
+    assert list(entries) == ["total", "cache", "page_load", "vendor_lookup"]
+    assert float(entries["page_load"]) >= 10 and float(entries["total"]) >= float(entries["vendor_lookup"])
+    assert len(response.headers["X-Trace-Id"]) == 32
+
+
+def test_traceparent_continues_the_callers_trace_and_spans_are_exported():
+    collector = _Collector()
+    tracing.set_exporter(collector)
+    try:
+        response = _get("/lookup", headers={"traceparent": f"00-{TRACE_ID}-00f067aa0ba902b7-01"})
+        tracing.shutdown()
+    finally:
+        tracing.set_exporter(None)
+    assert response.headers["X-Trace-Id"] == TRACE_ID
+
+    (trace,) = collector.traces
+    assert trace["trace_id"] == TRACE_ID and trace["name"] == "GET /lookup"
+    spans = {s["name"]: s for s in trace["spans"]}
+    root = spans["GET /lookup"]
+    assert root["parent_id"] == "00f067aa0ba902b7" and root["attributes"] == {"status": 200}
+    # The executor thread's span nests under the span that was current when it was submitted
+    assert spans["page_load"]["parent_id"] == spans["vendor_lookup"]["span_id"]
+    assert spans["cache"]["attributes"] == {"tier": "MISS"}
+
+
+def test_span_outside_a_request_is_a_no_op():
+    with span("cache") as s:
+        s.set(tier="HIT")
+    assert tracing.current_trace_id() is None
+
+
+def test_json_exporter_rotates_past_max_bytes(tmp_path):
+    path = tmp_path / "traces.jsonl"
+    exporter = JsonFileExporter(str(path), max_bytes=100)
+    for n in range(3):
+        exporter.export({"trace_id": str(n), "spans": ["x" * 30]})
+    assert [json.loads(line)["trace_id"] for line in path.read_text().splitlines()] == ["2"]
+    assert [json.loads(line)["trace_id"] for line in (tmp_path / "traces.jsonl.1").read_text().splitlines()] == ["1"]
@@ -0,0 +1,95 @@
+"""Startup warm-up: providers prepare in parallel, /ready answers 503 until they are done."""
+import asyncio
+
+import httpx
+import pytest
+
+import main
+import ultra_fast_warranty
+from ultra_fast_warranty import BrowserPool
+
+
+class _Provider:
+    def __init__(self, info=None, error=None):
+        self.info, self.error = info, error
+
+    async def warm_up(self):
+        await asyncio.sleep(0.01)
+        if self.error is not None:
+            raise self.error
+        return self.info
+
+
+class _Driver:
+    current_window_handle = "tab1"
+
+    def __init__(self):
+        self.loaded = []
+
+    def get(self, url):
+        self.loaded.append(url)
+
+    def execute_script(self, script):
+        return "complete"
+
+    def quit(self):
+        pass
+
+
+@pytest.fixture
+def warmup(monkeypatch):
+    state = {"state": "pending", "providers": {}, "seconds": None, "errors": []}
+    monkeypatch.setattr(main, "warmup", state)
+    return state
+
+
+def _ready():
+    async def go():
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return await client.get("/ready")
+    return asyncio.run(go())
+
+
+def test_ready_after_warm_up_even_if_a_provider_fails(warmup, monkeypatch):
+    providers = {"Lenovo": _Provider(info={"session": True}), "HP": _Provider(error=RuntimeError("no chrome"))}
+    monkeypatch.setattr(main, "WARM_PROVIDERS", ["Lenovo", "HP"])
+    monkeypatch.setattr(main, "get_provider", providers.get)
+
+    assert _ready().status_code == 503
+    asyncio.run(main.warm_up())
+    response = _ready()
+
+    assert response.status_code == 200
+    body = response.json()["warmup"]
+    assert body["state"] == "done" and body["providers"] == {"Lenovo": {"session": True}}
+    assert body["errors"] == ["HP: no chrome"]
+
+
+def test_warm_up_browsers_prestarts_idle_browsers(monkeypatch):
+    drivers = []
+
+    def factory():
+        drivers.append(_Driver())
+        return drivers[-1]
+    pool = BrowserPool(size=2, max_uses=100, max_age=1800, idle_timeout=300, acquire_timeout=5,
+                       max_waiters=4, factory=factory)
+    monkeypatch.setattr(ultra_fast_warranty, "_pool", pool)
+    monkeypatch.setattr(ultra_fast_warranty, "chromedriver_path", lambda: "/usr/bin/chromedriver")
+
+    assert ultra_fast_warranty.warm_up_browsers(count=5, url="https://hp.test/warm") == 2
+    assert [d.loaded for d in drivers] == [["https://hp.test/warm"]] * 2
+    stats = pool.stats()
+    assert stats["browsers"] == 2 and stats["idle"] == 2 and stats["checkouts"] == 0
+
+
+def test_chromedriver_path_must_be_executable(monkeypatch, tmp_path):
+    binary = tmp_path / "chromedriver"
+    binary.write_text("")
+    monkeypatch.setattr(ultra_fast_warranty, "_chromedriver", None)
+    monkeypatch.setattr(ultra_fast_warranty, "CHROMEDRIVER_PATH", str(binary))
+    with pytest.raises(RuntimeError, match="not executable"):
+        ultra_fast_warranty.chromedriver_path()
+
+    binary.chmod(0o755)
+    assert ultra_fast_warranty.chromedriver_path() == str(binary)
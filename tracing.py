@@ -0,0 +1,330 @@
+import asyncio
+import contextvars
+import functools
+import importlib
+import json
+import os
+import queue
+import re
+import secrets
+import sys
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+
+# Per-request tracing. Every HTTP request gets a trace; span() opens nested spans (cache,
+# vendor lookup, each upstream call and browser step) under the current one. The current
+# span lives in a context variable, so it follows asyncio tasks and executor threads started
+# with contextvars.copy_context(). Responses carry a Server-Timing header built from the
+# spans; finished traces go to the configured exporter on a background thread. A W3C
+# traceparent request header makes the request's trace continue the caller's.
+
+# "" = no export, "json" = JSON lines in TRACE_FILE, "module:factory" = custom exporter
+TRACE_EXPORTER = os.environ.get("TRACE_EXPORTER", "")
+TRACE_FILE = os.environ.get("TRACE_FILE", os.path.join(tempfile.gettempdir(), "warranty-traces.jsonl"))
+TRACE_FILE_MAX_BYTES = int(os.environ.get("TRACE_FILE_MAX_BYTES", str(100 * 1024 * 1024)))
+TRACE_MAX_SPANS = int(os.environ.get("TRACE_MAX_SPANS", "500"))  # per trace (batches are long)
+TRACE_QUEUE_SIZE = int(os.environ.get("TRACE_QUEUE_SIZE", "1000"))  # traces waiting for export
+
+_current = contextvars.ContextVar("trace_span", default=None)
+_TRACEPARENT = re.compile(r"^[0-9a-f]{2}-([0-9a-f]{32})-([0-9a-f]{16})-[0-9a-f]{2}$")
+
+
+class Span:
+    def __init__(self, trace, name, parent_id, attributes):
+        self.trace = trace
+        self.span_id = secrets.token_hex(8)
+        self.parent_id = parent_id
+        self.name = name
+        self.attributes = attributes
+        self.start = time.perf_counter()
+        self.start_time = time.time()
+        self.duration = None
+
+    def set(self, **attributes):
+        self.attributes.update(attributes)
+
+    def end(self, duration=None):
+        self.duration = time.perf_counter() - self.start if duration is None else duration
+        self.trace._add(self)
+
+    def to_dict(self):
+        return {
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "start": round(self.start_time, 6),
+            "duration_ms": round(self.duration * 1000, 3),
+            "attributes": self.attributes,
+        }
+
+
+class _NoSpan:
+    """Stand-in returned by span() outside a trace, so callers never have to check"""
+
+    def set(self, **attributes):
+        pass
+
+
+_NO_SPAN = _NoSpan()
+
+
+class Trace:
+    def __init__(self, trace_id=None):
+        self.trace_id = trace_id or secrets.token_hex(16)
+        self.root = None
+        self.spans = []  # finished spans, in the order they ended
+        self.dropped = 0
+        self.finished = False
+        self._lock = threading.Lock()
+
+    def _add(self, span):
+        with self._lock:
+            if self.finished:
+                return  # e.g. a background task that outlived the request
+            if len(self.spans) >= TRACE_MAX_SPANS:
+                self.dropped += 1
+                return
+            self.spans.append(span)
+
+    def server_timing(self):
+        """Server-Timing value: total duration so far plus each span name's summed duration"""
+        totals = {}
+        with self._lock:
+            for span in self.spans:
+                if span is not self.root:
+                    totals[span.name] = totals.get(span.name, 0.0) + span.duration
+        entries = [f"total;dur={(time.perf_counter() - self.root.start) * 1000:.1f}"]
+        entries.extend(f"{name};dur={seconds * 1000:.1f}" for name, seconds in totals.items())
+        return ", ".join(entries)
+
+    def to_dict(self):
+        with self._lock:
+            spans = [span.to_dict() for span in self.spans]
+        return {"trace_id": self.trace_id, "name": self.root.name, "spans": spans, "dropped_spans": self.dropped}
+
+
+def start_trace(name, trace_id=None, parent_id=None, **attributes):
+    """Start a trace and return its root span (not yet current; see TracingMiddleware)"""
+    trace = Trace(trace_id)
+    trace.root = Span(trace, name, parent_id, attributes)
+    return trace.root
+
+
+def finish_trace(root):
+    root.end()
+    root.trace.finished = True
+    _export(root.trace)
+
+
+def current_span():
+    return _current.get() or _NO_SPAN
+
+
+def current_trace_id():
+    span = _current.get()
+    return span.trace.trace_id if span is not None else None
+
+
+@contextmanager
+def span(name, **attributes):
+    """Time a block as a child of the current span: `with span("cache") as s: s.set(tier=...)`"""
+    parent = _current.get()
+    if parent is None or parent.trace.finished:
+        yield _NO_SPAN
+        return
+    child = Span(parent.trace, name, parent.span_id, attributes)
+    token = _current.set(child)
+    try:
+        yield child
+    except Exception as e:
+        child.attributes["error"] = type(e).__name__
+        raise
+    finally:
+        _current.reset(token)
+        child.end()
+
+
+async def run_in_executor(executor, func, *args):
+    """Run a blocking call on `executor` without blocking the event loop, inside the current span"""
+    loop = asyncio.get_running_loop()
+    context = contextvars.copy_context()
+    return await loop.run_in_executor(executor, functools.partial(context.run, func, *args))
+
+
+@contextmanager
+def continued_trace(name, trace_id=None, parent_id=None):
+    """
+    Run a block as part of a trace started in another process: its spans are collected on the
+    yielded root span (root.trace.spans) for the caller to send back, not exported here
+    """
+    root = start_trace(name, trace_id, parent_id)
+    token = _current.set(root)
+    try:
+        yield root
+    finally:
+        _current.reset(token)
+        root.end()
+        root.trace.finished = True
+
+
+def record_span(name, seconds, **attributes):
+    """Add a child span that just ended after `seconds` (for stages timed elsewhere)"""
+    parent = _current.get()
+    if parent is None or parent.trace.finished:
+        return
+    child = Span(parent.trace, name, parent.span_id, attributes)
+    child.start -= seconds
+    child.start_time -= seconds
+    child.end(seconds)
+
+
+class JsonFileExporter:
+    """Appends one JSON line per trace to `path`; rotates it to `path`.1 past `max_bytes`"""
+
+    def __init__(self, path=TRACE_FILE, max_bytes=TRACE_FILE_MAX_BYTES):
+        self.path = path
+        self.max_bytes = max_bytes
+
+    def export(self, trace):
+        line = json.dumps(trace, ensure_ascii=False, default=str) + "\n"
+        if self.max_bytes and os.path.exists(self.path) and os.path.getsize(self.path) + len(line) > self.max_bytes:
+            os.replace(self.path, self.path + ".1")
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(line)
+
+
+def load_exporter(spec):
+    """Exporter for a TRACE_EXPORTER value; custom exporters are "module:factory" and need export(trace_dict)"""
+    if not spec or spec == "none":
+        return None
+    if spec == "json":
+        return JsonFileExporter()
+    module, _, factory = spec.partition(":")
+    return getattr(importlib.import_module(module), factory)()
+
+
+_exporter = None
+_queue = queue.Queue(maxsize=TRACE_QUEUE_SIZE)
+_worker = None
+_stats = {"exported": 0, "dropped": 0, "errors": 0}
+
+
+def set_exporter(exporter):
+    """Send finished traces to `exporter` (None disables export)"""
+    global _exporter, _worker
+    _exporter = exporter
+    if exporter is not None and _worker is None:
+        _worker = threading.Thread(target=_export_loop, name="trace-export", daemon=True)
+        _worker.start()
+
+
+def _export(trace):
+    if _exporter is None:
+        return
+    try:
+        _queue.put_nowait(trace)
+    except queue.Full:
+        _stats["dropped"] += 1  # the exporter can't keep up; never slow requests down for it
+
+
+def _export_loop():
+    while True:
+        trace = _queue.get()
+        if trace is None:
+            return
+        try:
+            _exporter.export(trace.to_dict())
+            _stats["exported"] += 1
+        except Exception as e:
+            _stats["errors"] += 1
+            print(f"[Trace] Export failed: {e}", file=sys.stderr)
+
+
+def shutdown(timeout=5):
+    """Flush queued traces (called on app shutdown)"""
+    global _worker
+    if _worker is None:
+        return
+    _queue.put(None)
+    _worker.join(timeout)
+    _worker = None
+
+
+def stats():
+    return {"exporter": type(_exporter).__name__ if _exporter else None, "queued": _queue.qsize(), **_stats}
+
+
+class _TraceLogStream:
+    """Wraps stdout/stderr so lines printed while handling a request start with its trace id"""
+
+    def __init__(self, stream):
+        self._stream = stream
+        self._state = threading.local()
+
+    def write(self, text):
+        trace_id = current_trace_id()
+        if trace_id and text and text != "\n" and getattr(self._state, "line_start", True):
+            text = f"[trace={trace_id}] {text}"
+        if text:
+            self._state.line_start = text.endswith("\n")
+        return self._stream.write(text)
+
+    def __getattr__(self, name):
+        return getattr(self._stream, name)
+
+
+def tag_logs():
+    """Prefix request-time output on stdout and stderr with the trace id"""
+    if not isinstance(sys.stdout, _TraceLogStream):
+        sys.stdout = _TraceLogStream(sys.stdout)
+    if not isinstance(sys.stderr, _TraceLogStream):
+        sys.stderr = _TraceLogStream(sys.stderr)
+
+
+def _incoming_trace(scope):
+    """(trace id, parent span id) from a W3C traceparent request header, if any"""
+    for key, value in scope.get("headers", ()):
+        if key == b"traceparent":
+            match = _TRACEPARENT.match(value.decode("latin-1").strip())
+            if match and match.group(1) != "0" * 32:
+                return match.group(1), match.group(2)
+    return None, None
+
+
+class TracingMiddleware:
+    """ASGI middleware: one trace per HTTP request, Server-Timing and X-Trace-Id on the response"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        trace_id, parent_id = _incoming_trace(scope)
+        root = start_trace(f"{scope['method']} {scope['path']}", trace_id, parent_id)
+        token = _current.set(root)
+
+        async def send_with_timing(message):
+            if message["type"] == "http.response.start":
+                root.set(status=message["status"])
+                headers = list(message.get("headers", []))
+                # Streamed responses (batch, job events) only cover the spans done before the first byte
+                headers.append((b"server-timing", root.trace.server_timing().encode("latin-1")))
+                headers.append((b"x-trace-id", root.trace.trace_id.encode("latin-1")))
+                headers.append((b"timing-allow-origin", b"*"))  # let index.html read it cross-origin
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        except Exception as e:
+            root.set(error=type(e).__name__)
+            raise
+        finally:
+            _current.reset(token)
+            finish_trace(root)
+
+
+set_exporter(load_exporter(TRACE_EXPORTER))
@@ -1,17 +1,66 @@
 import requests
+import base64
 import json
 import sys
 import time
 import re
 import os
 import threading
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
+import browser_service
+import recording
+from circuit import CircuitOpenError, get_breaker
+from metrics import observe_stage, stage_timer
+from ratelimit import get_limiter, is_block_page, limited_call
+from resource_blocking import HP_MEASURE_TRAFFIC, TrafficMeter, apply_blocking, configure_options, record_traffic, traffic_stats
+from tracing import span
+
+HP_BASE_URL = os.environ.get("HP_BASE_URL", "https://support.hp.com").rstrip("/")
+HP_WARRANTY_API_PATH = os.environ.get("HP_WARRANTY_API_PATH", "/wcc-services/profile/devices/warranty/specs")
+# Set to 0 to always use the browser for dates
+HP_WARRANTY_API = os.environ.get("HP_WARRANTY_API", "1") == "1"
+# How the browser fallback waits for the dates: "observer" (in-page MutationObserver) or
+# "poll" (page_source polling plus a fixed 1s sleep; kept for benchmarking)
+HP_DOM_WAIT = os.environ.get("HP_DOM_WAIT", "observer")
+HP_DOM_WAIT_TIMEOUT = float(os.environ.get("HP_DOM_WAIT_TIMEOUT", "15"))
+# "network": take the warranty JSON the result page fetches from the DevTools network log and
+# finish without waiting for rendering (the DOM is still scraped if it never shows up);
+# "dom": always render the page and scrape the dates from its text
+HP_BROWSER_MODE = os.environ.get("HP_BROWSER_MODE", "network")
+HP_CAPTURE_TIMEOUT = float(os.environ.get("HP_CAPTURE_TIMEOUT", "10"))
+
+HP_HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/136.0.0.0 Safari/537.36",
+    "Accept": "application/json",
+}
+
+# One circuit breaker per stage, so a failing browser path doesn't stop the JSON APIs (and vice versa).
+# An open hp_warranty_api breaker falls back to the browser. An open hp_product or hp_browser breaker
+# fails the lookup at once (503 + Retry-After): a failing product search means HP itself is in
+# trouble, and the browser is the most expensive path. "Not found" counts as a success, and a
+# saturated browser pool doesn't count at all.
+_product_breaker = get_breaker("hp_product", slow_seconds=8)
+_warranty_api_breaker = get_breaker("hp_warranty_api", slow_seconds=8)
+_browser_breaker = get_breaker("hp_browser", slow_seconds=30)
+
+# Upstream rate limits (requests/s, burst); batch runs queue here instead of getting us blocked
+_search_limiter = get_limiter("hp_search", rate=5, burst=10)
+_warranty_api_limiter = get_limiter("hp_warranty_api", rate=5, burst=10)
+_browser_limiter = get_limiter("hp_browser", rate=2, burst=4)  # page loads
+
+# Shared keep-alive session for the HP JSON endpoints (used from the HP worker threads)
+_http = requests.Session()
+_http.mount("https://", recording.requests_adapter("hp", pool_connections=4, pool_maxsize=32))
+_http.mount("http://", recording.requests_adapter("hp", pool_connections=4, pool_maxsize=32))
 
 
 def convert_date_to_ddmmyyyy(date_string):
     """Convert date from various formats to 'DD/MM/YYYY' format"""
     if not date_string:
         return None
+    if re.match(r"\d{4}-\d{2}-\d{2}T", date_string):
+        date_string = date_string[:10]  # ISO timestamp from the JSON API
 
     for fmt in ["%B %d, %Y", "%B %d %Y", "%m/%d/%Y", "%Y-%m-%d", "%d-%m-%Y"]:
         try:
@@ -22,30 +71,518 @@ def convert_date_to_ddmmyyyy(date_string):
     return date_string
 
 
+class SerialNotFound(Exception):
+    """HP's product search answered that it knows no such serial"""
+
+
 def get_hp_product_info(serial_number):
-    """Get HP product info via API (fast, no browser needed)"""
+    """
+    Get HP product info via API (fast, no browser needed). Returns None if the API failed,
+    raises SerialNotFound if it answered that the serial is unknown and CircuitOpenError
+    while its breaker is open.
+    """
+    def search():
+        with stage_timer("hp_product_api"):
+            return _http.get(
+                f"{HP_BASE_URL}/wcc-services/search/sn/us-en",
+                params={"context": "contact", "serialNumber": serial_number, "productNumber": ""},
+                headers=HP_HEADERS,
+                timeout=10,
+            )
+
+    not_found = False
     try:
-        r = requests.get(
-            "https://support.hp.com/wcc-services/search/sn/us-en",
-            params={"context": "contact", "serialNumber": serial_number, "productNumber": ""},
-            headers={
-                "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/136.0.0.0 Safari/537.36",
-                "Accept": "application/json",
-            },
-            timeout=10,
-        )
-        data = r.json()
+        with _product_breaker.call() as call:
+            r = limited_call(_search_limiter, search, call.exclude)
+            r.raise_for_status()
+            data = r.json()
         if data.get("code") == 200 and data.get("data"):
             return data["data"]
+        not_found = data.get("code") == 404
+    except CircuitOpenError as e:
+        print(f"[HP] Product API skipped: {e}", file=sys.stderr)
+        raise
     except Exception as e:
         print(f"[HP] Product API error: {e}", file=sys.stderr)
+    if not_found:
+        raise SerialNotFound(serial_number)
+    return None
+
+
+def _find_coverages(node):
+    """Collect every dict in the warranty JSON that carries a start/end date pair, in document order"""
+    found = []
+    if isinstance(node, dict):
+        start = node.get("startDate") or node.get("coverageStartDate")
+        end = node.get("endDate") or node.get("coverageEndDate")
+        if start or end:
+            found.append({
+                "name": node.get("name") or node.get("offerDescription") or node.get("type") or node.get("warrantyType"),
+                "status": node.get("status") or node.get("warrantyStatus"),
+                "start": convert_date_to_ddmmyyyy(start),
+                "end": convert_date_to_ddmmyyyy(end),
+            })
+        for value in node.values():
+            found.extend(_find_coverages(value))
+    elif isinstance(node, list):
+        for item in node:
+            found.extend(_find_coverages(item))
+    return found
+
+
+def parse_hp_warranty_payload(data, serial_number, product_name=None):
+    """
+    Normalize the warranty-details JSON into the same dict the browser path returns,
+    plus a "coverages" list. Returns None if the payload holds no dates.
+    """
+    if not isinstance(data, dict):
+        return None
+    payload = data.get("data", data)
+    devices = payload.get("devices") if isinstance(payload, dict) else None
+    device = devices[0] if isinstance(devices, list) and devices else payload
+    coverages = _find_coverages(device)
+    if not coverages:
+        return None
+    # The first coverage is the one the result page lists first (what the scraper picks up)
+    primary = coverages[0]
+    if isinstance(device, dict):
+        product_name = product_name or device.get("productName")
+    return {
+        "brand": "HP",
+        "product_name": product_name,
+        "serial_number": serial_number,
+        "warranty_start": primary["start"],
+        "warranty_end": primary["end"],
+        "coverages": coverages,
+    }
+
+
+def get_hp_warranty_via_api(serial_number, product_info):
+    """
+    Get warranty dates from the JSON endpoint the warranty result page itself calls
+    (no browser). Returns None on any failure so the caller can fall back to Chrome.
+    """
+    product_number = product_info.get("productNumber", "")
+    body = {
+        "cc": "us",
+        "lc": "en",
+        "utcOffset": "M0000",
+        "customerId": "",
+        "deviceList": [{
+            "serialNumber": serial_number,
+            "productNumber": product_number,
+            "displayProductNumber": product_number,
+            "countryOfPurchase": "us",
+        }],
+        "captchaToken": "",
+    }
+
+    def fetch():
+        with stage_timer("hp_warranty_api"):
+            return _http.post(
+                f"{HP_BASE_URL}{HP_WARRANTY_API_PATH}",
+                params={"cache": "true", "authState": "anonymous", "template": "checkWarranty"},
+                json=body,
+                headers={**HP_HEADERS, "Content-Type": "application/json", "Origin": HP_BASE_URL},
+                timeout=10,
+            )
+
+    try:
+        with _warranty_api_breaker.call() as call:
+            r = limited_call(_warranty_api_limiter, fetch, call.exclude)
+            r.raise_for_status()
+            data = r.json()
+        return parse_hp_warranty_payload(data, serial_number, product_info.get("productName"))
+    except CircuitOpenError as e:
+        print(f"[HP] Warranty API skipped: {e}", file=sys.stderr)
+    except Exception as e:
+        print(f"[HP] Warranty API error: {e}", file=sys.stderr)
     return None
 
 
 # --- Persistent browser pool ---
-_browser_lock = threading.Lock()
-_browser_driver = None
-_browser_last_used = 0
+HP_BROWSER_POOL_SIZE = int(os.environ.get("HP_BROWSER_POOL_SIZE", "2"))
+HP_BROWSER_MAX_USES = int(os.environ.get("HP_BROWSER_MAX_USES", "100"))
+HP_BROWSER_MAX_AGE = float(os.environ.get("HP_BROWSER_MAX_AGE", "1800"))
+HP_BROWSER_IDLE_TIMEOUT = float(os.environ.get("HP_BROWSER_IDLE_TIMEOUT", "300"))
+HP_BROWSER_ACQUIRE_TIMEOUT = float(os.environ.get("HP_BROWSER_ACQUIRE_TIMEOUT", "30"))
+HP_BROWSER_MAX_WAITERS = int(os.environ.get("HP_BROWSER_MAX_WAITERS", "16"))
+# Lookups each Chrome runs at once, one per tab. With more than one, page loads and DOM waits
+# never block the WebDriver session (a blocking command would stall the sibling tabs). Raise
+# HP_CONCURRENCY to HP_BROWSER_POOL_SIZE x HP_BROWSER_TABS so every tab can be busy.
+HP_BROWSER_TABS = int(os.environ.get("HP_BROWSER_TABS", "1"))
+_NONBLOCKING_LOADS = HP_BROWSER_MODE == "network" or HP_BROWSER_TABS > 1
+# Browsers started (and pointed at HP_WARM_URL) at app startup, so the first lookups skip the cold start
+HP_WARM_BROWSERS = int(os.environ.get("HP_WARM_BROWSERS", str(HP_BROWSER_POOL_SIZE)))
+HP_WARM_URL = os.environ.get("HP_WARM_URL", f"{HP_BASE_URL}/us-en/check-warranty")
+# The Docker image bakes chromedriver in and points this at it, so nothing is downloaded at runtime
+CHROMEDRIVER_PATH = os.environ.get("CHROMEDRIVER_PATH", "")
+
+_browser_last_used = 0  # last time any browser was returned to the pool
+
+
+class BrowserPoolError(Exception):
+    """No browser could be checked out (wait queue full or acquire timeout)"""
+
+
+class PooledBrowser:
+    """One Chrome process. WebDriver runs one command per session at a time, so its tabs share `lock`."""
+
+    def __init__(self, driver):
+        self.driver = driver
+        self.created_at = time.time()
+        self.uses = 0
+        self.tabs = 0  # open tabs, including ones being opened
+        self.draining = False  # due for recycling: no new tabs, quit once the last one closes
+        self.lock = threading.RLock()
+        self.current_handle = None  # window the driver is switched to
+        self.logs = {}  # target id -> performance log entries fetched for that tab
+
+    def expired(self, max_uses, max_age):
+        return self.uses >= max_uses or time.time() - self.created_at >= max_age
+
+    def quit(self):
+        try:
+            self.driver.quit()
+        except Exception:
+            pass
+
+
+class TabDriver:
+    """
+    The browser's WebDriver bound to one tab: every command (and property read) switches to
+    the tab first, holding the browser lock, so lookups in sibling tabs can interleave.
+    """
+
+    def __init__(self, tab):
+        self._tab = tab
+
+    def _switch(self):
+        browser = self._tab.browser
+        if browser.current_handle != self._tab.handle:
+            browser.driver.switch_to.window(self._tab.handle)
+            browser.current_handle = self._tab.handle
+
+    def __getattr__(self, name):
+        browser = self._tab.browser
+        with browser.lock:
+            self._switch()
+            value = getattr(browser.driver, name)
+        if not callable(value):
+            return value
+
+        def command(*args, **kwargs):
+            with browser.lock:
+                self._switch()
+                return value(*args, **kwargs)
+        return command
+
+    def get_log(self, log_type):
+        """Log entries; the performance log is per session, so with several tabs each gets its own share"""
+        tab, browser = self._tab, self._tab.browser
+        with browser.lock:
+            entries = browser.driver.get_log(log_type)
+            if log_type != "performance" or tab.target_id is None:
+                return entries
+            for entry in entries:
+                # chromedriver names the tab (target id) inside the JSON message, not on the entry
+                try:
+                    webview = json.loads(entry["message"]).get("webview")
+                except (KeyError, TypeError, ValueError):
+                    continue
+                pending = browser.logs.get(webview)
+                if pending is not None:
+                    pending.append(entry)
+            own, browser.logs[tab.target_id] = browser.logs[tab.target_id], []
+            return own
+
+
+class PooledTab:
+    """One tab of a pooled browser: the unit checkout() hands out, one lookup at a time"""
+
+    def __init__(self, browser, handle, target_id=None):
+        self.browser = browser
+        self.handle = handle
+        self.target_id = target_id  # only needed to split the performance log between tabs
+        self.driver = TabDriver(self)
+        self.created_at = time.time()
+        self.last_used = self.created_at
+        self.uses = 0
+        if target_id is not None:
+            browser.logs[target_id] = []
+
+
+class BrowserPool:
+    """
+    Pool of up to `size` headless Chrome drivers, each running up to `tabs` lookups at once
+    in separate tabs, with checkout/checkin of tabs.
+
+    Callers wait in a bounded queue (max_waiters) for at most `acquire_timeout` seconds.
+    Browsers are recycled after `max_uses` lookups or `max_age` seconds (their tabs finish
+    first), a tab that errored is closed, and a reaper thread closes tabs idle longer than
+    `idle_timeout`; a browser quits with its last tab.
+    """
+
+    def __init__(self, size, max_uses, max_age, idle_timeout, acquire_timeout, max_waiters,
+                 factory=None, tabs=1, tab_setup=None):
+        self.size = size
+        self.tabs = max(1, tabs)
+        self.max_uses = max_uses
+        self.max_age = max_age
+        self.idle_timeout = idle_timeout
+        self.acquire_timeout = acquire_timeout
+        self.max_waiters = max_waiters
+        self.factory = factory or _create_chrome_driver
+        self.tab_setup = tab_setup  # called with the driver switched to each extra tab
+        self._cond = threading.Condition()
+        self._browsers = []
+        self._idle = []  # LIFO: hot tabs are reused, cold ones sink and get reaped
+        self._total = 0  # tabs: idle + checked out + being opened
+        self._starting = 0  # browsers being started
+        self._waiters = 0
+        self._reaper = None
+        self._closed = False
+        self._stats = {"checkouts": 0, "created": 0, "tabs_opened": 0, "recycled": 0, "reaped": 0, "broken": 0,
+                       "rejected": 0, "timeouts": 0, "wait_seconds_total": 0.0, "wait_seconds_max": 0.0}
+
+    def _room(self):
+        """Where a new tab can go: a browser with a free tab slot, None for a new browser, False if full"""
+        for browser in self._browsers:
+            if not browser.draining and browser.tabs < self.tabs:
+                return browser
+        if len(self._browsers) + self._starting < self.size:
+            return None
+        return False
+
+    def _reserve(self, room):
+        self._total += 1
+        if room is None:
+            self._starting += 1
+        else:
+            room.tabs += 1
+
+    def _open(self, room):
+        """Open a reserved tab: in `room`, or as the first tab of a new browser if room is None"""
+        if room is None:
+            try:
+                browser = PooledBrowser(self.factory())
+            except Exception:
+                with self._cond:
+                    self._starting -= 1
+                    self._total -= 1
+                    self._cond.notify()
+                raise
+            with self._cond:
+                self._starting -= 1
+                browser.tabs = 1
+                self._browsers.append(browser)
+                self._stats["created"] += 1
+        else:
+            browser = room
+        try:
+            with browser.lock:
+                if room is not None:
+                    browser.driver.switch_to.new_window("tab")
+                    if self.tab_setup is not None:
+                        self.tab_setup(browser.driver)
+                handle = browser.current_handle = browser.driver.current_window_handle
+                target_id = None
+                if self.tabs > 1:
+                    target_id = browser.driver.execute_cdp_cmd("Target.getTargetInfo", {})["targetInfo"]["targetId"]
+        except Exception:
+            browser.draining = True  # a browser that can't open tabs isn't worth keeping
+            self._release(browser, "broken")
+            raise
+        if room is not None:
+            with self._cond:
+                self._stats["tabs_opened"] += 1
+        return PooledTab(browser, handle, target_id)
+
+    def _release(self, browser, reason):
+        """Give up one of the browser's tab slots; returns True if that quit the browser"""
+        with self._cond:
+            browser.tabs -= 1
+            self._total -= 1
+            self._stats[reason] += 1
+            last = browser.tabs == 0
+            if last and browser in self._browsers:
+                self._browsers.remove(browser)
+            self._cond.notify()
+        if last:
+            browser.quit()
+        return last
+
+    def checkout(self, timeout=None):
+        """Return (PooledTab, wait_seconds), opening a tab (or starting a browser) if below capacity"""
+        timeout = self.acquire_timeout if timeout is None else timeout
+        start = time.time()
+        deadline = start + timeout
+        self._start_reaper()
+        while True:
+            tab = None
+            with self._cond:
+                if not self._idle and self._room() is False:
+                    if self._waiters >= self.max_waiters:
+                        self._stats["rejected"] += 1
+                        raise BrowserPoolError(f"HP browser queue full ({self._waiters} waiting)")
+                    self._waiters += 1
+                    try:
+                        while not self._idle and self._room() is False:
+                            remaining = deadline - time.time()
+                            if remaining <= 0:
+                                self._stats["timeouts"] += 1
+                                raise BrowserPoolError(f"No HP browser available after {timeout:.0f}s")
+                            self._cond.wait(remaining)
+                    finally:
+                        self._waiters -= 1
+                if self._idle:
+                    tab = self._idle.pop()
+                else:
+                    room = self._room()
+                    self._reserve(room)
+
+            if tab is None:
+                tab = self._open(room)
+            else:
+                try:
+                    tab.driver.title  # quick health check
+                except Exception:
+                    print("[HP] Stale browser tab detected, opening a new one", file=sys.stderr)
+                    self._close_tab(tab, "broken")
+                    continue
+
+            waited = time.time() - start
+            with self._cond:
+                tab.uses += 1
+                tab.browser.uses += 1
+                self._stats["checkouts"] += 1
+                self._stats["wait_seconds_total"] += waited
+                self._stats["wait_seconds_max"] = max(self._stats["wait_seconds_max"], waited)
+            return tab, waited
+
+    def prestart(self, warm=None):
+        """Start a browser ahead of demand if below capacity, calling warm(driver) on its first tab"""
+        with self._cond:
+            if self._closed or len(self._browsers) + self._starting >= self.size:
+                return False
+            self._reserve(None)
+        self._start_reaper()
+        tab = self._open(None)
+        if warm is not None:
+            try:
+                warm(tab.driver)
+            except Exception as e:
+                print(f"[HP] Warm-up page load failed: {e}", file=sys.stderr)
+        with self._cond:
+            if not self._closed:
+                self._idle.append(tab)
+                self._cond.notify()
+                return True
+        self._close_tab(tab, "reaped")  # shut down while it was starting
+        return False
+
+    def checkin(self, tab, broken=False):
+        """Return a tab to the pool; close it if broken or its browser is due for recycling"""
+        global _browser_last_used
+        _browser_last_used = tab.last_used = time.time()
+        browser = tab.browser
+        if broken:
+            self._close_tab(tab, "broken")
+        elif browser.draining or browser.expired(self.max_uses, self.max_age):
+            browser.draining = True
+            self._close_tab(tab, "recycled")
+        else:
+            with self._cond:
+                self._idle.append(tab)
+                self._cond.notify()
+
+    def _close_tab(self, tab, reason):
+        """Close a tab that is not idle; the browser quits with its last tab"""
+        browser = tab.browser
+        browser.logs.pop(tab.target_id, None)
+        if self._release(browser, reason):
+            return
+        try:
+            with browser.lock:
+                browser.driver.switch_to.window(tab.handle)
+                browser.driver.close()
+                browser.current_handle = None
+        except Exception:
+            pass
+
+    def reap_idle(self):
+        """Close tabs idle for longer than idle_timeout (or whose browser is past its max age)"""
+        now = time.time()
+        with self._cond:
+            stale = [t for t in self._idle
+                     if now - t.last_used > self.idle_timeout or t.browser.expired(self.max_uses, self.max_age)]
+            self._idle = [t for t in self._idle if t not in stale]
+        for tab in stale:
+            self._close_tab(tab, "reaped")
+        return len(stale)
+
+    def _start_reaper(self):
+        if self._reaper is not None:
+            return
+        with self._cond:
+            if self._reaper is not None:
+                return
+            self._reaper = threading.Thread(target=self._reap_loop, name="hp-browser-reaper", daemon=True)
+            self._reaper.start()
+
+    def _reap_loop(self):
+        interval = max(1.0, min(self.idle_timeout / 2, 30.0))
+        while True:
+            time.sleep(interval)
+            if self.reap_idle():
+                print(f"[HP] Reaped idle tabs, pool now {len(self._browsers)} browsers / {self._total} tabs",
+                      file=sys.stderr)
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            idle, self._idle = self._idle, []
+        for tab in idle:
+            self._close_tab(tab, "reaped")
+
+    def stats(self):
+        with self._cond:
+            stats = dict(self._stats)
+            stats.update({
+                "max_size": self.size,
+                "tabs_per_browser": self.tabs,
+                "browsers": len(self._browsers),
+                "size": self._total,
+                "idle": len(self._idle),
+                "in_use": self._total - len(self._idle),
+                "waiting": self._waiters,
+                "max_waiters": self.max_waiters,
+                "last_used_seconds_ago": round(time.time() - _browser_last_used, 1) if _browser_last_used else None,
+            })
+        checkouts = stats["checkouts"]
+        stats["wait_seconds_avg"] = round(stats["wait_seconds_total"] / checkouts, 3) if checkouts else 0.0
+        stats["wait_seconds_total"] = round(stats["wait_seconds_total"], 3)
+        stats["wait_seconds_max"] = round(stats["wait_seconds_max"], 3)
+        return stats
+
+
+_chromedriver = None
+_chromedriver_lock = threading.Lock()
+
+
+def chromedriver_path():
+    """The chromedriver binary, resolved once: CHROMEDRIVER_PATH, else webdriver-manager (may download)"""
+    global _chromedriver
+    with _chromedriver_lock:
+        if _chromedriver is None:
+            if CHROMEDRIVER_PATH:
+                if not os.access(CHROMEDRIVER_PATH, os.X_OK):
+                    raise RuntimeError(f"CHROMEDRIVER_PATH {CHROMEDRIVER_PATH} is not executable")
+                _chromedriver = CHROMEDRIVER_PATH
+            else:
+                from webdriver_manager.chrome import ChromeDriverManager
+                _chromedriver = ChromeDriverManager().install()
+        return _chromedriver
 
 
 def _create_chrome_driver():
@@ -53,7 +590,6 @@ def _create_chrome_driver():
     from selenium import webdriver
     from selenium.webdriver.chrome.options import Options
     from selenium.webdriver.chrome.service import Service
-    from webdriver_manager.chrome import ChromeDriverManager
 
     options = Options()
     options.add_argument("--headless=new")
@@ -61,7 +597,6 @@ def _create_chrome_driver():
     options.add_argument("--disable-dev-shm-usage")
     options.add_argument("--disable-gpu")
     options.add_argument("--disable-extensions")
-    options.add_argument("--disable-images")
     options.add_argument("--window-size=1280,720")
     options.add_argument("--disable-sync")
     options.add_argument("--disable-translate")
@@ -70,61 +605,101 @@ def _create_chrome_driver():
     options.add_argument("--disable-logging")
     options.add_argument("--log-level=3")
     options.add_experimental_option('excludeSwitches', ['enable-logging', 'enable-automation'])
+    configure_options(options)
+    if HP_BROWSER_MODE == "network" or HP_MEASURE_TRAFFIC:
+        options.set_capability("goog:loggingPrefs", {"performance": "ALL"})  # DevTools network events
+    if _NONBLOCKING_LOADS:
+        # Navigation returns right away; the warranty XHR usually completes long before the load event
+        options.page_load_strategy = "none"
 
     os.makedirs('/tmp/chrome-user-data', exist_ok=True)
-    service = Service(ChromeDriverManager().install())
+    service = Service(chromedriver_path())
     driver = webdriver.Chrome(service=service, options=options)
     driver.set_page_load_timeout(20)
-    driver.implicitly_wait(2)
+    driver.implicitly_wait(0 if HP_BROWSER_TABS > 1 else 2)
+    try:
+        apply_blocking(driver)
+    except Exception:
+        driver.quit()
+        raise
     return driver
 
 
-def _get_browser():
-    """Get the persistent browser, creating one if needed"""
-    global _browser_driver, _browser_last_used
+_pool = BrowserPool(
+    size=HP_BROWSER_POOL_SIZE,
+    max_uses=HP_BROWSER_MAX_USES,
+    max_age=HP_BROWSER_MAX_AGE,
+    idle_timeout=HP_BROWSER_IDLE_TIMEOUT,
+    acquire_timeout=HP_BROWSER_ACQUIRE_TIMEOUT,
+    max_waiters=HP_BROWSER_MAX_WAITERS,
+    tabs=HP_BROWSER_TABS,
+    tab_setup=apply_blocking,
+)
 
-    # Check if existing driver is still alive
-    if _browser_driver is not None:
-        try:
-            _browser_driver.title  # quick health check
-            return _browser_driver, False
-        except Exception:
-            print("[HP] Stale browser detected, creating new one", file=sys.stderr)
-            try:
-                _browser_driver.quit()
-            except Exception:
-                pass
-            _browser_driver = None
 
-    # Create new driver
-    _browser_driver = _create_chrome_driver()
-    _browser_last_used = time.time()
-    return _browser_driver, True
+def pool_stats():
+    """Occupancy and wait-time stats for the HP browser pool (plus traffic per lookup when measured)"""
+    if browser_service.HP_BROWSER_SOCKET:
+        return browser_service.stats()
+    stats = _pool.stats()
+    if HP_MEASURE_TRAFFIC:
+        stats["traffic"] = traffic_stats()
+    return stats
+
+
+def _load_completely(driver, url):
+    """Load `url` up to its load event, whatever the page load strategy (warms caches and cookies)"""
+    from selenium.webdriver.support.ui import WebDriverWait
 
+    driver.get(url)
+    WebDriverWait(driver, 20).until(lambda d: d.execute_script("return document.readyState;") == "complete")
 
-def _release_browser(force_quit=False):
-    """Release browser back to pool, or quit if force_quit"""
-    global _browser_driver, _browser_last_used
-    if force_quit and _browser_driver is not None:
+
+def warm_up_browsers(count=HP_WARM_BROWSERS, url=HP_WARM_URL):
+    """
+    Resolve chromedriver and start up to `count` pooled browsers in parallel, each loading
+    `url` to warm HP's cache and cookies. Returns the number of browsers started.
+    With HP_BROWSER_SOCKET set, waits for the browser service's warm-up instead.
+    """
+    if browser_service.HP_BROWSER_SOCKET:
+        return browser_service.wait_ready()
+    chromedriver_path()
+    count = min(count, HP_BROWSER_POOL_SIZE)
+    if count <= 0:
+        return 0
+
+    def start(_):
         try:
-            _browser_driver.quit()
-        except Exception:
-            pass
-        _browser_driver = None
-    else:
-        _browser_last_used = time.time()
+            return _pool.prestart(lambda driver: _load_completely(driver, url) if url else None)
+        except Exception as e:
+            print(f"[HP] Warm-up browser failed to start: {e}", file=sys.stderr)
+            return False
 
+    with ThreadPoolExecutor(max_workers=count, thread_name_prefix="hp-warm") as executor:
+        return sum(executor.map(start, range(count)))
 
-def extract_warranty_ultra_fast(serial_number):
-    """HP warranty lookup: get product info via API, then reusable browser for dates"""
-    from selenium.webdriver.support.ui import WebDriverWait
-    from selenium.webdriver.common.by import By
-    from selenium.webdriver.support import expected_conditions as EC
 
+def shutdown_browsers():
+    """Quit idle pooled browsers (called on app shutdown)"""
+    if browser_service.HP_BROWSER_SOCKET:
+        return  # the browser service owns them
+    _pool.close()
+
+
+def extract_warranty_ultra_fast(serial_number):
+    """HP warranty lookup: product info + dates via JSON APIs, pooled browser as fallback for dates"""
     start_time = time.time()
 
     # Step 1: Get product info via API (fast, ~0.5s)
-    product_info = get_hp_product_info(serial_number)
+    try:
+        product_info = get_hp_product_info(serial_number)
+    except SerialNotFound:
+        # The only definitive "not found" HP gives; cached like Lenovo's
+        print(f"[HP] Serial {serial_number} not found by the product API", file=sys.stderr)
+        return {"error": "Warranty information not found", "status": 404}
+    except CircuitOpenError as e:
+        # HP is failing: answer at once instead of falling through to the browser
+        return {"error": str(e), "status": 503, "retry_after": e.retry_after}
     product_name = None
     direct_url = None
 
@@ -134,24 +709,241 @@ def extract_warranty_ultra_fast(serial_number):
         series_oid = product_info.get("productSeriesOID", "")
         model_oid = product_info.get("productNameOID", "")
         sku = product_info.get("productNumber", "")
-        direct_url = f"https://support.hp.com/us-en/warrantyresult/{seo_name}/{series_oid}/model/{model_oid}?sku={sku}&serialnumber={serial_number}"
+        direct_url = f"{HP_BASE_URL}/us-en/warrantyresult/{seo_name}/{series_oid}/model/{model_oid}?sku={sku}&serialnumber={serial_number}"
         print(f"[HP] Product info in {time.time() - start_time:.2f}s: {product_name}", file=sys.stderr)
 
-    # Step 2: Get warranty dates using persistent browser
-    with _browser_lock:
-        driver = None
+    # Step 2: Get warranty dates from the JSON API (no browser)
+    if product_info and HP_WARRANTY_API:
+        result = get_hp_warranty_via_api(serial_number, product_info)
+        if result:
+            print(f"[HP] Warranty API done in {time.time() - start_time:.2f}s", file=sys.stderr)
+            return result
+        print("[HP] Warranty API failed, falling back to browser", file=sys.stderr)
+
+    # Step 3 (fallback): Get warranty dates using a pooled browser
+    if recording.REPLAYING:
+        # Chrome's traffic isn't recorded, so replays stop at the JSON APIs
+        print("[HP] Browser fallback skipped while replaying recorded traffic", file=sys.stderr)
+        return {"error": "No recorded HP warranty response (the browser fallback is off while replaying)",
+                "status": 503}
+    try:
+        with span("browser"), _browser_breaker.call() as call:
+            if browser_service.HP_BROWSER_SOCKET:
+                return browser_service.lookup(serial_number, direct_url, product_name, call)
+            return _lookup_with_browser(serial_number, direct_url, product_name, start_time, call)
+    except CircuitOpenError as e:
+        print(f"[HP] Browser lookup skipped: {e}", file=sys.stderr)
+        return {"error": str(e), "status": 503, "retry_after": e.retry_after}
+
+
+# Date following a label in the page text, e.g. "Start date February 1, 2022"
+_JS_DATE_AFTER_LABEL = r"""
+    function cleanDateAfterLabel(text, label) {
+        var idx = text.indexOf(label);
+        if (idx === -1) return null;
+        var after = text.substring(idx + label.length);
+        var m = after.match(/(January|February|March|April|May|June|July|August|September|October|November|December)\s+\d{1,2},?\s+\d{4}/);
+        return m ? m[0] : null;
+    }
+"""
+
+# Async script: resolves as soon as both dates are in the DOM. If a label shows up without
+# dates (e.g. only "Expired"), it gives the page `grace` ms more, like the old fixed sleep.
+_JS_WAIT_FOR_DATES = _JS_DATE_AFTER_LABEL + r"""
+    var timeoutMs = arguments[0], graceMs = arguments[1], done = arguments[arguments.length - 1];
+    var observer = null, timer = null, grace = null, finished = false;
+    function finish(state) {
+        if (finished) return;
+        finished = true;
+        if (observer) observer.disconnect();
+        clearTimeout(timer);
+        clearTimeout(grace);
+        done(state);
+    }
+    function check() {
+        var text = document.body ? document.body.textContent : '';
+        if (cleanDateAfterLabel(text, 'Start date') && cleanDateAfterLabel(text, 'End date')) return finish('dates');
+        if (grace === null && (text.indexOf('Start date') !== -1 || text.indexOf('End date') !== -1 || text.indexOf('Expired') !== -1)) {
+            grace = setTimeout(function () { finish('labels'); }, graceMs);
+        }
+    }
+    observer = new MutationObserver(check);
+    observer.observe(document.documentElement, {childList: true, subtree: true, characterData: true});
+    timer = setTimeout(function () { finish('timeout'); }, timeoutMs);
+    check();
+"""
+
+
+# Same observer, started by a plain script; the outcome is left in window.__warrantyReady
+_JS_START_WATCH_FOR_DATES = (
+    "var args = [arguments[0], arguments[1], function (state) { window.__warrantyReady = state; }];"
+    "window.__warrantyWatching = true;"
+    "(function () {" + _JS_WAIT_FOR_DATES + "}).apply(null, args);"
+)
+
+
+def _poll_for_dates(driver, timeout, grace):
+    """_wait_for_dates without an async script, so sibling tabs can use the session meanwhile"""
+    from selenium.common.exceptions import TimeoutException, WebDriverException
+
+    deadline = time.time() + timeout
+    while time.time() < deadline:
         try:
-            driver, is_new = _get_browser()
-            if is_new:
-                print(f"[HP] New browser started in {time.time() - start_time:.2f}s", file=sys.stderr)
-            else:
-                print(f"[HP] Reusing browser ({time.time() - start_time:.2f}s)", file=sys.stderr)
+            state = driver.execute_script("return window.__warrantyWatching ? (window.__warrantyReady || '') : null;")
+            if state is None:  # not watching yet, or the document was replaced
+                remaining = int((deadline - time.time()) * 1000)
+                driver.execute_script(_JS_START_WATCH_FOR_DATES, max(remaining, 1), int(grace * 1000))
+            elif state == "timeout":
+                break
+            elif state:
+                return state
+        except WebDriverException:
+            pass  # navigating
+        time.sleep(0.05)
+    raise TimeoutException(f"No warranty dates after {timeout:.0f}s")
+
+
+def _wait_for_dates(driver, timeout=HP_DOM_WAIT_TIMEOUT, grace=1.0):
+    """Block until the result page shows the warranty dates; returns how readiness was reached"""
+    from selenium.common.exceptions import TimeoutException, WebDriverException
+    from selenium.webdriver.support.ui import WebDriverWait
+
+    if HP_DOM_WAIT == "poll":
+        WebDriverWait(driver, timeout).until(
+            lambda d: "Start date" in d.page_source or "End date" in d.page_source or "Expired" in d.page_source
+        )
+        time.sleep(grace)
+        return "poll"
+    if HP_BROWSER_TABS > 1:
+        return _poll_for_dates(driver, timeout, grace)
+
+    deadline = time.time() + timeout
+    while True:
+        remaining = deadline - time.time()
+        if remaining <= 0:
+            raise TimeoutException(f"No warranty dates after {timeout:.0f}s")
+        driver.set_script_timeout(remaining + 5)
+        try:
+            state = driver.execute_async_script(_JS_WAIT_FOR_DATES, int(remaining * 1000), int(grace * 1000))
+        except TimeoutException:
+            raise
+        except WebDriverException:
+            # The document navigated away under the script (form submit path): watch the new one
+            time.sleep(0.1)
+            continue
+        if state == "timeout":
+            raise TimeoutException(f"No warranty dates after {timeout:.0f}s")
+        return state
+
 
-            # Navigate directly to result page if we have product info
+def _navigate(driver, url):
+    """
+    driver.get(url). When page loads don't block (network mode, several tabs), this only waits
+    until the new document has replaced the previous one (the marker) and is parsed.
+    """
+    if not _NONBLOCKING_LOADS:
+        driver.get(url)
+        return
+    from selenium.common.exceptions import WebDriverException
+    from selenium.webdriver.support.ui import WebDriverWait
+
+    driver.execute_script("window.__previousLookup = true;")
+    driver.get(url)
+    WebDriverWait(driver, 20, ignored_exceptions=(WebDriverException,)).until(
+        lambda d: d.execute_script("return window.__previousLookup !== true && document.readyState !== 'loading';")
+    )
+
+
+def _network_events(driver, meter=None):
+    """DevTools network events logged since the last call, also counted on `meter` if given"""
+    for entry in driver.get_log("performance"):
+        message = json.loads(entry["message"])["message"]
+        if meter is not None:
+            meter.add(message)
+        yield message
+
+
+def _capture_warranty_response(driver, timeout=HP_CAPTURE_TIMEOUT, meter=None):
+    """
+    Watch the DevTools performance log for the result page's warranty-details XHR and return
+    its JSON as soon as it has loaded. Returns None if it fails or doesn't arrive in `timeout` seconds.
+    """
+    deadline = time.time() + timeout
+    pending = set()  # requestIds of matching responses still loading
+    while time.time() < deadline:
+        for message in _network_events(driver, meter):
+            method, params = message.get("method"), message.get("params", {})
+            if method == "Network.responseReceived" and params.get("type") in ("XHR", "Fetch"):
+                response = params["response"]
+                if HP_WARRANTY_API_PATH not in response["url"]:
+                    continue
+                if response["status"] == 429:
+                    _browser_limiter.throttled()
+                if response["status"] == 200:
+                    pending.add(params["requestId"])
+            elif method == "Network.loadingFinished" and params.get("requestId") in pending:
+                body = driver.execute_cdp_cmd("Network.getResponseBody", {"requestId": params["requestId"]})
+                text = base64.b64decode(body["body"]) if body.get("base64Encoded") else body["body"]
+                return json.loads(text)
+            elif method == "Network.loadingFailed":
+                pending.discard(params.get("requestId"))
+        time.sleep(0.05)
+    return None
+
+
+def _finish_traffic(driver, meter):
+    """Count the lookup's remaining network events and record its traffic (HP_MEASURE_TRAFFIC=1)"""
+    if meter is None:
+        return
+    try:
+        for _ in _network_events(driver, meter):
+            pass
+    except Exception:
+        return
+    record_traffic(meter)
+
+
+def _lookup_with_browser(serial_number, direct_url, product_name, start_time, call):
+    """Warranty dates from the result page in a pooled browser; failures are marked on `call`"""
+    from selenium.common.exceptions import TimeoutException
+    from selenium.webdriver.support.ui import WebDriverWait
+    from selenium.webdriver.common.by import By
+    from selenium.webdriver.support import expected_conditions as EC
+
+    # Wait for a page-load slot before taking a browser, so queued lookups don't hold one idle
+    call.exclude(_browser_limiter.wait())
+    try:
+        browser, waited = _pool.checkout()
+    except BrowserPoolError as e:
+        print(f"[HP] {e}", file=sys.stderr)
+        call.skip()  # local saturation, not an HP failure
+        return {"error": str(e), "status": 503}
+    except Exception as e:
+        print(f"[HP] Browser start failed: {e}", file=sys.stderr)
+        call.skip()
+        return {"error": f"Chrome driver failed: {e}", "status": 503}
+    call.exclude(waited)  # time HP's page, not the wait for a free browser
+    observe_stage("browser_acquire", waited)
+
+    broken = False
+    try:
+        driver = browser.driver
+        if browser.uses == 1:
+            started = "browser" if browser.browser.uses == 1 else "tab"
+            print(f"[HP] New {started} started in {time.time() - start_time:.2f}s", file=sys.stderr)
+        else:
+            print(f"[HP] Reusing browser after {waited:.2f}s wait ({time.time() - start_time:.2f}s)", file=sys.stderr)
+
+        network = HP_BROWSER_MODE == "network"
+        meter = TrafficMeter() if HP_MEASURE_TRAFFIC else None
+        if network or meter is not None:
+            driver.get_log("performance")  # drop events from earlier pages
+        # Navigate directly to result page if we have product info
+        with stage_timer("page_load"):
             if direct_url:
-                driver.get(direct_url)
+                _navigate(driver, direct_url)
             else:
-                driver.get("https://support.hp.com/us-en/check-warranty")
+                _navigate(driver, f"{HP_BASE_URL}/us-en/check-warranty")
 
                 # Accept cookies
                 try:
@@ -169,58 +961,81 @@ def extract_warranty_ultra_fast(serial_number):
                 time.sleep(0.5)
                 driver.execute_script("var btn=document.getElementById('FindMyProduct');if(btn)btn.click();")
 
-            # Wait for warranty content to appear
-            print(f"[HP] Waiting for warranty data...", file=sys.stderr)
-            WebDriverWait(driver, 15).until(
-                lambda d: "Start date" in d.page_source or "End date" in d.page_source or "Expired" in d.page_source
-            )
-            time.sleep(1)
-
-            print(f"[HP] Page ready in {time.time() - start_time:.2f}s", file=sys.stderr)
-
-            # Extract warranty dates
-            warranty_info = driver.execute_script("""
-                function cleanDateAfterLabel(text, label) {
-                    var idx = text.indexOf(label);
-                    if (idx === -1) return null;
-                    var after = text.substring(idx + label.length);
-                    var m = after.match(/(January|February|March|April|May|June|July|August|September|October|November|December)\\s+\\d{1,2},?\\s+\\d{4}/);
-                    return m ? m[0] : null;
-                }
-                var allText = document.body.textContent;
-                var result = {start: null, end: null, product: null};
-                result.start = cleanDateAfterLabel(allText, 'Start date');
-                result.end = cleanDateAfterLabel(allText, 'End date');
-
-                var headings = document.querySelectorAll('h1, h2, .product-title');
-                for (var i = 0; i < headings.length; i++) {
-                    var text = headings[i].textContent.trim();
-                    if (text && text.length > 5 && (text.includes('HP') || text.includes('Compaq'))) {
-                        result.product = text;
-                        break;
-                    }
+        if network:
+            with stage_timer("network_capture"):
+                try:
+                    payload = _capture_warranty_response(driver, meter=meter)
+                    result = parse_hp_warranty_payload(payload, serial_number, product_name)
+                except Exception as e:
+                    print(f"[HP] Network capture failed: {e}", file=sys.stderr)
+                    result = None
+            if result:
+                try:
+                    driver.execute_cdp_cmd("Page.stopLoading", {})  # the rest of the page isn't needed
+                except Exception:
+                    pass
+                print(f"[HP] Captured warranty response in {time.time() - start_time:.2f}s", file=sys.stderr)
+                _finish_traffic(driver, meter)
+                return result
+            print("[HP] No warranty response captured, reading the page instead", file=sys.stderr)
+
+        # Wait for warranty content to appear
+        print(f"[HP] Waiting for warranty data...", file=sys.stderr)
+        with stage_timer("dom_wait"):
+            ready = _wait_for_dates(driver)
+
+        print(f"[HP] Page ready ({ready}) in {time.time() - start_time:.2f}s", file=sys.stderr)
+
+        # Extract warranty dates
+        extraction_start = time.time()
+        warranty_info = driver.execute_script(_JS_DATE_AFTER_LABEL + """
+            var allText = document.body.textContent;
+            var result = {start: null, end: null, product: null};
+            result.start = cleanDateAfterLabel(allText, 'Start date');
+            result.end = cleanDateAfterLabel(allText, 'End date');
+
+            var headings = document.querySelectorAll('h1, h2, .product-title');
+            for (var i = 0; i < headings.length; i++) {
+                var text = headings[i].textContent.trim();
+                if (text && text.length > 5 && (text.includes('HP') || text.includes('Compaq'))) {
+                    result.product = text;
+                    break;
                 }
-                return result;
-            """)
-
-            result = {
-                "brand": "HP",
-                "product_name": product_name or warranty_info.get('product'),
-                "serial_number": serial_number,
-                "warranty_start": convert_date_to_ddmmyyyy(warranty_info.get('start')),
-                "warranty_end": convert_date_to_ddmmyyyy(warranty_info.get('end')),
             }
+            return result;
+        """)
 
-            total = time.time() - start_time
-            print(f"[HP] Done in {total:.2f}s", file=sys.stderr)
-            _release_browser()
-            return result
+        result = {
+            "brand": "HP",
+            "product_name": product_name or warranty_info.get('product'),
+            "serial_number": serial_number,
+            "warranty_start": convert_date_to_ddmmyyyy(warranty_info.get('start')),
+            "warranty_end": convert_date_to_ddmmyyyy(warranty_info.get('end')),
+        }
+        observe_stage("extraction", time.time() - extraction_start)
 
-        except Exception as e:
-            print(f"[HP] Error: {e}", file=sys.stderr)
-            # Kill broken browser so next request gets a fresh one
-            _release_browser(force_quit=True)
-            return {"error": str(e)}
+        total = time.time() - start_time
+        print(f"[HP] Done in {total:.2f}s", file=sys.stderr)
+        _finish_traffic(driver, meter)
+        return result
+
+    except Exception as e:
+        print(f"[HP] Error: {e}", file=sys.stderr)
+        # Kill broken browser so next request gets a fresh one
+        broken = True
+        call.fail()
+        try:
+            page = driver.page_source
+        except Exception:
+            page = ""
+        if is_block_page(page):
+            print("[HP] Bot check detected, slowing down page loads", file=sys.stderr)
+            _browser_limiter.throttled()
+            return {"error": "CAPTCHA or security verification required", "status": 503}
+        # Browser trouble says nothing about the serial: 5xx, so it is retried, never cached
+        return {"error": str(e) or type(e).__name__, "status": 504 if isinstance(e, TimeoutException) else 503}
+    finally:
+        _pool.checkin(browser, broken=broken)
 
 
 def main():
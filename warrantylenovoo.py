@@ -1,8 +1,11 @@
 import requests
 import sys
+import os
 import re
 import json
 
+LENOVO_BASE_URL = os.environ.get("LENOVO_BASE_URL", "https://pcsupport.lenovo.com").rstrip("/")
+
 def get_lenovo_warranty_info(serial_number):
     """
     Fetches warranty information for a given Lenovo serial number using:
@@ -18,7 +21,7 @@ def get_lenovo_warranty_info(serial_number):
               Returns None if the initial product API call fails critically.
               The "warranties" list can be empty or contain error dictionaries.
     """
-    product_api_url = f"https://pcsupport.lenovo.com/us/en/api/v4/mse/getproducts?productId={serial_number}"
+    product_api_url = f"{LENOVO_BASE_URL}/us/en/api/v4/mse/getproducts?productId={serial_number}"
     model = 'N/A'
     product_id_full = None # Renamed from product_id_path for clarity
     machine_type_group = "N/A"
@@ -77,7 +80,7 @@ def get_lenovo_warranty_info(serial_number):
         print("Cannot fetch warranty details using getIbaseInfo API because Machine Type Group or Product ID is missing.")
         return {"model": model, "warranties": [{"name": "Prerequisite Missing", "error_detail": "Machine Type Group or Product ID not available for getIbaseInfo.", "is_error": True}]}
 
-    ibase_api_url = "https://pcsupport.lenovo.com/us/en/api/v4/upsell/redport/getIbaseInfo"
+    ibase_api_url = f"{LENOVO_BASE_URL}/us/en/api/v4/upsell/redport/getIbaseInfo"
     referer_url = f"https://pcsupport.lenovo.com/us/en/products{product_id_full}/warranty/" # Note: product_id_full starts with '/'
 
     # WARNING: The x-csrf-token is DYNAMIC. This hardcoded token will likely fail.